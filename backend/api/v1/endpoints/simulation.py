@@ -1,123 +1,163 @@
-from fastapi import APIRouter, HTTPException, Depends
-from models.schemas import SimulationRequest, SimulationResponse
-from core.solar_engine import SolarEngine
-from core.weather_service import get_weather_data
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from models.schemas import (
+    SimulationRequest, SimulationResponse, BatchSimulationRequest, BatchSimulationResponse, BatchItemResult,
+    OrientationRequest, OrientationResponse, ForecastRequest, ForecastResponse
+)
+from core.weather_service import WeatherService, get_weather_data, get_weather_service
+from core.executor import get_executor
+from core.result_cache import get_result_cache
+from core.persistence import get_simulation_writer
+from core.financial_engine import FinancialEngine
+from core import metrics
+from core.metrics import StageTimer
 from datetime import datetime
-from shapely.geometry import Polygon
-from shapely.ops import transform
-import pyproj
-from typing import List
+from core.geometry import polygon_centroid, project_polygon, project_polygons
+import json
+import time
+import asyncio
+import numpy as np
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
-router = APIRouter()
-
-def calculate_geodesic_area(coordinates: List[List[float]]) -> float:
-    """
-    Calculates area in square meters from lat/lon polygon using Geodesic projection.
-    """
-    if len(coordinates) < 3:
-        return 0.0
-        
-    # Create Shapely Polygon (Note: Shapely expects (x, y) = (lon, lat))
-    # Input coordinates are [lat, lon] from Leaflet usually, check schema?
-    # Schema says: polygon: List[List[float]] # [[lat, lng], ...]
-    
-    # Swap to [lon, lat] for Shapely
-    poly_coords = [(p[1], p[0]) for p in coordinates]
-    poly = Polygon(poly_coords)
-    
-    # Project to Albers Equal Area for Indonesia (or generic equivalent)
-    # Using specific EPSG for Indonesia would be better, but World Mollweide or similar works for area.
-    # Or simpler: Project wgs84 to local UTM. 
-    # Let's use pyproj for a robust geodesic area calculation without full projection if possible,
-    # or project to a local UTM zone.
-    
-    # Simple Auto-UTM projection
-    # Estimate UTM zone
-    lon_centroid = poly.centroid.x
-    lat_centroid = poly.centroid.y
-    utm_zone = int((lon_centroid + 180) / 6) + 1
-    is_northern = lat_centroid > 0
-    
-    # Define projection
-    # WGS84
-    wgs84 = pyproj.CRS('EPSG:4326')
-    # UTM (approx)
-    utm_crs_code = f'EPSG:326{utm_zone}' if is_northern else f'EPSG:327{utm_zone}'
-    utm = pyproj.CRS(utm_crs_code)
-    
-    project = pyproj.Transformer.from_crs(wgs84, utm, always_xy=True).transform
-    projected_poly = transform(project, poly)
-    
-    return projected_poly.area
+# The engine (pvlib, pandas, scipy) is imported inside the executor jobs below,
+# so the API process starts without it; see warmup_steps().
 
+router = APIRouter()
 
-@router.post("/calculate", response_model=SimulationResponse)
-async def calculate_simulation(request: SimulationRequest):
+def _polygon_centroid(polygon: List[List[float]]) -> Tuple[float, float]:
     """
-    Core Calculation Endpoint.
-    Receives Polygon -> Calculates Area -> Fetches Weather -> Runs Physics Engine -> Returns Financials.
-    Enhanced with monthly breakdown, panel layout, and detailed losses.
+    Validates a roof polygon and returns its area-weighted (lat, lon) centroid
+    for weather lookup. Cheap enough to run on the event loop.
+    Raises HTTPException(400) for invalid input.
     """
-
     # 1. Validate Polygon
-    if len(request.polygon) < 3:
+    if len(polygon) < 3:
         raise HTTPException(status_code=400, detail="Polygon must have at least 3 points.")
+    if any(len(p) != 2 for p in polygon):
+        raise HTTPException(status_code=400, detail="Polygon points must be [lat, lng] pairs.")
+
+    # 3. Get Centroid for Weather Lookup
+    return polygon_centroid(polygon)
 
+
+def _project_site(polygon: List[List[float]]) -> Dict:
+    """
+    Projected roof (see `project_polygon`): geodesic area, centroid, UTM polygon and EPSG.
+    Raises ValueError for invalid geometry; runs in the simulation executor,
+    so it must not raise HTTPException (not picklable).
+    """
     # 2. Calculate Area (Geodesic)
     try:
-        area_sqm = calculate_geodesic_area(request.polygon)
+        return project_polygon(polygon)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Geometry Error: {str(e)}")
+        raise ValueError(f"Geometry Error: {str(e)}")
 
-    # 3. Get Centroid for Weather Lookup
-    lat_centroid = sum(p[0] for p in request.polygon) / len(request.polygon)
-    lon_centroid = sum(p[1] for p in request.polygon) / len(request.polygon)
 
-    # 4. Fetch Weather (Mock/Real)
-    weather = await get_weather_data(lat_centroid, lon_centroid)
+def _orientation_yield(
+    geometry: Dict,
+    weather: Dict,
+    lat: float,
+    lon: float,
+    tilt: float,
+    azimuth: float
+) -> Tuple[float, Dict, float]:
+    """
+    (daily transposition factor, hourly yield, orientation loss) for one
+    orientation at a site whose annual geometry is already prepared.
 
-# 5. Run Solar Engine - Daily Simulation
-    physics_result = SolarEngine.calculate_daily_simulation(
-        latitude=lat_centroid,
-        longitude=lon_centroid,
-        area_sqm=area_sqm,
-        tilt=request.tilt,
-        azimuth=request.azimuth,
-        ghi_daily_kwh=weather['ghi_daily_kwh'],
-        temp_day_c=weather['temp_avg'],
-        panel_efficiency=request.panel_efficiency
+    The loss reference (best orientation) is shared by every roof of the
+    weather grid cell under the same weather entry, so it is cached per
+    (cell, weather) rather than swept per roof.
+    """
+    from core.solar_engine import SolarEngine
+
+    ghi, temp_air = SolarEngine.build_hourly_weather(geometry, weather['ghi_daily_kwh'], weather['temp_avg'])
+    precision = WeatherService.GRID_PRECISION
+    optimal_yield = SolarEngine.get_optimal_yield(
+        round(lat, precision), round(lon, precision), weather['ghi_daily_kwh'], weather['temp_avg']
     )
+    return (
+        SolarEngine.get_daily_transposition_factor(lat, lon, tilt, azimuth, geometry=geometry),
+        SolarEngine.calculate_hourly_yield(geometry, tilt, azimuth, ghi, temp_air),
+        SolarEngine.calculate_orientation_loss(geometry, ghi, temp_air, tilt, azimuth, optimal_yield=optimal_yield)
+    )
+
+
+def _run_simulation(
+    request: SimulationRequest,
+    area_sqm: float,
+    lat_centroid: float,
+    lon_centroid: float,
+    weather: Dict,
+    transposition_factor: Optional[float] = None,
+    hourly_yield: Optional[Dict] = None,
+    orientation_loss: Optional[float] = None,
+    roof_polygon=None,
+    epsg: Optional[int] = None,
+    timer: Optional[StageTimer] = None
+) -> Dict:
+    """
+    Runs the physics and financial pipeline for one roof.
+
+    `transposition_factor`, `hourly_yield` and `orientation_loss` may be
+    precomputed and shared by roofs with the same weather cell and orientation
+    (see the batch endpoint).
+    `roof_polygon` (projected) and `epsg` enable polygon-aware panel packing.
+    Stage durations are added to `timer` if given.
+    """
+    from core.solar_engine import SolarEngine
+
+    timer = timer or StageTimer()
+    if hourly_yield is None:
+        with timer.stage("solar_geometry"):
+            geometry = SolarEngine.prepare_annual_geometry(lat_centroid, lon_centroid)
+            transposition_factor, hourly_yield, orientation_loss = _orientation_yield(
+                geometry, weather, lat_centroid, lon_centroid, request.tilt, request.azimuth
+            )
+
+# 5. Run Solar Engine - Daily Simulation
+    with timer.stage("daily_sim"):
+        physics_result = SolarEngine.calculate_daily_simulation(
+            latitude=lat_centroid,
+            longitude=lon_centroid,
+            area_sqm=area_sqm,
+            tilt=request.tilt,
+            azimuth=request.azimuth,
+            ghi_daily_kwh=weather['ghi_daily_kwh'],
+            temp_day_c=weather['temp_avg'],
+            panel_efficiency=request.panel_efficiency,
+            transposition_factor=transposition_factor
+        )
 
     # 6. Calculate Panel Layout
-    panel_layout = SolarEngine.calculate_panel_layout(
-        area_sqm=area_sqm,
-        panel_width_m=1.134,  # Standard 550W panel in Indonesia
-        panel_height_m=2.279,
-        setback_m=0.5,
-        row_spacing_m=0.3,
-        tilt=request.tilt,
-        panel_efficiency=request.panel_efficiency
-    )
+    with timer.stage("layout"):
+        panel_layout = SolarEngine.calculate_panel_layout(
+            area_sqm=area_sqm,
+            panel_width_m=1.134,  # Standard 550W panel in Indonesia
+            panel_height_m=2.279,
+            setback_m=0.5,
+            row_spacing_m=0.3,
+            tilt=request.tilt,
+            panel_efficiency=request.panel_efficiency,
+            roof_polygon=roof_polygon,
+            epsg=epsg
+        )
 
-    # 7. Calculate Monthly Breakdown
-    monthly_breakdown = SolarEngine.calculate_monthly_simulation(
-        latitude=lat_centroid,
-        longitude=lon_centroid,
-        area_sqm=area_sqm,
-        tilt=request.tilt,
-        azimuth=request.azimuth,
-        base_ghi_daily_kwh=weather['ghi_daily_kwh'],
-        base_temp_c=weather['temp_avg'],
-        panel_efficiency=request.panel_efficiency
-    )
+    # 7. Calculate Monthly Breakdown (vectorized 8760-hour year)
+    with timer.stage("monthly_sim"):
+        monthly_breakdown = SolarEngine.aggregate_annual_yield(
+            hourly_yield, area_sqm, request.panel_efficiency
+        )
 
     # 8. Calculate Detailed Losses
-    detailed_losses = SolarEngine.calculate_detailed_losses(
-        latitude=lat_centroid,
-        tilt=request.tilt,
-        azimuth=request.azimuth,
-        temp_avg_c=weather['temp_avg']
-    )
+    with timer.stage("losses"):
+        detailed_losses = SolarEngine.calculate_detailed_losses(
+            latitude=lat_centroid,
+            tilt=request.tilt,
+            azimuth=request.azimuth,
+            temp_avg_c=weather['temp_avg'],
+            orientation_loss=orientation_loss
+        )
 
     # 9. Financial Calculations - Use user-provided values
     # Use monthly breakdown for accurate annual production
@@ -133,6 +173,17 @@ async def calculate_simulation(request: SimulationRequest):
     # 0.85 kg CO2 per kWh (Coal heavy grid like Java-Bali)
     co2_offset = (annual_production * 0.85) / 1000  # Tons
 
+    # 11. Optional P50/P90 ensemble on the same hourly yield
+    uncertainty = None
+    if request.uncertainty_samples:
+        with timer.stage("uncertainty"):
+            from core.uncertainty import run_monte_carlo
+            uncertainty = run_monte_carlo(
+                hourly_yield, area_sqm, request.panel_efficiency,
+                system_cost=estimated_cost, tariff=request.electricity_tariff,
+                samples=request.uncertainty_samples
+            )
+
     return {
         "site_details": {
             "roof_area_sqm": round(area_sqm, 2),
@@ -154,8 +205,584 @@ async def calculate_simulation(request: SimulationRequest):
         "environment": {
             "co2_offset_ton": round(co2_offset, 2)
         },
+        "uncertainty": uncertainty,
+        "meta": {
+            "weather_source": weather.get('source', 'OpenWeatherMap'),
+            "calculation_timestamp": datetime.utcnow().isoformat()
+        }
+    }
+
+
+def _from_result_cache(result: Dict) -> Dict:
+    """A cached response as served now: marked cached, timestamped with the serve time."""
+    meta = {**result["meta"], "cached": True, "calculation_timestamp": datetime.utcnow().isoformat()}
+    return {**result, "meta": meta}
+
+
+def _optional(value: float, digits: int) -> Optional[float]:
+    """Rounded float, or None for NaN (metric undefined)."""
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _price_sites(requests: List[SimulationRequest], results: List[Dict]):
+    """
+    Adds the project-life financials to simulation results, pricing every
+    site in one vectorized FinancialEngine call.
+    """
+    if not results:
+        return
+    finance = FinancialEngine.evaluate(
+        system_cost=[
+            r["energy_output"]["recommended_system_size_kwp"] * q.system_cost_per_kwp
+            for q, r in zip(requests, results)
+        ],
+        first_year_kwh=[r["energy_output"]["annual_production_kwh"] for r in results],
+        tariff=[q.electricity_tariff for q in requests]
+    )
+    columns = ('production_kwh', 'savings', 'om_cost', 'net_cash_flow', 'cumulative_cash_flow')
+    table = np.stack([finance[name] for name in columns], axis=-1).round(0)
+
+    for i, result in enumerate(results):
+        result["financials"].update({
+            "npv_idr": round(float(finance['npv'][i]), -3),
+            "irr_percent": _optional(finance['irr'][i] * 100, 2),
+            "lcoe_idr_per_kwh": _optional(finance['lcoe'][i], 1),
+            "payback_years": _optional(finance['payback_years'][i], 1),
+            "discounted_payback_years": _optional(finance['discounted_payback_years'][i], 1),
+            "cash_flows": [
+                {
+                    "year": year,
+                    "production_kwh": row[0],
+                    "savings_idr": row[1],
+                    "om_cost_idr": row[2],
+                    "net_cash_flow_idr": row[3],
+                    "cumulative_cash_flow_idr": row[4],
+                }
+                for year, row in enumerate(table[i].tolist())
+            ],
+        })
+
+
+def _simulate_site(request: SimulationRequest, weather: Dict) -> Tuple[Dict, Dict[str, float]]:
+    """
+    Executor job for /calculate: geometry, physics and financials for one roof.
+    Returns (result, stage durations).
+    """
+    timer = StageTimer()
+    with timer.stage("geometry"):
+        site = _project_site(request.polygon)
+    result = _run_simulation(
+        request, site['area_sqm'], site['lat'], site['lon'], weather,
+        roof_polygon=site['projected'], epsg=site['epsg'], timer=timer
+    )
+    with timer.stage("financials"):
+        _price_sites([request], [result])
+    return result, timer.durations
+
+
+def _simulate_cell(
+    items: List[Tuple[int, SimulationRequest]],
+    weather: Dict
+) -> Tuple[List[Dict], Dict[str, float]]:
+    """
+    Executor job for /batch: all roofs of one weather grid cell.
+
+    Solar geometry is computed once for the cell and the hourly yield /
+    transposition factor / orientation loss once per (tilt, azimuth); the
+    financial projection prices all roofs of the cell in one call. Returns one
+    result or error entry per item, and the stage durations summed over the cell.
+    """
+    from core.solar_engine import SolarEngine
+
+    timer = StageTimer()
+    # Project every roof of the cell in one vectorized pass
+    try:
+        with timer.stage("geometry"):
+            sites = project_polygons([item.polygon for _, item in items])
+        projected = [
+            {'area_sqm': float(area), 'lat': float(lat), 'lon': float(lon), 'projected': roof, 'epsg': int(epsg)}
+            for area, lat, lon, roof, epsg in zip(
+                sites['area_sqm'], sites['lat'], sites['lon'], sites['projected'], sites['epsg']
+            )
+        ]
+    except Exception:
+        projected = None  # Isolate the offending polygon(s) below
+
+    cell_lat, cell_lon = _polygon_centroid(items[0][1].polygon)
+    geometry = None
+    orientations: Dict[Tuple[float, float], Tuple[float, Dict]] = {}
+    results = []
+
+    for position, (index, item) in enumerate(items):
+        try:
+            if projected is not None:
+                site = projected[position]
+            else:
+                with timer.stage("geometry"):
+                    site = _project_site(item.polygon)
+
+            orientation = (item.tilt, item.azimuth)
+            if orientation not in orientations:
+                with timer.stage("solar_geometry"):
+                    if geometry is None:
+                        geometry = SolarEngine.prepare_annual_geometry(cell_lat, cell_lon)
+                    orientations[orientation] = _orientation_yield(
+                        geometry, weather, cell_lat, cell_lon, *orientation
+                    )
+            k_trans, hourly_yield, orientation_loss = orientations[orientation]
+            results.append({"index": index, "result": _run_simulation(
+                item, site['area_sqm'], site['lat'], site['lon'], weather,
+                transposition_factor=k_trans, hourly_yield=hourly_yield,
+                orientation_loss=orientation_loss,
+                roof_polygon=site['projected'], epsg=site['epsg'], timer=timer
+            )})
+        except ValueError as e:
+            results.append({"index": index, "error": {"status_code": 400, "detail": str(e)}})
+        except Exception as e:
+            results.append({"index": index, "error": {"status_code": 500, "detail": f"Simulation Error: {str(e)}"}})
+
+    # Price every successful roof of the cell at once
+    requests = dict(items)
+    succeeded = [entry for entry in results if "result" in entry]
+    with timer.stage("financials"):
+        _price_sites([requests[entry["index"]] for entry in succeeded], [entry["result"] for entry in succeeded])
+    return results, timer.durations
+
+
+async def _fetch_weather(lat: float, lon: float, service=None) -> Dict:
+    """Weather for a site, recorded as the request's 'weather' stage (described by its source)."""
+    started = time.perf_counter()
+    if service is None:
+        weather = await get_weather_data(lat, lon)
+    else:
+        weather = await service.get_weather_data(lat, lon)
+    metrics.record_stage("weather", time.perf_counter() - started, weather.get("source"))
+    return weather
+
+
+async def _run_timed(fn, *args, **kwargs):
+    """
+    Runs an executor job returning (payload, stage durations); records the
+    durations and the time spent waiting for a worker ('executor_wait').
+    """
+    started = time.perf_counter()
+    payload, durations = await get_executor().run(fn, *args, **kwargs)
+    elapsed = time.perf_counter() - started
+    metrics.record_stage("executor_wait", max(0.0, elapsed - sum(durations.values())))
+    metrics.record_stages(durations)
+    return payload
+
+
+# Small Jakarta roof simulated on every executor worker at startup; weather is stubbed
+WARMUP_REQUEST = SimulationRequest(
+    polygon=[[-6.2000, 106.8166], [-6.2000, 106.8167], [-6.2001, 106.8167], [-6.2001, 106.8166]],
+    bill_idr=1_500_000,
+    uncertainty_samples=100
+)
+WARMUP_WEATHER = {"ghi_daily_kwh": 4.8, "temp_avg": 27.5, "source": "warmup"}
+
+
+def _load_engine():
+    """Imports the engine and loads its lookup tables (transposition table, climatology)."""
+    from core.solar_engine import SolarEngine  # noqa: F401
+    from core.uncertainty import run_monte_carlo  # noqa: F401
+    from core.transposition_table import get_transposition_table
+    from core.climatology import get_climatology
+
+    get_transposition_table()
+    get_climatology()
+
+
+async def _warm_workers():
+    """
+    One throwaway simulation per executor worker: engine imports, pvlib's lazily
+    loaded data files and the ephemeris of the warm-up cell.
+    """
+    executor = get_executor()
+    await asyncio.gather(*(
+        executor.run(_simulate_site, WARMUP_REQUEST, WARMUP_WEATHER, admitted=True)
+        for _ in range(executor.max_workers)
+    ))
+
+
+def warmup_steps() -> Dict[str, Callable[[], Awaitable]]:
+    """
+    Startup warm-up steps for core.warmup.StartupWarmup. With the process
+    executor the engine only ever runs in the workers, so this process never
+    imports it.
+    """
+    steps = {}
+    if get_executor().mode != "process":
+        steps["engine"] = lambda: asyncio.to_thread(_load_engine)
+    steps["simulation"] = _warm_workers
+    return steps
+
+
+def _optimize_site(request: OrientationRequest, weather: Dict) -> Dict:
+    """Executor job for /optimize: annual yield for every tilt x azimuth of one roof."""
+    from core.solar_engine import SolarEngine
+
+    site = _project_site(request.polygon)
+    geometry = SolarEngine.prepare_annual_geometry(site['lat'], site['lon'])
+    ghi, temp_air = SolarEngine.build_hourly_weather(geometry, weather['ghi_daily_kwh'], weather['temp_avg'])
+
+    tilts = np.arange(0.0, request.max_tilt + 1e-9, request.tilt_step)
+    azimuths = np.arange(0.0, 360.0 - 1e-9, request.azimuth_step)
+    yields = SolarEngine.calculate_orientation_sweep(geometry, ghi, temp_air, tilts, azimuths)
+    best = SolarEngine.find_optimal_orientation(
+        yields, tilts, azimuths, tolerance=request.tolerance_percent / 100
+    )
+    near_tilts = [tilt for tilt, _ in best['near_optimal']]
+
+    return {
+        "location": f"{round(site['lat'], 4)}, {round(site['lon'], 4)}",
+        "roof_area_sqm": round(site['area_sqm'], 2),
+        "tilts": tilts.round(2).tolist(),
+        "azimuths": azimuths.round(2).tolist(),
+        "yield_kwh_per_kwp": yields.round(1).tolist(),
+        "optimum": {
+            "tilt": best['tilt'],
+            "azimuth": best['azimuth'],
+            "yield_kwh_per_kwp": round(best['yield_kwh_per_kwp'], 1),
+            # Same scaling as the annual simulation: A * eta * sum(POA * PR)
+            "annual_production_kwh": round(
+                best['yield_kwh_per_kwp'] * site['area_sqm'] * request.panel_efficiency, 0
+            )
+        },
+        "near_optimal": {
+            "tolerance_percent": request.tolerance_percent,
+            "min_yield_kwh_per_kwp": round(best['threshold_kwh_per_kwp'], 1),
+            "tilt_range": (min(near_tilts), max(near_tilts)),
+            "orientations": best['near_optimal']
+        },
         "meta": {
             "weather_source": weather.get('source', 'OpenWeatherMap'),
             "calculation_timestamp": datetime.utcnow().isoformat()
         }
     }
+
+
+def _forecast_site(request: ForecastRequest, forecast: Dict, start: datetime) -> Tuple[Dict, Dict[str, float]]:
+    """
+    Executor job for /forecast: expected production per hour of one roof over
+    the forecast horizon. Returns (result, stage durations).
+    """
+    import pandas as pd
+    from core.solar_engine import SolarEngine
+
+    timer = StageTimer()
+    with timer.stage("geometry"):
+        site = _project_site(request.polygon)
+    with timer.stage("forecast_sim"):
+        steps = forecast['steps']
+        simulation = SolarEngine.calculate_forecast_simulation(
+            latitude=site['lat'],
+            longitude=site['lon'],
+            area_sqm=site['area_sqm'],
+            tilt=request.tilt,
+            azimuth=request.azimuth,
+            forecast_times=pd.to_datetime([step['dt'] for step in steps], unit='s', utc=True),
+            cloud_cover=np.array([step['clouds'] for step in steps]),
+            temp_air=np.array([step['temp'] for step in steps]),
+            start=pd.Timestamp(start, tz='UTC'),
+            hours=request.days * 24,
+            panel_efficiency=request.panel_efficiency
+        )
+    return {
+        "location": f"{round(site['lat'], 4)}, {round(site['lon'], 4)}",
+        "roof_area_sqm": round(site['area_sqm'], 2),
+        **simulation,
+        "forecast_issued_at": forecast.get('cached_at'),
+        "meta": {
+            "weather_source": forecast.get('source', 'OpenWeatherMap'),
+            "calculation_timestamp": datetime.utcnow().isoformat()
+        }
+    }, timer.durations
+
+
+@router.post("/calculate", response_model=SimulationResponse)
+async def calculate_simulation(request: SimulationRequest):
+    """
+    Core Calculation Endpoint.
+    Receives Polygon -> Calculates Area -> Fetches Weather -> Runs Physics Engine -> Returns Financials.
+    Enhanced with monthly breakdown, panel layout, and detailed losses.
+
+    Geometry and physics run in the simulation executor, off the event loop.
+    Per-stage latencies are reported in the Server-Timing header and /metrics.
+    """
+    lat_centroid, lon_centroid = _polygon_centroid(request.polygon)
+
+    # 4. Fetch Weather (Mock/Real)
+    weather = await _fetch_weather(lat_centroid, lon_centroid)
+
+    # Identical request against the same weather entry: serve the cached result
+    result_cache = await get_result_cache()
+    cache_key = result_cache.key_for(request, weather)
+    with metrics.stage("result_cache"):
+        result = await result_cache.get(cache_key)
+    if result is not None:
+        result = _from_result_cache(result)
+    else:
+        try:
+            result = await _run_timed(_simulate_site, request, weather)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await result_cache.set(cache_key, result, weather)
+
+    # Write-behind history; never blocks the response
+    get_simulation_writer().enqueue(request, result)
+    return result
+
+
+@router.post("/optimize", response_model=OrientationResponse)
+async def optimize_orientation(request: OrientationRequest):
+    """
+    Orientation Optimizer.
+    Evaluates the annual yield of a tilt x azimuth grid in one vectorized pass
+    (solar position, clear-sky and weather shared by all orientations) and
+    returns the yield surface, the optimum and the near-optimal region.
+    """
+    lat_centroid, lon_centroid = _polygon_centroid(request.polygon)
+    weather = await _fetch_weather(lat_centroid, lon_centroid)
+    try:
+        with metrics.stage("optimize"):
+            return await get_executor().run(_optimize_site, request, weather)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Roofs per executor job when streaming, so big cells still report early
+STREAM_CHUNK_SIZE = 50
+
+
+@router.post("/forecast", response_model=ForecastResponse)
+async def forecast_production(request: ForecastRequest):
+    """
+    Short-term production forecast for one roof: expected kWh per hour (and
+    per local day) for the next `days` days, from the OWM 5-day / 3-hour
+    forecast of the roof's grid cell, interpolated to hourly.
+
+    The forecast is cached per grid cell, so any number of roofs in a cell cost
+    one API call per forecast issue.
+    """
+    lat_centroid, lon_centroid = _polygon_centroid(request.polygon)
+
+    service = await get_weather_service()
+    started = time.perf_counter()
+    forecast = await service.get_forecast(lat_centroid, lon_centroid)
+    metrics.record_stage("weather", time.perf_counter() - started, forecast.get("source"))
+
+    try:
+        return await _run_timed(_forecast_site, request, forecast, datetime.utcnow())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _group_by_cell(
+    batch: BatchSimulationRequest,
+    service
+) -> Tuple[Dict[str, List[Tuple[int, SimulationRequest]]], List[Dict]]:
+    """Groups batch items by weather grid cell; returns (cells, error entries of invalid items)."""
+    cells: Dict[str, List[Tuple[int, SimulationRequest]]] = {}
+    invalid = []
+    for index, item in enumerate(batch.items):
+        try:
+            lat, lon = _polygon_centroid(item.polygon)
+        except HTTPException as e:
+            invalid.append({"index": index, "error": {"status_code": e.status_code, "detail": e.detail}})
+            continue
+        cells.setdefault(service._get_grid_key(lat, lon), []).append((index, item))
+    return cells, invalid
+
+
+async def _run_batch_cells(
+    cells: Dict[str, List[Tuple[int, SimulationRequest]]],
+    chunk_size: Optional[int] = None
+) -> AsyncIterator[List[Dict]]:
+    """
+    Simulates the roofs of every cell and yields each job's entries as soon as
+    it finishes (completion order, not item order).
+
+    Per cell, weather is fetched once (at the cell centre) and cached roofs are
+    served from the result cache; the rest run in the executor, split into jobs
+    of at most `chunk_size` roofs. Weather for all cells is prefetched up front
+    by the weather service's bulk fetcher (bounded concurrency, queued on the
+    OWM rate limiter). A job holds one of pool-size slots from the start of
+    its simulation until its entries are in the queue (also pool-size), so with
+    a slow consumer at most 2 x pool size finished jobs are held in memory and
+    the remaining jobs wait instead of running ahead.
+    """
+    executor = get_executor()
+    service = await get_weather_service()
+    result_cache = await get_result_cache()
+    writer = get_simulation_writer()
+    semaphore = asyncio.Semaphore(executor.max_workers)
+    finished: asyncio.Queue = asyncio.Queue(maxsize=executor.max_workers)
+
+    def cell_centre(members: List[Tuple[int, SimulationRequest]]) -> Tuple[float, float]:
+        lat, lon = _polygon_centroid(members[0][1].polygon)
+        return round(lat, service.GRID_PRECISION), round(lon, service.GRID_PRECISION)
+
+    weather_tasks = await service.fetch_weather_many(cell_centre(members) for members in cells.values())
+
+    async def cell_weather(members: List[Tuple[int, SimulationRequest]]) -> Dict:
+        started = time.perf_counter()
+        weather = await asyncio.shield(weather_tasks[service._get_grid_key(*cell_centre(members))])
+        metrics.record_stage("weather", time.perf_counter() - started, weather.get("source"))
+        return weather
+
+    async def run_job(members: List[Tuple[int, SimulationRequest]], weather: Dict) -> List[Dict]:
+        # Serve previously computed roofs from the result cache (one lookup per job)
+        job_results, misses = [], []
+        keys = {index: result_cache.key_for(item, weather) for index, item in members}
+        with metrics.stage("result_cache"):
+            cached = await result_cache.get_many(keys.values())
+        for index, item in members:
+            if keys[index] in cached:
+                job_results.append({"index": index, "result": _from_result_cache(cached[keys[index]])})
+            else:
+                misses.append((index, item))
+        if misses:
+            computed = await _run_timed(_simulate_cell, misses, weather, admitted=True)
+            with metrics.stage("result_cache"):
+                await result_cache.set_many(
+                    (keys[entry["index"]], entry["result"], weather) for entry in computed if "result" in entry
+                )
+            job_results += computed
+
+        # Write-behind history; never blocks the response
+        requests = dict(members)
+        for entry in job_results:
+            if "result" in entry:
+                writer.enqueue(requests[entry["index"]], entry["result"])
+        return job_results
+
+    async def produce(members: List[Tuple[int, SimulationRequest]]):
+        try:
+            weather = await cell_weather(members)
+        except Exception as e:
+            weather, entries = None, [
+                {"index": index, "error": {"status_code": 502, "detail": f"Weather Error: {e}"}}
+                for index, _ in members
+            ]
+
+        # The slot is released only once the consumer's queue has taken the entries
+        async with semaphore:
+            if weather is not None:
+                try:
+                    entries = await run_job(members, weather)
+                except Exception as e:
+                    entries = [
+                        {"index": index, "error": {"status_code": 500, "detail": f"Simulation Error: {e}"}}
+                        for index, _ in members
+                    ]
+            await finished.put(entries)
+
+    jobs = []
+    for members in cells.values():
+        step = chunk_size or len(members)
+        jobs += [members[start:start + step] for start in range(0, len(members), step)]
+
+    tasks = [asyncio.create_task(produce(members)) for members in jobs]
+    try:
+        for _ in range(len(tasks)):
+            yield await finished.get()
+    finally:
+        # Consumer gone (e.g. client disconnected): stop the remaining jobs
+        for task in tasks + list(weather_tasks.values()):
+            task.cancel()
+
+
+@router.post("/batch", response_model=BatchSimulationResponse)
+async def calculate_batch_simulation(batch: BatchSimulationRequest):
+    """
+    Batch Calculation Endpoint for multi-roof portfolios.
+
+    Roofs are grouped by weather grid cell: weather is fetched once per cell,
+    and solar geometry / transposition is computed once per (cell, tilt, azimuth).
+    Each item gets either a result or an error; one bad polygon does not fail the batch.
+    """
+    get_executor().ensure_capacity()
+
+    cells, invalid = _group_by_cell(batch, await get_weather_service())
+    results: List[Dict] = [{"index": i} for i in range(len(batch.items))]
+    for entry in invalid:
+        results[entry["index"]] = entry
+    async for entries in _run_batch_cells(cells):
+        for entry in entries:
+            results[entry["index"]] = entry
+
+    failed = sum(1 for r in results if "error" in r)
+    return {
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "weather_cells": len(cells),
+        "results": results
+    }
+
+
+@router.post("/batch/stream")
+async def stream_batch_simulation(batch: BatchSimulationRequest, request: Request):
+    """
+    Streaming variant of /batch for large portfolios.
+
+    Emits one event per line (NDJSON), or Server-Sent Events when the client
+    sends `Accept: text/event-stream`:
+        start     {"total", "weather_cells"}
+        result    {"index", "result"}       as soon as the roof is computed
+        error     {"index", "error"}          (no index: the stream itself failed)
+        progress  {"completed", "succeeded", "failed", "total"} after every job
+        done      {"total", "succeeded", "failed", "weather_cells"}
+    Results arrive in completion order; `index` refers to the request item.
+    A client that reads slowly holds back the simulation: at most 2 x pool size
+    finished jobs wait server-side, so memory does not grow with the job.
+    """
+    get_executor().ensure_capacity()
+    cells, invalid = _group_by_cell(batch, await get_weather_service())
+    total = len(batch.items)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    def event(name: str, payload: Dict) -> str:
+        if sse:
+            return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps({"event": name, **payload}) + "\n"
+
+    def item_event(entry: Dict) -> str:
+        item = BatchItemResult.model_validate(entry).model_dump(mode="json", exclude_none=True)
+        return event("result" if "result" in item else "error", item)
+
+    async def events() -> AsyncIterator[str]:
+        counts = {"completed": 0, "succeeded": 0, "failed": 0}
+
+        def count(entries: List[Dict]):
+            counts["completed"] += len(entries)
+            failed = sum(1 for entry in entries if "error" in entry)
+            counts["failed"] += failed
+            counts["succeeded"] += len(entries) - failed
+
+        yield event("start", {"total": total, "weather_cells": len(cells)})
+        for entry in invalid:
+            yield item_event(entry)
+        count(invalid)
+
+        try:
+            async for entries in _run_batch_cells(cells, chunk_size=STREAM_CHUNK_SIZE):
+                for entry in entries:
+                    yield item_event(entry)
+                count(entries)
+                yield event("progress", {**counts, "total": total})
+        except Exception as e:
+            yield event("error", {"error": {"status_code": 500, "detail": f"Batch Error: {e}"}})
+
+        yield event("done", {
+            "total": total, "succeeded": counts["succeeded"],
+            "failed": total - counts["succeeded"], "weather_cells": len(cells)
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1 @@
+"""Offline performance benchmarks for SolarRoute (python -m benchmarks)."""
@@ -0,0 +1,62 @@
+"""
+Benchmark fixtures: representative roof polygons and a stubbed weather entry.
+Everything is generated deterministically, so runs on different machines (or
+before and after an upgrade) measure exactly the same work.
+"""
+
+import numpy as np
+from typing import Dict, List
+
+# Bandung, West Java
+SITE_LAT = -6.9175
+SITE_LON = 107.6191
+
+# Meters per degree at the site
+_M_PER_DEG_LAT = 110_574.0
+_M_PER_DEG_LON = 111_320.0 * np.cos(np.radians(SITE_LAT))
+
+# Weather returned by the stubbed WeatherService (no cached_at: bypasses the result cache)
+STUB_WEATHER: Dict = {
+    "ghi_daily_kwh": 4.8,
+    "temp_avg": 27.5,
+    "source": "benchmark-stub",
+}
+
+
+def _to_latlng(xy: np.ndarray) -> List[List[float]]:
+    """Local (east, north) meters around the site to a [[lat, lng], ...] ring."""
+    lat = SITE_LAT + xy[:, 1] / _M_PER_DEG_LAT
+    lon = SITE_LON + xy[:, 0] / _M_PER_DEG_LON
+    return np.column_stack([lat, lon]).round(8).tolist()
+
+
+def _irregular_ring(vertices: int, radius_m: float, seed: int) -> np.ndarray:
+    """Star-shaped ring with `vertices` points and +-15% radial noise."""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0.0, 2 * np.pi, vertices, endpoint=False)
+    radii = radius_m * (1.0 + rng.uniform(-0.15, 0.15, vertices))
+    return np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])
+
+
+def roof_polygons() -> Dict[str, List[List[float]]]:
+    """
+    Roofs from a small house to a polygon above geometry.MAX_VERTICES
+    (which exercises simplification), keyed by '<kind>_<vertices>'.
+    """
+    house = np.array([[0, 0], [12, 0], [12, 9], [0, 9]], dtype=float)
+    l_shape = np.array([
+        [0, 0], [18, 0], [18, 4], [18, 8], [10, 8], [10, 12],
+        [10, 16], [4, 16], [0, 16], [0, 10], [0, 6], [0, 3],
+    ], dtype=float)
+    return {
+        "house_4": _to_latlng(house),
+        "l_shape_12": _to_latlng(l_shape),
+        "warehouse_64": _to_latlng(_irregular_ring(64, 30.0, seed=1)),
+        "factory_256": _to_latlng(_irregular_ring(256, 60.0, seed=2)),
+        "campus_1024": _to_latlng(_irregular_ring(1024, 120.0, seed=3)),
+    }
+
+
+def simulation_request(polygon: List[List[float]]) -> Dict:
+    """/calculate request body for a roof with default sliders."""
+    return {"polygon": polygon, "bill_idr": 1_500_000, "tilt": 15.0, "azimuth": 0.0}
@@ -0,0 +1,404 @@
+"""
+Performance Benchmark Suite for SolarRoute.
+Micro-benchmarks for every SolarEngine classmethod, the geodesic area, the
+Monte Carlo ensemble and polygon panel packing, plus an end-to-end run of the /calculate handler with WeatherService stubbed, over
+polygon fixtures from a 4-vertex house to a 1024-vertex campus. Runs fully
+offline.
+
+Results are written as JSON; `compare` fails (exit code 1) when the throughput
+of any benchmark drops by more than the threshold against a baseline, so a
+pvlib / pandas / engine upgrade that slows things down is caught before release.
+
+Usage (from backend/):
+    python -m benchmarks run [--output FILE] [--filter TEXT] [--rounds N] [--min-time SECONDS]
+    python -m benchmarks compare BASELINE CURRENT [--threshold FRACTION]
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+from datetime import datetime
+from importlib import metadata
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest.mock import AsyncMock, patch
+import pandas as pd
+from benchmarks.fixtures import SITE_LAT, SITE_LON, STUB_WEATHER, roof_polygons, simulation_request
+
+# Bump when benchmarks are added/changed in a way that makes old results incomparable
+BENCHMARK_VERSION = 1
+
+DEFAULT_ROUNDS = 5
+# Each round repeats the call until it takes at least this long
+DEFAULT_MIN_ROUND_SECONDS = 0.05
+# Allowed throughput drop before `compare` fails (15%)
+DEFAULT_THRESHOLD = 0.15
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Packages whose upgrades the suite is meant to catch
+TRACKED_PACKAGES = ("numpy", "pandas", "pvlib", "shapely", "pyproj", "fastapi", "pydantic")
+
+# Fixtures used for the (slower) layout and end-to-end benchmarks
+LAYOUT_FIXTURES = ("house_4", "l_shape_12", "warehouse_64", "factory_256")
+ENDPOINT_FIXTURES = ("house_4", "warehouse_64", "factory_256", "campus_1024")
+
+AREA_SQM = 120.0
+TILT = 15.0
+AZIMUTH = 0.0
+GHI_DAILY_KWH = STUB_WEATHER["ghi_daily_kwh"]
+TEMP_AVG_C = STUB_WEATHER["temp_avg"]
+
+
+def _solar_engine_benchmarks() -> List[Tuple[str, Callable[[], Any]]]:
+    """
+    One benchmark per SolarEngine classmethod (calculate_energy_output only
+    raises NotImplementedError and is left out). Inputs are prepared once.
+    """
+    from core.solar_engine import SolarEngine
+    from core.geometry import local_timezone, project_polygon
+
+    geometry = SolarEngine.prepare_annual_geometry(SITE_LAT, SITE_LON)
+    ghi, temp_air = SolarEngine.build_hourly_weather(geometry, GHI_DAILY_KWH, TEMP_AVG_C)
+    hourly_yield = SolarEngine.calculate_hourly_yield(geometry, TILT, AZIMUTH, ghi, temp_air)
+    tilts, azimuths = SolarEngine.REFERENCE_TILTS, SolarEngine.REFERENCE_AZIMUTHS
+    yields = SolarEngine.calculate_orientation_sweep(geometry, ghi, temp_air, tilts, azimuths)
+    optimal_yield = SolarEngine.calculate_optimal_yield(geometry, ghi, temp_air)
+    day = pd.date_range(start=pd.Timestamp(SolarEngine.SIMULATION_YEAR, 6, 21), periods=24,
+                        freq='h', tz=local_timezone(SITE_LAT, SITE_LON))
+
+    benchmarks = [
+        ("calculate_cell_temperature", lambda: SolarEngine.calculate_cell_temperature(TEMP_AVG_C, 800.0)),
+        ("calculate_dynamic_pr", lambda: SolarEngine.calculate_dynamic_pr(45.0)),
+        ("calculate_clearsky_transposition", lambda: SolarEngine.calculate_clearsky_transposition(
+            SITE_LAT, SITE_LON, TILT, AZIMUTH, day)),
+        ("get_transposition_factor", lambda: SolarEngine.get_transposition_factor(
+            SITE_LAT, SITE_LON, TILT, AZIMUTH, 6)),
+        ("get_daily_transposition_factor", lambda: SolarEngine.get_daily_transposition_factor(
+            SITE_LAT, SITE_LON, TILT, AZIMUTH, geometry=geometry)),
+        ("get_monthly_transposition_factors", lambda: SolarEngine.get_monthly_transposition_factors(
+            SITE_LAT, SITE_LON, TILT, AZIMUTH)),
+        ("get_monthly_climate_factors", lambda: SolarEngine.get_monthly_climate_factors(SITE_LAT, SITE_LON)),
+        ("calculate_daily_simulation", lambda: SolarEngine.calculate_daily_simulation(
+            SITE_LAT, SITE_LON, AREA_SQM, TILT, AZIMUTH, GHI_DAILY_KWH, TEMP_AVG_C)),
+        ("calculate_monthly_simulation", lambda: SolarEngine.calculate_monthly_simulation(
+            SITE_LAT, SITE_LON, AREA_SQM, TILT, AZIMUTH, GHI_DAILY_KWH, TEMP_AVG_C)),
+        ("get_hourly_times", lambda: SolarEngine.get_hourly_times(SITE_LAT, SITE_LON)),
+        ("prepare_annual_geometry", lambda: SolarEngine.prepare_annual_geometry(SITE_LAT, SITE_LON)),
+        ("build_hourly_weather", lambda: SolarEngine.build_hourly_weather(geometry, GHI_DAILY_KWH, TEMP_AVG_C)),
+        ("calculate_hourly_yield", lambda: SolarEngine.calculate_hourly_yield(
+            geometry, TILT, AZIMUTH, ghi, temp_air)),
+        ("calculate_orientation_sweep", lambda: SolarEngine.calculate_orientation_sweep(
+            geometry, ghi, temp_air, tilts, azimuths)),
+        ("find_optimal_orientation", lambda: SolarEngine.find_optimal_orientation(yields, tilts, azimuths)),
+        ("calculate_optimal_yield", lambda: SolarEngine.calculate_optimal_yield(geometry, ghi, temp_air)),
+        ("get_optimal_yield", lambda: SolarEngine.get_optimal_yield(SITE_LAT, SITE_LON, GHI_DAILY_KWH, TEMP_AVG_C)),
+        ("calculate_orientation_loss", lambda: SolarEngine.calculate_orientation_loss(
+            geometry, ghi, temp_air, TILT, AZIMUTH)),
+        ("calculate_orientation_loss[cached_optimum]", lambda: SolarEngine.calculate_orientation_loss(
+            geometry, ghi, temp_air, TILT, AZIMUTH, optimal_yield=optimal_yield)),
+        ("aggregate_annual_yield", lambda: SolarEngine.aggregate_annual_yield(hourly_yield, AREA_SQM)),
+        ("calculate_annual_simulation", lambda: SolarEngine.calculate_annual_simulation(
+            SITE_LAT, SITE_LON, AREA_SQM, TILT, AZIMUTH, GHI_DAILY_KWH, TEMP_AVG_C)),
+        ("calculate_panel_layout", lambda: SolarEngine.calculate_panel_layout(AREA_SQM, tilt=TILT)),
+        ("calculate_detailed_losses", lambda: SolarEngine.calculate_detailed_losses(
+            SITE_LAT, TILT, AZIMUTH, TEMP_AVG_C)),
+    ]
+
+    polygons = roof_polygons()
+    for name in LAYOUT_FIXTURES:
+        site = project_polygon(polygons[name])
+        benchmarks.append((
+            f"calculate_panel_layout[{name}]",
+            lambda site=site: SolarEngine.calculate_panel_layout(
+                site['area_sqm'], tilt=TILT, roof_polygon=site['projected'], epsg=site['epsg']
+            )
+        ))
+    return [(f"solar_engine.{name}", fn) for name, fn in benchmarks]
+
+
+def _geometry_benchmarks() -> List[Tuple[str, Callable[[], Any]]]:
+    from core.geometry import calculate_geodesic_area
+
+    return [
+        (f"geometry.calculate_geodesic_area[{name}]", lambda polygon=polygon: calculate_geodesic_area(polygon))
+        for name, polygon in roof_polygons().items()
+    ]
+
+
+def _uncertainty_benchmarks() -> List[Tuple[str, Callable[[], Any]]]:
+    """P50/P90 Monte Carlo ensemble on a prepared hourly yield (the /calculate uncertainty stage)."""
+    from core.solar_engine import SolarEngine
+    from core.uncertainty import run_monte_carlo
+
+    geometry = SolarEngine.prepare_annual_geometry(SITE_LAT, SITE_LON)
+    ghi, temp_air = SolarEngine.build_hourly_weather(geometry, GHI_DAILY_KWH, TEMP_AVG_C)
+    hourly_yield = SolarEngine.calculate_hourly_yield(geometry, TILT, AZIMUTH, ghi, temp_air)
+    return [
+        (f"uncertainty.run_monte_carlo[{samples}]", lambda samples=samples: run_monte_carlo(
+            hourly_yield, AREA_SQM, 0.2, system_cost=100e6, tariff=1444.7, samples=samples))
+        for samples in (1_000, 10_000)
+    ]
+
+
+def _panel_packing_benchmarks() -> List[Tuple[str, Callable[[], Any]]]:
+    """Polygon packing of a rotated L-shaped roof traced with 500+ vertices (projected metres)."""
+    import shapely
+    from shapely import affinity
+    from shapely.geometry import Polygon
+    from core.panel_packing import pack_panels
+
+    outline = Polygon([(0, 0), (30, 0), (30, 10), (20, 10), (20, 20), (0, 20)])
+    roof = affinity.rotate(shapely.segmentize(outline, 0.2), 27, origin=(0, 0))
+    return [(
+        "panel_packing.pack_panels[dense_l_shape]",
+        lambda: pack_panels(roof, panel_width_m=1.134, panel_height_m=2.279, setback_m=0.5, row_spacing_m=0.3)
+    )]
+
+
+def _ephemeris_benchmarks() -> List[Tuple[str, Callable[[], Any]]]:
+    """Cold (one pvlib pass) vs warm (LRU hit) ephemeris for the benchmark site."""
+    from core.ephemeris import EphemerisCache, compute_ephemeris
+    from core.geometry import local_timezone
+
+    cache = EphemerisCache()
+    tz = local_timezone(SITE_LAT, SITE_LON)
+    return [
+        ("ephemeris.compute_ephemeris", lambda: compute_ephemeris(SITE_LAT, SITE_LON, tz)),
+        ("ephemeris.EphemerisCache.get", lambda: cache.get(SITE_LAT, SITE_LON)),
+    ]
+
+
+def _endpoint_benchmarks(loop: asyncio.AbstractEventLoop) -> List[Tuple[str, Callable[[], Any]]]:
+    """
+    The /calculate handler end to end (validation, geometry, physics, layout,
+    financials) with weather stubbed. The stub carries no cache version, so the
+    result cache never short-circuits the work.
+    """
+    from api.v1.endpoints.simulation import calculate_simulation
+    from models.schemas import SimulationRequest
+
+    polygons = roof_polygons()
+    benchmarks = []
+    for name in ENDPOINT_FIXTURES:
+        body = simulation_request(polygons[name])
+        benchmarks.append((
+            f"api.calculate_simulation[{name}]",
+            lambda body=body: loop.run_until_complete(calculate_simulation(SimulationRequest(**body)))
+        ))
+    return benchmarks
+
+
+def measure(fn: Callable[[], Any], rounds: int = DEFAULT_ROUNDS,
+            min_round_seconds: float = DEFAULT_MIN_ROUND_SECONDS) -> Dict[str, float]:
+    """
+    Timing statistics for one benchmark, in seconds per call.
+
+    One warm-up call (lazy imports, caches), then the iteration count is
+    calibrated so a round lasts at least `min_round_seconds`, then `rounds`
+    rounds are timed with the garbage collector off (as timeit does).
+    Throughput is derived from the median round.
+    """
+    fn()
+
+    def timed(iterations: int) -> float:
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            return time.perf_counter() - started
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    iterations = 1
+    elapsed = timed(iterations)
+    while elapsed < min_round_seconds and iterations < 1_000_000:
+        scale = min_round_seconds / max(elapsed, 1e-9)
+        iterations = min(1_000_000, max(iterations * 2, int(iterations * scale * 1.2)))
+        elapsed = timed(iterations)
+
+    per_call = [timed(iterations) / iterations for _ in range(rounds)]
+    median = statistics.median(per_call)
+    return {
+        "iterations": iterations,
+        "rounds": rounds,
+        "min_s": min(per_call),
+        "median_s": median,
+        "mean_s": statistics.fmean(per_call),
+        "stdev_s": statistics.stdev(per_call) if rounds > 1 else 0.0,
+        "ops_per_sec": 1.0 / median if median > 0 else float("inf"),
+    }
+
+
+def environment(executor_mode: str) -> Dict[str, Any]:
+    """Interpreter, package versions and optional data files the numbers depend on."""
+    from core.climatology import get_climatology
+    from core.transposition_table import get_transposition_table
+
+    packages = {}
+    for package in TRACKED_PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "packages": packages,
+        "executor": executor_mode,
+        "transposition_table": get_transposition_table() is not None,
+        "climatology": get_climatology() is not None,
+    }
+
+
+def run(name_filter: Optional[str] = None, rounds: int = DEFAULT_ROUNDS,
+        min_round_seconds: float = DEFAULT_MIN_ROUND_SECONDS) -> Dict[str, Any]:
+    """Runs every benchmark whose name contains `name_filter`; returns the results document."""
+    from api.v1.endpoints import simulation
+    from core.executor import SimulationExecutor
+
+    # Measure the computation itself, not process-pool transfer, unless asked to
+    executor = SimulationExecutor(mode=os.getenv("BENCHMARK_EXECUTOR", "inline"))
+    stubs = [
+        patch.object(simulation, "get_weather_data", new=AsyncMock(return_value=dict(STUB_WEATHER))),
+        patch.object(simulation, "get_executor", return_value=executor),
+    ]
+    loop = asyncio.new_event_loop()
+    for stub in stubs:
+        stub.start()
+    try:
+        benchmarks = (_solar_engine_benchmarks() + _geometry_benchmarks() + _uncertainty_benchmarks()
+                      + _panel_packing_benchmarks() + _ephemeris_benchmarks() + _endpoint_benchmarks(loop))
+        results = {}
+        for name, fn in benchmarks:
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = measure(fn, rounds, min_round_seconds)
+            print(f"{name:<60} {results[name]['ops_per_sec']:>12.1f} ops/s "
+                  f"({results[name]['median_s'] * 1e3:.3f} ms)")
+    finally:
+        for stub in stubs:
+            stub.stop()
+        loop.close()
+        executor.shutdown()
+
+    return {
+        "version": BENCHMARK_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": environment(executor.mode),
+        "settings": {"rounds": rounds, "min_round_seconds": min_round_seconds, "filter": name_filter},
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> Dict[str, Any]:
+    """
+    Throughput change per benchmark, current vs baseline.
+
+    Each row's status is 'regressed' (ops/s dropped by more than `threshold`),
+    'improved' (rose by more than `threshold`), 'ok', 'new' (not in the
+    baseline) or 'missing' (not in the current run). Returns the rows and the
+    names of the regressed benchmarks.
+    """
+    base, cur = baseline.get("benchmarks", {}), current.get("benchmarks", {})
+    rows = []
+    for name in sorted(set(base) | set(cur)):
+        if name not in base:
+            rows.append({"name": name, "status": "new", "current_ops": cur[name]["ops_per_sec"]})
+            continue
+        if name not in cur:
+            rows.append({"name": name, "status": "missing", "baseline_ops": base[name]["ops_per_sec"]})
+            continue
+        change = cur[name]["ops_per_sec"] / base[name]["ops_per_sec"] - 1.0
+        if change < -threshold:
+            status = "regressed"
+        elif change > threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({
+            "name": name, "status": status, "change": change,
+            "baseline_ops": base[name]["ops_per_sec"], "current_ops": cur[name]["ops_per_sec"],
+        })
+    return {
+        "threshold": threshold,
+        "rows": rows,
+        "regressions": [row["name"] for row in rows if row["status"] == "regressed"],
+    }
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _print_environment_changes(baseline: Dict[str, Any], current: Dict[str, Any]):
+    before, after = baseline.get("environment", {}), current.get("environment", {})
+    flat_before = {**{k: v for k, v in before.items() if k != "packages"}, **before.get("packages", {})}
+    flat_after = {**{k: v for k, v in after.items() if k != "packages"}, **after.get("packages", {})}
+    for key in sorted(set(flat_before) | set(flat_after)):
+        if flat_before.get(key) != flat_after.get(key):
+            print(f"  environment: {key} {flat_before.get(key)} -> {flat_after.get(key)}")
+    if baseline.get("version") != current.get("version"):
+        print(f"[WARN] Benchmark suite version differs ({baseline.get('version')} -> {current.get('version')})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SolarRoute performance benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and write results as JSON")
+    run_parser.add_argument("--output", help="Results file (default: benchmarks/results/bench-<timestamp>.json)")
+    run_parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    run_parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed rounds per benchmark")
+    run_parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_ROUND_SECONDS,
+                            help="Minimum duration of one round in seconds")
+
+    compare_parser = commands.add_parser("compare", help="Fail if throughput regressed against a baseline")
+    compare_parser.add_argument("baseline", help="Baseline results JSON")
+    compare_parser.add_argument("current", help="Current results JSON")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Allowed fractional throughput drop (default: 0.15)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        document = run(args.filter, args.rounds, args.min_time)
+        output = args.output or os.path.join(
+            DEFAULT_RESULTS_DIR, f"bench-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"[OK] Wrote {len(document['benchmarks'])} results to {output}")
+        return 0
+
+    baseline, current = _load(args.baseline), _load(args.current)
+    report = compare(baseline, current, args.threshold)
+    _print_environment_changes(baseline, current)
+    for row in report["rows"]:
+        if "change" in row:
+            print(f"{row['name']:<60} {row['baseline_ops']:>12.1f} -> {row['current_ops']:>12.1f} ops/s "
+                  f"{row['change']:>+8.1%}  {row['status']}")
+        else:
+            print(f"{row['name']:<60} {row['status']}")
+
+    if report["regressions"]:
+        print(f"[FAIL] {len(report['regressions'])} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print(f"[OK] No throughput regression beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+In-process caching primitives for SolarRoute.
+A bounded TTL + LRU cache used as the L1 tier in front of Redis.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Bounded in-memory cache with per-entry TTL and LRU eviction.
+
+    Not thread-safe; intended for use from a single asyncio event loop.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the value and marks it most recently used, or `default` if missing/expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Stores a value; `ttl_seconds` overrides the default TTL for this entry."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def ttl(self, key: Hashable) -> Optional[float]:
+        """Remaining seconds to live for a key, or None if missing/expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        remaining = entry[1] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,99 @@
+"""
+Binary Cache Encoding for SolarRoute.
+Compact encodings for the weather, forecast and simulation result entries kept
+in Redis. Every value starts with a one-byte format version; a value in any
+other format (including the JSON strings written by earlier releases) decodes
+to None and is treated as a cache miss, so changing a format needs no flush.
+"""
+
+import json
+import struct
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Bump a format when its layout changes
+WEATHER_FORMAT = 1
+FORECAST_FORMAT = 1
+RESULT_FORMAT = 1
+
+# Timestamps are naive UTC datetimes, stored as microseconds since the epoch
+# so that cached_at (the weather version in result cache keys) round-trips exactly
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# format, cached_at, ghi_daily_kwh, temp_avg (25 bytes; JSON took ~85)
+_WEATHER = struct.Struct("<Bqdd")
+# format, cached_at, step count; then per step: dt (unix seconds), temp, clouds
+_FORECAST_HEADER = struct.Struct("<BqH")
+_FORECAST_STEP = struct.Struct("<qff")
+# format, expires_at; then the zlib-compressed JSON response
+_RESULT_HEADER = struct.Struct("<Bq")
+
+
+def _to_micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + value * _MICROSECOND
+
+
+def _has_format(payload: Optional[bytes], version: int) -> bool:
+    return bool(payload) and payload[0] == version
+
+
+def encode_weather(ghi_daily_kwh: float, temp_avg: float, cached_at: datetime) -> bytes:
+    return _WEATHER.pack(WEATHER_FORMAT, _to_micros(cached_at), ghi_daily_kwh, temp_avg)
+
+
+def decode_weather(payload: Optional[bytes]) -> Optional[Dict]:
+    """{"ghi_daily_kwh", "temp_avg", "cached_at"}, or None for a value in another format."""
+    if not _has_format(payload, WEATHER_FORMAT):
+        return None
+    try:
+        _, cached_at, ghi, temp = _WEATHER.unpack(payload)
+    except struct.error:
+        return None
+    return {"ghi_daily_kwh": ghi, "temp_avg": temp, "cached_at": _from_micros(cached_at)}
+
+
+def encode_forecast(steps: List[Dict], cached_at: datetime) -> bytes:
+    parts = [_FORECAST_HEADER.pack(FORECAST_FORMAT, _to_micros(cached_at), len(steps))]
+    parts += [_FORECAST_STEP.pack(step["dt"], step["temp"], step["clouds"]) for step in steps]
+    return b"".join(parts)
+
+
+def decode_forecast(payload: Optional[bytes]) -> Optional[Dict]:
+    """{"steps", "cached_at"}, or None for a value in another format."""
+    if not _has_format(payload, FORECAST_FORMAT):
+        return None
+    try:
+        _, cached_at, count = _FORECAST_HEADER.unpack_from(payload)
+        steps = [
+            # float32 on the wire; OWM reports two decimals
+            {"dt": dt, "temp": round(temp, 2), "clouds": round(clouds, 2)}
+            for dt, temp, clouds in _FORECAST_STEP.iter_unpack(payload[_FORECAST_HEADER.size:])
+        ]
+    except struct.error:
+        return None
+    if len(steps) != count:
+        return None
+    return {"steps": steps, "cached_at": _from_micros(cached_at)}
+
+
+def encode_result(result: Dict, expires_at: datetime) -> bytes:
+    body = json.dumps(result, default=str, separators=(",", ":")).encode()
+    return _RESULT_HEADER.pack(RESULT_FORMAT, _to_micros(expires_at)) + zlib.compress(body)
+
+
+def decode_result(payload: Optional[bytes]) -> Optional[Tuple[Dict, datetime]]:
+    """(response, expires_at), or None for a value in another format."""
+    if not _has_format(payload, RESULT_FORMAT):
+        return None
+    try:
+        _, expires_at = _RESULT_HEADER.unpack_from(payload)
+        result = json.loads(zlib.decompress(payload[_RESULT_HEADER.size:]))
+    except (struct.error, zlib.error, ValueError):
+        return None
+    return result, _from_micros(expires_at)
@@ -0,0 +1,187 @@
+"""
+Refresh-ahead Weather Cache Warmer for SolarRoute.
+Tracks how often each weather grid cell is requested and, shortly before the
+cached entries of the most popular cells expire, refetches them in the
+background within an OpenWeatherMap call budget. Busy regions then never see
+a cold fetch; only rarely used cells pay the API latency.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from core.weather_service import WeatherService, get_weather_service
+
+load_dotenv()
+
+
+class CacheWarmer:
+    """
+    Popularity-driven refresh-ahead for WeatherService grid cells.
+
+    Request counts decay exponentially (half-life DECAY_HALF_LIFE_SECONDS) so the
+    ranking follows current traffic. Refreshes are paced by a token bucket of
+    `calls_per_minute` API calls.
+
+    Configuration (environment):
+        WEATHER_WARMER                 true | false (default: true)
+        WARMER_TOP_N                   cells kept warm (default: 50)
+        WARMER_CALLS_PER_MINUTE        OWM budget for refreshes (default: 20)
+        WARMER_REFRESH_AHEAD_SECONDS   refresh when an entry expires within this (default: 600)
+        WARMER_INTERVAL_SECONDS        how often the warmer wakes up (default: 30)
+    """
+
+    DECAY_HALF_LIFE_SECONDS = 3600
+    # Cells need a few recent requests before they are worth an API call
+    MIN_SCORE = 2.0
+    MAX_TRACKED_CELLS = 10000
+
+    def __init__(
+        self,
+        weather_service: WeatherService,
+        top_n: Optional[int] = None,
+        calls_per_minute: Optional[float] = None,
+        refresh_ahead_seconds: Optional[float] = None,
+        interval_seconds: Optional[float] = None
+    ):
+        self.weather_service = weather_service
+        self.enabled = os.getenv("WEATHER_WARMER", "true").lower() == "true"
+        self.top_n = top_n or int(os.getenv("WARMER_TOP_N", 50))
+        self.calls_per_minute = calls_per_minute or float(os.getenv("WARMER_CALLS_PER_MINUTE", 20))
+        self.refresh_ahead = timedelta(
+            seconds=refresh_ahead_seconds or float(os.getenv("WARMER_REFRESH_AHEAD_SECONDS", 600))
+        )
+        self.interval_seconds = interval_seconds or float(os.getenv("WARMER_INTERVAL_SECONDS", 30))
+
+        # grid key -> {lat, lon, score, scored_at, expires_at}
+        self._cells: Dict[str, Dict] = {}
+        # grid key -> expiry of the entry a refresh replaced, until the next request
+        self._replaced_expiry: Dict[str, datetime] = {}
+        self._tokens = self.calls_per_minute
+        self._refilled_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"refreshes": 0, "refresh_errors": 0, "requests_saved": 0, "skipped_budget": 0}
+
+    def _decayed_score(self, cell: Dict, now: float) -> float:
+        return cell["score"] * 0.5 ** ((now - cell["scored_at"]) / self.DECAY_HALF_LIFE_SECONDS)
+
+    def record(self, grid_key: str, lat: float, lon: float, weather: Dict):
+        """Counts a request for a grid cell (called by WeatherService.get_weather_data)."""
+        now = time.monotonic()
+        cell = self._cells.get(grid_key)
+        if cell is None:
+            cell = self._cells[grid_key] = {"lat": lat, "lon": lon, "score": 0.0, "scored_at": now}
+        cell["score"] = self._decayed_score(cell, now) + 1.0
+        cell["scored_at"] = now
+        cell["expires_at"] = self.weather_service.get_entry_expiry(weather)
+
+        # Served after the replaced entry would have expired: a cold fetch avoided
+        replaced = self._replaced_expiry.pop(grid_key, None)
+        if replaced is not None and datetime.utcnow() >= replaced:
+            self.counters["requests_saved"] += 1
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            self.calls_per_minute,
+            self._tokens + (now - self._refilled_at) * self.calls_per_minute / 60.0
+        )
+        self._refilled_at = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def due_cells(self) -> List[Tuple[str, Dict]]:
+        """Top-N cells by popularity whose entries expire within the refresh-ahead window."""
+        now = time.monotonic()
+        deadline = datetime.utcnow() + self.refresh_ahead
+        scored = [
+            (self._decayed_score(cell, now), key, cell)
+            for key, cell in self._cells.items()
+        ]
+        top = heapq.nlargest(self.top_n, scored, key=lambda item: item[0])
+        return [
+            (key, cell) for score, key, cell in top
+            if score >= self.MIN_SCORE and cell.get("expires_at") is not None and cell["expires_at"] <= deadline
+        ]
+
+    def _prune(self):
+        """Drops the least popular cells once more than MAX_TRACKED_CELLS are tracked."""
+        if len(self._cells) <= self.MAX_TRACKED_CELLS:
+            return
+        now = time.monotonic()
+        keep = heapq.nlargest(
+            self.MAX_TRACKED_CELLS, self._cells.items(),
+            key=lambda item: self._decayed_score(item[1], now)
+        )
+        self._cells = dict(keep)
+        self._replaced_expiry = {k: v for k, v in self._replaced_expiry.items() if k in self._cells}
+
+    async def run_once(self) -> int:
+        """Refreshes due cells, most popular first, while the budget allows. Returns refreshes made."""
+        self._prune()
+        refreshed = 0
+        for grid_key, cell in self.due_cells():
+            if not self._take_token():
+                self.counters["skipped_budget"] += 1
+                continue
+            previous_expiry = cell["expires_at"]
+            try:
+                weather = await self.weather_service.refresh_weather(cell["lat"], cell["lon"])
+            except Exception as e:
+                self.counters["refresh_errors"] += 1
+                print(f"Cache warmer refresh failed for {grid_key}: {e}")
+                continue
+            cell["expires_at"] = self.weather_service.get_entry_expiry(weather)
+            self._replaced_expiry[grid_key] = previous_expiry
+            self.counters["refreshes"] += 1
+            refreshed += 1
+        return refreshed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                refreshed = await self.run_once()
+                if refreshed:
+                    print(f"Cache warmer refreshed {refreshed} cells "
+                          f"({self.counters['requests_saved']} cold fetches saved so far)")
+            except Exception as e:
+                print(f"Cache warmer error: {e}")
+
+    def start(self):
+        """Attaches to the weather service and starts the background loop (app startup)."""
+        if not self.enabled or self._task is not None:
+            return
+        self.weather_service.warmer = self
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the background loop (app shutdown)."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.weather_service.warmer = None
+
+    def stats(self) -> Dict:
+        return {**self.counters, "tracked_cells": len(self._cells)}
+
+
+# Singleton instance
+_warmer: Optional[CacheWarmer] = None
+
+async def get_cache_warmer() -> CacheWarmer:
+    """Get or create CacheWarmer singleton."""
+    global _warmer
+    if _warmer is None:
+        _warmer = CacheWarmer(await get_weather_service())
+    return _warmer
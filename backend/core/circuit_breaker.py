@@ -0,0 +1,102 @@
+"""
+Circuit Breaker for SolarRoute.
+Stops calling an upstream API (OpenWeatherMap) after consecutive failures or
+timeouts, so requests fall back at once instead of each waiting for the HTTP
+timeout. After a cool-down one probe call is let through (half-open); its
+outcome closes the circuit again or keeps it open for another cool-down.
+"""
+
+import os
+import math
+import time
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Weather API circuit open, not calling upstream.")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker: closed -> open -> half-open -> closed.
+
+    Not thread-safe; intended for use from a single asyncio event loop.
+
+    Configuration (environment):
+        OWM_BREAKER_FAILURES         consecutive failures that open the circuit (default: 5)
+        OWM_BREAKER_RESET_SECONDS    cool-down before the half-open probe (default: 30)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_seconds: Optional[float] = None):
+        self.failure_threshold = failure_threshold or int(os.getenv("OWM_BREAKER_FAILURES", 5))
+        self.reset_seconds = reset_seconds or float(os.getenv("OWM_BREAKER_RESET_SECONDS", 30))
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+        self.counters = {"opened": 0, "rejected": 0, "probes": 0}
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go upstream now. In half-open state only one probe
+        is in flight at a time; a probe that never reports back is replaced
+        after another cool-down.
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now >= self._opened_at + self.reset_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and now >= self._probe_started_at + self.reset_seconds:
+            self._probe_started_at = now
+            self.counters["probes"] += 1
+            return True
+        self.counters["rejected"] += 1
+        return False
+
+    def check(self):
+        """Raises CircuitOpenError unless a call may go upstream now."""
+        if not self.allow():
+            raise CircuitOpenError(self.retry_after())
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe may be let through."""
+        if self.state == self.CLOSED:
+            return 0.0
+        start = self._opened_at if self.state == self.OPEN else self._probe_started_at
+        return max(0.0, start + self.reset_seconds - time.monotonic())
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            print("Weather API recovered; circuit closed.")
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+            if self.state == self.CLOSED:
+                print(f"Weather API failed {self._failures} times in a row; "
+                      f"circuit open for {self.reset_seconds:.0f}s.")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started_at = 0.0
+            self.counters["opened"] += 1
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+
+    def stats(self) -> Dict:
+        return {**self.counters, "state": self.state, "consecutive_failures": self._failures}
@@ -0,0 +1,211 @@
+"""
+Offline Monthly Climatology Grid for SolarRoute.
+
+A gridded long-term monthly climatology over Indonesia (daily GHI, air
+temperature and optionally diffuse fraction per month) replaces the single
+nationwide set of seasonal factors. The grid is stored as a raw float32 .npy
+array plus a small JSON header and memory-mapped read-only, so every uvicorn
+worker shares the same OS page-cache pages and a lookup touches only the four
+grid nodes around the site.
+
+Build the grid from a CSV of gridded monthly means (e.g. exported from the
+NASA POWER climatology API) with:
+    python -m core.climatology --csv climatology.csv --output data/climatology_v1.npy
+
+CSV columns: lat, lon, month, ghi_daily_kwh, temp_c[, diffuse_fraction]
+"""
+
+import os
+import csv
+import json
+import argparse
+import numpy as np
+from typing import Dict, List, Optional
+
+# Bump whenever the file layout changes.
+CLIMATOLOGY_VERSION = 1
+
+REQUIRED_VARIABLES = ('ghi_daily_kwh', 'temp_c')
+OPTIONAL_VARIABLES = ('diffuse_fraction',)
+
+DEFAULT_CLIMATOLOGY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data', f'climatology_v{CLIMATOLOGY_VERSION}.npy'
+)
+
+
+def header_path(path: str) -> str:
+    """JSON header stored next to the data file."""
+    return os.path.splitext(path)[0] + '.json'
+
+
+class ClimatologyGrid:
+    """
+    Monthly climatology on a (lat, lon) grid with bilinear interpolation.
+
+    `data` has shape (variables, 12, lat, lon). NaN nodes (e.g. open sea) are
+    skipped and the remaining corner weights renormalized.
+    """
+
+    def __init__(self, data: np.ndarray, lat_axis: np.ndarray, lon_axis: np.ndarray,
+                 variables: List[str], version: int = CLIMATOLOGY_VERSION):
+        self.data = data
+        self.lat_axis = np.asarray(lat_axis, dtype=float)
+        self.lon_axis = np.asarray(lon_axis, dtype=float)
+        self.variables = list(variables)
+        self.version = version
+
+    @classmethod
+    def from_arrays(
+        cls,
+        lat_axis: np.ndarray,
+        lon_axis: np.ndarray,
+        ghi_daily_kwh: np.ndarray,
+        temp_c: np.ndarray,
+        diffuse_fraction: Optional[np.ndarray] = None
+    ) -> "ClimatologyGrid":
+        """Builds a grid from (12, lat, lon) arrays per variable."""
+        variables = list(REQUIRED_VARIABLES)
+        planes = [ghi_daily_kwh, temp_c]
+        if diffuse_fraction is not None:
+            variables.append('diffuse_fraction')
+            planes.append(diffuse_fraction)
+
+        expected = (12, len(lat_axis), len(lon_axis))
+        for name, plane in zip(variables, planes):
+            if np.shape(plane) != expected:
+                raise ValueError(f"{name} must have shape {expected}, got {np.shape(plane)}")
+        return cls(np.stack(planes).astype(np.float32), lat_axis, lon_axis, variables)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ClimatologyGrid":
+        """Builds a grid from a CSV with one row per (lat, lon, month)."""
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        if not rows:
+            raise ValueError(f"{path} contains no rows")
+
+        lat_axis = np.unique([float(r['lat']) for r in rows])
+        lon_axis = np.unique([float(r['lon']) for r in rows])
+        variables = list(REQUIRED_VARIABLES) + [v for v in OPTIONAL_VARIABLES if v in rows[0]]
+
+        data = np.full((len(variables), 12, len(lat_axis), len(lon_axis)), np.nan, dtype=np.float32)
+        for r in rows:
+            i = np.searchsorted(lat_axis, float(r['lat']))
+            j = np.searchsorted(lon_axis, float(r['lon']))
+            month = int(r['month']) - 1
+            for v, name in enumerate(variables):
+                if r.get(name) not in (None, ''):
+                    data[v, month, i, j] = float(r[name])
+        return cls(data, lat_axis, lon_axis, variables)
+
+    def save(self, path: str):
+        """Writes the raw .npy array and its JSON header."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.save(path, np.ascontiguousarray(self.data, dtype=np.float32))
+        with open(header_path(path), 'w') as f:
+            json.dump({
+                'version': self.version,
+                'variables': self.variables,
+                'lat': self.lat_axis.tolist(),
+                'lon': self.lon_axis.tolist(),
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "ClimatologyGrid":
+        """Memory-maps a grid written by `save`. Raises ValueError on version or shape mismatch."""
+        with open(header_path(path)) as f:
+            header = json.load(f)
+        if header['version'] != CLIMATOLOGY_VERSION:
+            raise ValueError(
+                f"Climatology version {header['version']} does not match "
+                f"expected version {CLIMATOLOGY_VERSION}"
+            )
+
+        data = np.load(path, mmap_mode='r')
+        expected = (len(header['variables']), 12, len(header['lat']), len(header['lon']))
+        if data.shape != expected:
+            raise ValueError(f"Climatology data shape {data.shape} does not match header {expected}")
+        return cls(data, np.array(header['lat']), np.array(header['lon']),
+                   header['variables'], header['version'])
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        """Whether a site lies inside the grid's bounding box."""
+        return (self.lat_axis[0] <= latitude <= self.lat_axis[-1]
+                and self.lon_axis[0] <= longitude <= self.lon_axis[-1])
+
+    @staticmethod
+    def _bracket(axis: np.ndarray, value: float):
+        """Returns (lower index, upper index, weight of upper) for a value on an axis."""
+        if len(axis) == 1:
+            return 0, 0, 0.0
+        upper = int(np.clip(np.searchsorted(axis, value, side='right'), 1, len(axis) - 1))
+        lower = upper - 1
+        weight = (value - axis[lower]) / (axis[upper] - axis[lower])
+        return lower, upper, float(np.clip(weight, 0.0, 1.0))
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Bilinearly interpolated monthly values at a site.
+
+        Returns {variable: float array of 12 months}, or None outside the grid
+        or where all four surrounding nodes are missing.
+        """
+        if not self.contains(latitude, longitude):
+            return None
+
+        i0, i1, wi = self._bracket(self.lat_axis, latitude)
+        j0, j1, wj = self._bracket(self.lon_axis, longitude)
+
+        # (variables, 12, 2, 2) block; only these pages are read from the map
+        block = np.asarray(self.data[:, :, [i0, i1]][:, :, :, [j0, j1]], dtype=float)
+        weights = np.array([[(1 - wi) * (1 - wj), (1 - wi) * wj],
+                            [wi * (1 - wj), wi * wj]])
+
+        valid = ~np.isnan(block)
+        weighted = np.where(valid, block, 0.0) * weights
+        total_weight = (valid * weights).sum(axis=(-2, -1))
+        if not (total_weight[:len(REQUIRED_VARIABLES)] > 0).all():
+            return None
+
+        values = np.divide(weighted.sum(axis=(-2, -1)), total_weight,
+                           out=np.full(total_weight.shape, np.nan), where=total_weight > 0)
+        return {name: values[v] for v, name in enumerate(self.variables)}
+
+
+# Lazily loaded singleton, False marks "tried and unavailable"
+_grid = None
+
+def get_climatology() -> Optional[ClimatologyGrid]:
+    """Get the process-wide grid, or None if no (valid) grid file exists."""
+    global _grid
+    if _grid is None:
+        path = os.getenv("CLIMATOLOGY_PATH", DEFAULT_CLIMATOLOGY_PATH)
+        try:
+            _grid = ClimatologyGrid.load(path)
+        except FileNotFoundError:
+            print(f"Climatology grid not found at {path}. Using built-in seasonal factors.")
+            _grid = False
+        except Exception as e:
+            print(f"Climatology grid load failed: {e}. Using built-in seasonal factors.")
+            _grid = False
+    return _grid or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the SolarRoute monthly climatology grid.")
+    parser.add_argument('--csv', required=True, help="Input CSV (lat, lon, month, ghi_daily_kwh, temp_c[, diffuse_fraction])")
+    parser.add_argument('--output', default=DEFAULT_CLIMATOLOGY_PATH, help="Output .npy path")
+    args = parser.parse_args()
+
+    grid = ClimatologyGrid.from_csv(args.csv)
+    grid.save(args.output)
+
+    missing = int(np.isnan(grid.data[0]).any(axis=0).sum())
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"[OK] Wrote {args.output} ({size_mb:.2f} MB), grid {len(grid.lat_axis)}x{len(grid.lon_axis)}, "
+          f"variables {grid.variables}, {missing} nodes with missing months")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Shared Solar Ephemeris Cache for SolarRoute.
+
+Solar position and clear-sky irradiance for the simulation year depend only
+on where the site is, so every roof in the same 0.1 degree grid cell (about
+11 km, well below the weather cell) shares one ephemeris. Each cell holds
+compact float32 arrays indexed by (day-of-year, local hour) in the site's own
+time zone (WIB/WITA/WIT), computed lazily and kept in a bounded LRU so hot
+cells skip the pvlib solar-position and clear-sky passes entirely.
+
+The cache is per process: with the process executor every worker keeps its
+own LRU.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pvlib
+from typing import Dict, Sequence, Tuple
+from core import metrics
+from core.geometry import local_timezone
+from core.transposition_table import REFERENCE_YEAR
+
+# 0.1 degree grid cells; solar position varies < 0.1 degree across a cell
+CELLS_PER_DEGREE = 10
+DAYS_PER_YEAR = 365
+HOURS_PER_DAY = 24
+FIELDS = ('solar_zenith', 'solar_azimuth', 'clearsky_ghi', 'clearsky_dni', 'clearsky_dhi')
+# 5 fields x 8760 hours x 4 bytes = ~175 KB per cell
+DEFAULT_MAX_CELLS = 128
+
+
+def grid_cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    """Integer index of the 0.1 degree cell whose center is nearest the site."""
+    return int(round(latitude * CELLS_PER_DEGREE)), int(round(longitude * CELLS_PER_DEGREE))
+
+
+def hourly_times(tz: str) -> pd.DatetimeIndex:
+    """
+    Local hourly timestamps of the reference year, stamped at mid-hour so each
+    sample represents the average of its hour.
+    """
+    return pd.date_range(
+        start=pd.Timestamp(REFERENCE_YEAR, 1, 1, 0, 30),
+        periods=DAYS_PER_YEAR * HOURS_PER_DAY, freq='h', tz=tz
+    )
+
+
+def compute_ephemeris(latitude: float, longitude: float, tz: str) -> np.ndarray:
+    """
+    One pvlib solar-position and clear-sky pass over the reference year.
+
+    Returns:
+        float32 array of shape (len(FIELDS), 365 * 24), rows ordered as FIELDS
+    """
+    times = hourly_times(tz)
+    site_location = pvlib.location.Location(latitude, longitude)
+    solpos = site_location.get_solarposition(times)
+    clearsky = site_location.get_clearsky(times, solar_position=solpos)
+    return np.stack([
+        solpos['apparent_zenith'].values,
+        solpos['azimuth'].values,
+        clearsky['ghi'].values,
+        clearsky['dni'].values,
+        clearsky['dhi'].values,
+    ]).astype(np.float32)
+
+
+class EphemerisCache:
+    """
+    Bounded LRU of per-cell ephemerides, safe to share between threads.
+
+    Entries are read-only, so callers may slice them freely but must copy
+    before modifying.
+    """
+
+    def __init__(self, max_cells: int = DEFAULT_MAX_CELLS):
+        self.max_cells = max_cells
+        self._data: "OrderedDict[Tuple[int, int], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, latitude: float, longitude: float) -> Dict:
+        """
+        Ephemeris of the cell containing the site: float32 arrays of length
+        8760 keyed by FIELDS, plus 'timezone' and the cell center 'lat'/'lon'.
+        """
+        key = grid_cell(latitude, longitude)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+        metrics.record_cache_lookup("ephemeris", "l1", entry is not None)
+        if entry is not None:
+            return entry
+
+        # Computed outside the lock; concurrent misses on one cell just race to store it
+        lat, lon = key[0] / CELLS_PER_DEGREE, key[1] / CELLS_PER_DEGREE
+        tz = local_timezone(lat, lon)
+        data = compute_ephemeris(lat, lon, tz)
+        data.setflags(write=False)
+        entry = {'timezone': tz, 'lat': lat, 'lon': lon}
+        entry.update(zip(FIELDS, data))
+
+        with self._lock:
+            self.misses += 1
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_cells:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def days(self, latitude: float, longitude: float, days_of_year: Sequence[int]) -> Dict[str, np.ndarray]:
+        """
+        The 24 local hours of each given day (1-based), concatenated in order,
+        as float64 arrays keyed by FIELDS.
+        """
+        entry = self.get(latitude, longitude)
+        hours = (
+            (np.asarray(days_of_year, dtype=int) - 1)[:, None] * HOURS_PER_DAY + np.arange(HOURS_PER_DAY)
+        ).ravel()
+        return {field: entry[field][hours].astype(float) for field in FIELDS}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cells": len(self._data),
+            "max_cells": self.max_cells,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_cache = None
+
+def get_ephemeris_cache() -> EphemerisCache:
+    """Get the process-wide ephemeris cache."""
+    global _cache
+    if _cache is None:
+        _cache = EphemerisCache(max_cells=int(os.getenv("EPHEMERIS_CACHE_CELLS", DEFAULT_MAX_CELLS)))
+    return _cache
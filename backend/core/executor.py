@@ -0,0 +1,141 @@
+"""
+Simulation Executor for SolarRoute.
+Runs CPU-bound engine stages (geometry, pvlib, numpy) off the asyncio event loop
+in a bounded process or thread pool, so one slow simulation cannot stall
+cheap requests on the same uvicorn worker.
+"""
+
+import os
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from dotenv import load_dotenv
+from prometheus_client import Gauge
+from core import metrics
+
+load_dotenv()
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the in-flight queue is full. Mapped to 503 + Retry-After."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Simulation capacity exhausted, retry later.")
+        self.retry_after = retry_after
+
+
+class SimulationExecutor:
+    """
+    Bounded executor for engine work.
+
+    Configuration (environment):
+        SIMULATION_EXECUTOR     process | thread | inline (default: process)
+        SIMULATION_WORKERS      pool size (default: CPU count)
+        SIMULATION_MAX_QUEUE    jobs allowed to wait for a worker (default: 4 x workers)
+        SIMULATION_RETRY_AFTER  Retry-After seconds sent with 503 (default: 1)
+    """
+
+    MODES = ("process", "thread", "inline")
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        retry_after: Optional[int] = None
+    ):
+        self.mode = (mode or os.getenv("SIMULATION_EXECUTOR", "process")).lower()
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown executor mode '{self.mode}', expected one of {self.MODES}")
+
+        self.max_workers = max_workers or int(os.getenv("SIMULATION_WORKERS", os.cpu_count() or 1))
+        self.max_queue = max_queue if max_queue is not None else int(
+            os.getenv("SIMULATION_MAX_QUEUE", self.max_workers * 4)
+        )
+        self.retry_after = retry_after or int(os.getenv("SIMULATION_RETRY_AFTER", 1))
+
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+
+    @property
+    def capacity(self) -> int:
+        """Jobs running plus jobs waiting for a worker."""
+        return self.max_workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_pool(self) -> Optional[Executor]:
+        """Lazy initialization of the worker pool."""
+        if self._pool is None and self.mode != "inline":
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="simulation"
+                )
+        return self._pool
+
+    def ensure_capacity(self):
+        """Raises ExecutorSaturatedError if no more work can be admitted."""
+        if self._in_flight >= self.capacity:
+            raise ExecutorSaturatedError(self.retry_after)
+
+    async def run(self, fn: Callable, *args, admitted: bool = False, **kwargs) -> Any:
+        """
+        Runs `fn(*args, **kwargs)` in the pool and awaits the result.
+
+        New work is rejected with ExecutorSaturatedError once `capacity` jobs are
+        in flight. Pass `admitted=True` for follow-up stages of a request that
+        already passed `ensure_capacity` (e.g. the cells of a batch), so a
+        request is not failed halfway through.
+
+        In process mode `fn` and its arguments must be picklable.
+        """
+        if not admitted:
+            self.ensure_capacity()
+
+        self._in_flight += 1
+        try:
+            pool = self._get_pool()
+            if pool is None:
+                return fn(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self, wait: bool = True):
+        """Stops the worker pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+# Singleton instance
+_executor: Optional[SimulationExecutor] = None
+
+Gauge(
+    "solarroute_executor_jobs_in_flight", "Simulation jobs running or waiting for a worker.",
+    registry=metrics.REGISTRY
+).set_function(lambda: _executor.in_flight if _executor is not None else 0)
+Gauge(
+    "solarroute_executor_capacity", "Jobs admitted before requests get 503 (workers + queue).",
+    registry=metrics.REGISTRY
+).set_function(lambda: _executor.capacity if _executor is not None else 0)
+
+def get_executor() -> SimulationExecutor:
+    """Get or create SimulationExecutor singleton."""
+    global _executor
+    if _executor is None:
+        _executor = SimulationExecutor()
+    return _executor
+
+def shutdown_executor():
+    """Stop the singleton's pool (app shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
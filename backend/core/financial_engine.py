@@ -0,0 +1,159 @@
+"""
+Financial Engine for SolarRoute.
+Year-by-year cash flows over the project life with degradation, tariff
+escalation, O&M and inverter replacement, and the usual investment metrics
+(NPV, IRR, LCOE, simple and discounted payback).
+
+Everything is computed as (sites x years) arrays, so a batch of thousands of
+roofs is priced in one call without Python-level loops.
+"""
+
+import numpy as np
+from typing import Dict
+
+
+class FinancialEngine:
+    """
+    Residential rooftop PV economics for Indonesia.
+    Year 0 is the investment; years 1..PROJECT_YEARS are operation.
+    """
+
+    PROJECT_YEARS = 25
+    DEGRADATION_RATE = 0.005          # Output loss per year
+    TARIFF_ESCALATION = 0.03          # PLN tariff growth per year
+    OM_COST_FRACTION = 0.01           # Annual O&M as a share of system cost
+    OM_ESCALATION = 0.03
+    INVERTER_REPLACEMENT_YEAR = 12
+    INVERTER_COST_FRACTION = 0.10     # Replacement inverter as a share of system cost
+    DISCOUNT_RATE = 0.08
+
+    # IRR bisection bounds and iterations (~2e-12 resolution on the rate)
+    IRR_BOUNDS = (-0.99, 1.0)
+    IRR_ITERATIONS = 40
+
+    @classmethod
+    def project_cash_flows(
+        cls,
+        system_cost,
+        first_year_kwh,
+        tariff
+    ) -> Dict[str, np.ndarray]:
+        """
+        Cash flow projection for N sites.
+
+        Args are scalars or length-N arrays. Returns (N, PROJECT_YEARS + 1)
+        arrays indexed by year: 'production_kwh', 'savings', 'om_cost',
+        'inverter_cost', 'net_cash_flow', 'cumulative_cash_flow', plus the
+        per-year 'discount_factor' (PROJECT_YEARS + 1,).
+        """
+        system_cost = np.atleast_1d(np.asarray(system_cost, dtype=float))
+        first_year_kwh = np.atleast_1d(np.asarray(first_year_kwh, dtype=float))
+        tariff = np.atleast_1d(np.asarray(tariff, dtype=float))
+        system_cost, first_year_kwh, tariff = np.broadcast_arrays(system_cost, first_year_kwh, tariff)
+
+        years = np.arange(cls.PROJECT_YEARS + 1)
+        operating = (years > 0).astype(float)
+        age = np.maximum(years - 1, 0)
+
+        production = first_year_kwh[:, None] * (1 - cls.DEGRADATION_RATE) ** age * operating
+        savings = production * tariff[:, None] * (1 + cls.TARIFF_ESCALATION) ** age
+        om_cost = system_cost[:, None] * cls.OM_COST_FRACTION * (1 + cls.OM_ESCALATION) ** age * operating
+        inverter_cost = np.zeros_like(production)
+        if 0 < cls.INVERTER_REPLACEMENT_YEAR <= cls.PROJECT_YEARS:
+            inverter_cost[:, cls.INVERTER_REPLACEMENT_YEAR] = system_cost * cls.INVERTER_COST_FRACTION
+
+        net = savings - om_cost - inverter_cost
+        net[:, 0] -= system_cost
+
+        return {
+            'production_kwh': production,
+            'savings': savings,
+            'om_cost': om_cost,
+            'inverter_cost': inverter_cost,
+            'net_cash_flow': net,
+            'cumulative_cash_flow': np.cumsum(net, axis=1),
+            'discount_factor': (1 + cls.DISCOUNT_RATE) ** -years,
+        }
+
+    @classmethod
+    def npv(cls, cash_flows: np.ndarray, rate: float = None) -> np.ndarray:
+        """Net present value per site of (N, years) cash flows."""
+        rate = cls.DISCOUNT_RATE if rate is None else rate
+        years = np.arange(cash_flows.shape[-1])
+        return cash_flows @ (1 + rate) ** -years
+
+    @classmethod
+    def irr(cls, cash_flows: np.ndarray) -> np.ndarray:
+        """
+        Internal rate of return per site by vectorized bisection.
+        NaN where NPV does not change sign inside IRR_BOUNDS.
+        """
+        low = np.full(cash_flows.shape[0], cls.IRR_BOUNDS[0])
+        high = np.full(cash_flows.shape[0], cls.IRR_BOUNDS[1])
+        # Last year first, contiguous per year
+        by_year = np.ascontiguousarray(cash_flows.T[::-1])
+
+        def npv_at(rate):
+            # Horner's scheme in v = 1 / (1 + r): one multiply-add per year, no powers
+            v = 1.0 / (1.0 + rate)
+            total = np.zeros_like(rate)
+            for column in by_year:
+                total = total * v + column
+            return total
+
+        npv_low = npv_at(low)
+        valid = np.sign(npv_low) != np.sign(npv_at(high))
+        for _ in range(cls.IRR_ITERATIONS):
+            mid = (low + high) / 2
+            npv_mid = npv_at(mid)
+            same_side = np.sign(npv_mid) == np.sign(npv_low)
+            low = np.where(same_side, mid, low)
+            npv_low = np.where(same_side, npv_mid, npv_low)
+            high = np.where(same_side, high, mid)
+        return np.where(valid, (low + high) / 2, np.nan)
+
+    @staticmethod
+    def payback(cash_flows: np.ndarray) -> np.ndarray:
+        """
+        Years until cumulative cash flow turns non-negative, interpolated within
+        the crossing year. NaN if it never does within the projection.
+        """
+        cumulative = np.cumsum(cash_flows, axis=1)
+        positive = cumulative >= 0
+        reached = positive.any(axis=1)
+        year = np.argmax(positive, axis=1)
+
+        rows = np.arange(len(cash_flows))
+        previous = cumulative[rows, np.maximum(year - 1, 0)]
+        flow = cash_flows[rows, year]
+        fraction = np.divide(-previous, flow, out=np.zeros(len(flow)), where=flow > 0)
+        years = np.where(year > 0, year - 1 + fraction, 0.0)
+        return np.where(reached, years, np.nan)
+
+    @classmethod
+    def evaluate(
+        cls,
+        system_cost,
+        first_year_kwh,
+        tariff
+    ) -> Dict[str, np.ndarray]:
+        """
+        Projection plus per-site metrics: 'npv', 'irr', 'lcoe' (per kWh),
+        'payback_years' and 'discounted_payback_years'.
+        """
+        flows = cls.project_cash_flows(system_cost, first_year_kwh, tariff)
+        discount = flows['discount_factor']
+        net = flows['net_cash_flow']
+
+        # Year 0 net cash flow is minus the system cost
+        lifetime_cost = -net[:, 0] + (flows['om_cost'] + flows['inverter_cost'])[:, 1:] @ discount[1:]
+        discounted_kwh = flows['production_kwh'] @ discount
+        flows.update(
+            npv=net @ discount,
+            irr=cls.irr(net),
+            lcoe=np.divide(lifetime_cost, discounted_kwh,
+                           out=np.full(len(net), np.nan), where=discounted_kwh > 0),
+            payback_years=cls.payback(net),
+            discounted_payback_years=cls.payback(net * discount),
+        )
+        return flows
@@ -0,0 +1,177 @@
+"""
+Roof Geometry Pipeline for SolarRoute.
+Projects lat/lon roof polygons to local UTM meters with cached transformers,
+vectorized over many polygons at once (one pyproj call per UTM zone, shapely 2
+array operations for area), with automatic simplification of very
+high-vertex polygons and area-weighted centroids.
+"""
+
+import functools
+import numpy as np
+import pyproj
+import shapely
+from shapely.geometry import Polygon
+from typing import Dict, List, Sequence, Tuple
+
+# Polygons with more vertices than this are simplified in projected space
+MAX_VERTICES = 256
+# Simplification tolerance (meters); well below panel and setback dimensions
+SIMPLIFY_TOLERANCE_M = 0.05
+
+# Longitude bands of Indonesia's time zones: WIB west of the Bali Strait,
+# WITA up to Halmahera, WIT beyond
+WITA_MIN_LON = 114.4
+WIT_MIN_LON = 127.0
+# (tz, lat_min, lat_max, lon_min, lon_max) boxes where a province crosses its band
+TIMEZONE_EXCEPTIONS = (
+    ('Asia/Jakarta', -2.0, 0.9, 114.4, 115.6),     # Northern Central Kalimantan
+    ('Asia/Jakarta', -7.3, -6.7, 114.4, 116.3),    # Kangean Islands (East Java)
+    ('Asia/Jayapura', -6.0, -1.2, 124.2, 127.0),   # Sula and Buru (North Maluku, Maluku)
+    ('Asia/Jayapura', -8.0, -7.0, 125.6, 127.0),   # Wetar (Maluku)
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_utm_transformer(epsg: int) -> pyproj.Transformer:
+    """Cached WGS84 -> UTM transformer (x = lon, y = lat order)."""
+    return pyproj.Transformer.from_crs('EPSG:4326', f'EPSG:{epsg}', always_xy=True)
+
+
+def unproject_points(xy: np.ndarray, epsg: int) -> np.ndarray:
+    """UTM (x, y) points in `epsg` back to [lat, lng], same leading shape."""
+    xy = np.asarray(xy, dtype=float)
+    lon, lat = get_utm_transformer(epsg).transform(
+        xy[..., 0].ravel(), xy[..., 1].ravel(), direction=pyproj.enums.TransformDirection.INVERSE
+    )
+    return np.stack([np.asarray(lat), np.asarray(lon)], axis=-1).reshape(xy.shape)
+
+
+def utm_epsg(lat: float, lon: float) -> int:
+    """EPSG code of the WGS84 / UTM zone containing (lat, lon)."""
+    zone = int((lon + 180) / 6) + 1
+    return (32600 if lat > 0 else 32700) + zone
+
+
+def local_timezone(lat: float, lon: float) -> str:
+    """
+    IANA time zone of an Indonesian site: WIB (Asia/Jakarta), WITA
+    (Asia/Makassar) or WIT (Asia/Jayapura).
+
+    Zones follow province borders; longitude bands plus TIMEZONE_EXCEPTIONS
+    approximate them. Sites outside Indonesia get the nearest band.
+    """
+    for tz, lat_min, lat_max, lon_min, lon_max in TIMEZONE_EXCEPTIONS:
+        if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max:
+            return tz
+    if lon < WITA_MIN_LON:
+        return 'Asia/Jakarta'
+    if lon < WIT_MIN_LON:
+        return 'Asia/Makassar'
+    return 'Asia/Jayapura'
+
+
+def polygon_centroid(coordinates: Sequence[Sequence[float]]) -> Tuple[float, float]:
+    """
+    Area-weighted centroid (lat, lon) of a [[lat, lng], ...] polygon.
+
+    Computed in lon/lat space, which is affine to local meters at roof scale.
+    Degenerate (zero-area) polygons fall back to the vertex mean.
+    """
+    coords = np.asarray(coordinates, dtype=float)
+    centroid = Polygon(coords[:, ::-1]).centroid
+    if centroid.is_empty:
+        lat, lon = coords.mean(axis=0)
+        return float(lat), float(lon)
+    return centroid.y, centroid.x
+
+
+def project_polygons(polygons: Sequence[Sequence[Sequence[float]]]) -> Dict[str, np.ndarray]:
+    """
+    Projects many [[lat, lng], ...] polygons to their local UTM zones.
+
+    All vertices are transformed with one pyproj call per zone; polygons are
+    then assembled with shapely 2 array constructors. Polygons with more than
+    MAX_VERTICES vertices are simplified.
+
+    Returns:
+        'projected': object array of shapely Polygons in UTM meters
+        'area_sqm':  float array of areas
+        'lat', 'lon': area-weighted centroids
+        'epsg':      UTM EPSG code per polygon
+    """
+    count = len(polygons)
+    coords = [np.asarray(p, dtype=float).reshape(-1, 2) for p in polygons]
+    sizes = np.array([len(c) for c in coords])
+    if count == 0:
+        empty = np.empty(0)
+        return {'projected': empty.astype(object), 'area_sqm': empty, 'lat': empty, 'lon': empty,
+                'epsg': np.empty(0, dtype=int)}
+    if (sizes < 3).any():
+        raise ValueError("Polygon must have at least 3 points.")
+
+    vertices = np.concatenate(coords)            # (N, 2) as [lat, lng]
+    ring_index = np.repeat(np.arange(count), sizes)
+
+    # Centroids in lon/lat (area-weighted) pick the UTM zone per polygon
+    lonlat_polygons = shapely.polygons(shapely.linearrings(vertices[:, ::-1], indices=ring_index))
+    centroid_points = shapely.centroid(lonlat_polygons)
+    lon_c, lat_c = shapely.get_x(centroid_points), shapely.get_y(centroid_points)
+    degenerate = np.flatnonzero(shapely.is_empty(centroid_points))
+    for i in degenerate:
+        # Zero-area polygons have empty centroids; use the vertex mean instead
+        lat_c[i], lon_c[i] = coords[i].mean(axis=0)
+    epsg = np.array([utm_epsg(lat, lon) for lat, lon in zip(lat_c, lon_c)])
+
+    # One transform call per UTM zone
+    projected_xy = np.empty_like(vertices)
+    vertex_epsg = epsg[ring_index]
+    for code in np.unique(epsg):
+        mask = vertex_epsg == code
+        x, y = get_utm_transformer(int(code)).transform(vertices[mask, 1], vertices[mask, 0])
+        projected_xy[mask, 0] = x
+        projected_xy[mask, 1] = y
+
+    projected = shapely.polygons(shapely.linearrings(projected_xy, indices=ring_index))
+
+    # Simplify very high-vertex roofs (e.g. traced footprints)
+    # Plain Douglas-Peucker is much cheaper than topology-preserving simplification;
+    # keep the original wherever it produced an invalid or empty shape.
+    dense = np.flatnonzero(sizes > MAX_VERTICES)
+    if len(dense):
+        simplified = shapely.simplify(projected[dense], SIMPLIFY_TOLERANCE_M, preserve_topology=False)
+        usable = shapely.is_valid(simplified) & ~shapely.is_empty(simplified)
+        projected[dense[usable]] = simplified[usable]
+
+    return {
+        'projected': projected,
+        'area_sqm': shapely.area(projected),
+        'lat': lat_c,
+        'lon': lon_c,
+        'epsg': epsg,
+    }
+
+
+def project_polygon(coordinates: Sequence[Sequence[float]]) -> Dict:
+    """Single-polygon version of `project_polygons` with scalar values."""
+    result = project_polygons([coordinates])
+    return {
+        'projected': result['projected'][0],
+        'area_sqm': float(result['area_sqm'][0]),
+        'lat': float(result['lat'][0]),
+        'lon': float(result['lon'][0]),
+        'epsg': int(result['epsg'][0]),
+    }
+
+
+def calculate_geodesic_areas(polygons: Sequence[Sequence[Sequence[float]]]) -> List[float]:
+    """Areas in square meters for many [[lat, lng], ...] polygons."""
+    return project_polygons(polygons)['area_sqm'].tolist()
+
+
+def calculate_geodesic_area(coordinates: Sequence[Sequence[float]]) -> float:
+    """
+    Calculates area in square meters from lat/lon polygon using a local UTM projection.
+    """
+    if len(coordinates) < 3:
+        return 0.0
+    return project_polygon(coordinates)['area_sqm']
@@ -0,0 +1,215 @@
+"""
+Metrics and Latency Instrumentation for SolarRoute.
+Process-local Prometheus counters, gauges and histograms (prometheus_client,
+served at /metrics), plus per-request stage timings that are reported in a
+`Server-Timing` response header.
+
+Stages are recorded with `stage()` / `record_stage()` anywhere in the request's
+task (including WeatherService). Work that runs in the simulation executor
+times itself with a `StageTimer` and returns the durations to the request,
+so process-pool workers are covered too. Stage histograms are labelled with
+the route template, known once the request has been routed.
+
+Configuration (environment):
+    SERVER_TIMING    true | false (default: true) - emit the Server-Timing header
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics
+from prometheus_client.core import GaugeMetricFamily
+
+load_dotenv()
+
+# Expose plain counters and histograms, without the *_created timestamp series
+disable_created_metrics()
+
+# Seconds; covers sub-millisecond cache hits up to multi-second cold simulations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The metric families exposed at /metrics (see prometheus_client.generate_latest)
+REGISTRY = CollectorRegistry()
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "solarroute_http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "solarroute_http_requests_in_flight", "HTTP requests currently being served.", registry=REGISTRY
+)
+STAGE_SECONDS = Histogram(
+    "solarroute_stage_duration_seconds", "Latency of one pipeline stage within a request.", ("route", "stage"),
+    buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+CACHE_LOOKUPS = Counter(
+    "solarroute_cache_lookups_total", "Cache lookups per cache and tier.", ("cache", "tier", "result"),
+    registry=REGISTRY
+)
+WEATHER_RESPONSES = Counter(
+    "solarroute_weather_responses_total", "Weather entries served, by source.", ("source",), registry=REGISTRY
+)
+OWM_REQUESTS = Counter(
+    "solarroute_owm_requests_total", "OpenWeatherMap API calls by HTTP status ('error' if none).", ("status",),
+    registry=REGISTRY
+)
+OWM_RATE_LIMITED = Counter(
+    "solarroute_owm_rate_limited_total", "OpenWeatherMap calls rejected with HTTP 429.", registry=REGISTRY
+)
+
+
+class _CacheHitRatioCollector:
+    """solarroute_cache_hit_ratio: hits / lookups per cache tier, derived from CACHE_LOOKUPS at scrape time."""
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        counts: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for family in CACHE_LOOKUPS.collect():
+            for sample in family.samples:
+                if sample.name.endswith("_total"):
+                    tier = counts.setdefault((sample.labels["cache"], sample.labels["tier"]), {})
+                    tier[sample.labels["result"]] = sample.value
+        family = GaugeMetricFamily(
+            "solarroute_cache_hit_ratio", "Hits / lookups per cache tier since start.", labels=("cache", "tier")
+        )
+        for (cache, tier), results in sorted(counts.items()):
+            lookups = results.get("hit", 0.0) + results.get("miss", 0.0)
+            family.add_metric([cache, tier], results.get("hit", 0.0) / lookups if lookups else 0.0)
+        yield family
+
+
+REGISTRY.register(_CacheHitRatioCollector())
+
+
+def record_cache_lookup(cache: str, tier: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache=cache, tier=tier, result="hit" if hit else "miss").inc()
+
+
+# Stage timings of the current request: [(stage, seconds, description)], None outside requests
+_request_stages: ContextVar[Optional[List[Tuple[str, float, Optional[str]]]]] = ContextVar(
+    "request_stages", default=None
+)
+
+
+def record_stage(name: str, seconds: float, description: Optional[str] = None):
+    """Adds a stage duration to the current request (or, outside a request, to the histogram directly)."""
+    stages = _request_stages.get()
+    if stages is None:
+        STAGE_SECONDS.labels(route="", stage=name).observe(seconds)
+    else:
+        stages.append((name, seconds, description))
+
+
+def record_stages(durations: Dict[str, float]):
+    """Adds the durations collected by a StageTimer (e.g. in an executor job)."""
+    for name, seconds in durations.items():
+        record_stage(name, seconds)
+
+
+@contextmanager
+def stage(name: str, description: Optional[str] = None):
+    """Times a block as one stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started, description)
+
+
+class StageTimer:
+    """
+    Collects stage durations locally, for code that runs outside the request's
+    context (executor jobs). Repeated stages accumulate; `durations` is a plain
+    dict, so it can be returned from a process-pool worker.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+
+
+def server_timing_header(stages: List[Tuple[str, float, Optional[str]]], total: float) -> str:
+    """`Server-Timing` value; durations in milliseconds, repeated stages summed."""
+    merged: Dict[str, List] = {}
+    for name, seconds, description in stages:
+        entry = merged.setdefault(name, [0.0, description])
+        entry[0] += seconds
+        entry[1] = description or entry[1]
+    parts = []
+    for name, (seconds, description) in list(merged.items()) + [("total", (total, None))]:
+        part = f"{name};dur={seconds * 1000:.1f}"
+        if description:
+            escaped = str(description).replace("\\", "\\\\").replace('"', '\\"')
+            part += f';desc="{escaped}"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+def route_template(scope) -> str:
+    """
+    Route template of a routed request (e.g. '/api/v1/simulation/calculate'),
+    'unmatched' otherwise. Routes of included routers may carry only their own
+    path, so the prefix is taken from the request path at the same depth.
+    """
+    route = getattr(scope.get("route"), "path", None)
+    if route is None:
+        return "unmatched"
+    segments = scope["path"].rstrip("/").split("/")
+    prefix = "/".join(segments[:len(segments) - route.count("/")])
+    return prefix + route
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency and in-flight gauge, request-scoped stage
+    timings and the Server-Timing header. Stages that finish after the headers
+    were sent (streaming responses) still reach the histograms.
+    """
+
+    def __init__(self, app, server_timing: Optional[bool] = None):
+        self.app = app
+        self.server_timing = server_timing if server_timing is not None else (
+            os.getenv("SERVER_TIMING", "true").lower() == "true"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stages: List[Tuple[str, float, Optional[str]]] = []
+        token = _request_stages.set(stages)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if self.server_timing and stages:
+                    header = server_timing_header(stages, time.perf_counter() - started)
+                    message = {**message, "headers": list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode("latin-1"))
+                    ]}
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            _request_stages.reset(token)
+            route = route_template(scope)
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"], route=route, status=str(status["code"])
+            ).observe(time.perf_counter() - started)
+            for name, seconds, _ in stages:
+                STAGE_SECONDS.labels(route=route, stage=name).observe(seconds)
@@ -0,0 +1,80 @@
+"""
+Orientation Optimum Cache for SolarRoute.
+
+A roof's orientation loss compares its yield with the best orientation on
+SolarEngine's reference tilt x azimuth grid. That optimum depends only on the
+weather grid cell and its weather entry, not on the roof, so the full
+reference sweep runs once per (cell, weather) and its result is kept in a
+bounded LRU; each roof then only evaluates its own orientation.
+
+The cache is per process, like the ephemeris cache: with the process executor
+every worker keeps its own LRU.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+from core import metrics
+
+# One float per entry; a weather entry lives for hours, so this covers many cells
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class OptimumCache:
+    """Bounded LRU of optimal specific yields (kWh/kWp), safe to share between threads."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[float]:
+        """Cached optimum for a key, or None."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.record_cache_lookup("orientation_optimum", "l1", value is not None)
+        return value
+
+    def set(self, key: Hashable, value: float):
+        # Computed outside the lock; concurrent misses on one key just race to store it
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_cache = None
+
+def get_optimum_cache() -> OptimumCache:
+    """Get the process-wide orientation optimum cache."""
+    global _cache
+    if _cache is None:
+        _cache = OptimumCache(max_entries=int(os.getenv("OPTIMUM_CACHE_ENTRIES", DEFAULT_MAX_ENTRIES)))
+    return _cache
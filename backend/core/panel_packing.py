@@ -0,0 +1,161 @@
+"""
+Polygon-aware Panel Packing for SolarRoute.
+Packs rectangular panels into the real projected roof polygon (UTM meters)
+after insetting it by the edge setback. Candidate panel grids are generated
+for several orientations (roof-edge-aligned, minimum bounding rectangle and
+north-south), both panel orientations and a few grid offsets; containment of
+every candidate panel is tested with vectorized shapely 2 predicates against
+the prepared roof geometry, and the grid holding the most panels wins.
+"""
+
+import numpy as np
+import shapely
+from shapely import affinity
+from shapely.geometry import Polygon
+from typing import Dict, List
+
+# Grid offsets tried per orientation, as fractions of the panel pitch
+OFFSETS_ALONG_ROW = (0.0, 1 / 3, 2 / 3)
+OFFSETS_ACROSS_ROWS = (0.0, 0.5)
+
+# Roof-edge directions tried (longest total edge length first)
+MAX_EDGE_ANGLES = 4
+# Edge directions closer than this (degrees) count as one orientation
+ANGLE_TOLERANCE_DEG = 1.0
+
+
+def candidate_angles(roof: Polygon) -> List[float]:
+    """
+    Grid orientations (degrees, 0-90) worth trying for a roof.
+
+    Edge directions are folded modulo 90 (a grid and its 90-degree rotation
+    are covered by trying both panel orientations) and ranked by total edge
+    length; the minimum rotated rectangle and the north-south grid are added.
+    """
+    coords = np.asarray(roof.exterior.coords)
+    edges = np.diff(coords, axis=0)
+    lengths = np.hypot(edges[:, 0], edges[:, 1])
+    angles = np.degrees(np.arctan2(edges[:, 1], edges[:, 0])) % 90.0
+
+    # Length-weighted histogram of edge directions in ANGLE_TOLERANCE_DEG bins
+    bins = np.round(angles / ANGLE_TOLERANCE_DEG).astype(int) % int(round(90 / ANGLE_TOLERANCE_DEG))
+    weight = np.bincount(bins, weights=lengths)
+    ranked = [float(b * ANGLE_TOLERANCE_DEG) for b in np.argsort(weight)[::-1][:MAX_EDGE_ANGLES] if weight[b] > 0]
+
+    rectangle = np.asarray(roof.minimum_rotated_rectangle.exterior.coords)
+    dx, dy = rectangle[1] - rectangle[0]
+    ranked.append(float(np.degrees(np.arctan2(dy, dx)) % 90.0))
+    ranked.append(0.0)
+
+    unique: List[float] = []
+    for angle in ranked:
+        if all(min(abs(angle - a), 90.0 - abs(angle - a)) >= ANGLE_TOLERANCE_DEG for a in unique):
+            unique.append(angle)
+    return unique
+
+
+def _pack_grid(
+    frame: Polygon,
+    along: float,
+    across: float,
+    row_spacing_m: float,
+    offset_along: float,
+    offset_across: float
+) -> np.ndarray:
+    """
+    Axis-aligned grid in the rotated roof frame; returns (N, 4) [x0, y0, x1, y1]
+    of the panels fully inside `frame` (which must be prepared).
+    """
+    minx, miny, maxx, maxy = frame.bounds
+    pitch_y = across + row_spacing_m
+    x0 = np.arange(minx + offset_along * along, maxx - along + 1e-9, along)
+    y0 = np.arange(miny + offset_across * pitch_y, maxy - across + 1e-9, pitch_y)
+    if len(x0) == 0 or len(y0) == 0:
+        return np.empty((0, 4))
+
+    gx, gy = np.meshgrid(x0, y0)
+    gx, gy = gx.ravel(), gy.ravel()
+
+    # Cheap corner test first, full polygon containment only for survivors
+    inside = shapely.contains_xy(frame, gx, gy)
+    inside &= shapely.contains_xy(frame, gx + along, gy)
+    inside &= shapely.contains_xy(frame, gx, gy + across)
+    inside &= shapely.contains_xy(frame, gx + along, gy + across)
+    gx, gy = gx[inside], gy[inside]
+    if len(gx) == 0:
+        return np.empty((0, 4))
+
+    boxes = np.column_stack([gx, gy, gx + along, gy + across])
+    contained = shapely.contains(frame, shapely.box(boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]))
+    return boxes[contained]
+
+
+def pack_panels(
+    roof: Polygon,
+    panel_width_m: float,
+    panel_height_m: float,
+    setback_m: float,
+    row_spacing_m: float
+) -> Dict:
+    """
+    Best panel layout for a projected roof polygon.
+
+    Returns:
+        'total_panels', 'rows', 'columns'
+        'usable_area_sqm':  area of the setback-inset roof
+        'layout_width_m', 'layout_height_m': extent of the placed panels along/across rows
+        'orientation_deg':  grid rotation (counter-clockwise from east)
+        'panel_orientation': 'portrait' | 'landscape'
+        'corners':          (N, 4, 2) panel corner coordinates in the roof's projected CRS
+    """
+    usable = roof.buffer(-setback_m, join_style='mitre') if setback_m > 0 else roof
+    best = {
+        'total_panels': 0, 'rows': 0, 'columns': 0,
+        'usable_area_sqm': float(usable.area) if not usable.is_empty else 0.0,
+        'layout_width_m': 0.0, 'layout_height_m': 0.0,
+        'orientation_deg': 0.0, 'panel_orientation': 'portrait',
+        'corners': np.empty((0, 4, 2)),
+    }
+    if usable.is_empty or usable.area < panel_width_m * panel_height_m:
+        return best
+
+    origin = usable.centroid
+    orientations = (
+        ('portrait', panel_width_m, panel_height_m),
+        ('landscape', panel_height_m, panel_width_m),
+    )
+    best_boxes = None
+    for angle in candidate_angles(roof):
+        # Rotate the roof instead of the grid so panels are axis-aligned
+        frame = affinity.rotate(usable, -angle, origin=origin)
+        shapely.prepare(frame)
+        for name, along, across in orientations:
+            for offset_along in OFFSETS_ALONG_ROW:
+                for offset_across in OFFSETS_ACROSS_ROWS:
+                    boxes = _pack_grid(frame, along, across, row_spacing_m, offset_along, offset_across)
+                    if best_boxes is None or len(boxes) > len(best_boxes):
+                        best_boxes = boxes
+                        best.update(orientation_deg=angle, panel_orientation=name)
+
+    if best_boxes is None or len(best_boxes) == 0:
+        return best
+
+    # Rows are panels sharing a y origin; rotate corners back into the roof CRS
+    _, row_counts = np.unique(np.round(best_boxes[:, 1], 6), return_counts=True)
+    corners = np.stack([
+        best_boxes[:, [0, 1]], best_boxes[:, [2, 1]], best_boxes[:, [2, 3]], best_boxes[:, [0, 3]]
+    ], axis=1)
+    theta = np.radians(best['orientation_deg'])
+    rotation = np.array([[np.cos(theta), np.sin(theta)], [-np.sin(theta), np.cos(theta)]])
+    center = np.array([origin.x, origin.y])
+    corners = (corners - center) @ rotation + center
+
+    best.update(
+        total_panels=int(len(best_boxes)),
+        rows=int(len(row_counts)),
+        columns=int(row_counts.max()),
+        layout_width_m=float(best_boxes[:, 2].max() - best_boxes[:, 0].min()),
+        layout_height_m=float(best_boxes[:, 3].max() - best_boxes[:, 1].min()),
+        corners=corners,
+    )
+    return best
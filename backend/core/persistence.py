@@ -0,0 +1,206 @@
+"""
+Write-behind Persistence for SolarRoute.
+Completed simulations are queued in-process and written to the `sites` and
+`simulation_results` tables in batches by a background task, so /calculate
+never waits on a database round-trip.
+"""
+
+import os
+import uuid
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from geoalchemy2.elements import WKTElement
+from sqlalchemy import insert
+from core.database import engine
+from models.orm import Site, SimulationResult
+from models.schemas import SimulationRequest
+
+load_dotenv()
+
+
+def polygon_to_wkt(polygon: List[List[float]]) -> str:
+    """[[lat, lng], ...] -> closed WKT POLYGON in lon/lat order."""
+    ring = [(p[1], p[0]) for p in polygon]
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return "POLYGON((" + ", ".join(f"{lon} {lat}" for lon, lat in ring) + "))"
+
+
+class SimulationWriter:
+    """
+    Bounded write-behind queue with batched multi-row inserts.
+
+    Configuration (environment):
+        SIMULATION_PERSISTENCE        true | false (default: true)
+        PERSISTENCE_QUEUE_SIZE        max queued simulations (default: 10000)
+        PERSISTENCE_BATCH_SIZE        rows per INSERT (default: 500)
+        PERSISTENCE_FLUSH_SECONDS     max delay before a partial batch is written (default: 2)
+        PERSISTENCE_DROP_POLICY       newest | oldest: what to drop when full (default: newest)
+    """
+
+    SHUTDOWN_TIMEOUT_SECONDS = 10
+
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None,
+        drop_policy: Optional[str] = None
+    ):
+        self.enabled = os.getenv("SIMULATION_PERSISTENCE", "true").lower() == "true"
+        self.queue_size = queue_size or int(os.getenv("PERSISTENCE_QUEUE_SIZE", 10000))
+        self.batch_size = batch_size or int(os.getenv("PERSISTENCE_BATCH_SIZE", 500))
+        self.flush_seconds = flush_seconds or float(os.getenv("PERSISTENCE_FLUSH_SECONDS", 2))
+        self.drop_policy = (drop_policy or os.getenv("PERSISTENCE_DROP_POLICY", "newest")).lower()
+        if self.drop_policy not in ("newest", "oldest"):
+            raise ValueError(f"Unknown drop policy '{self.drop_policy}', expected 'newest' or 'oldest'")
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._current_flush: Optional[asyncio.Future] = None
+        self._pending: List[Tuple] = []
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0}
+
+    def enqueue(self, request: SimulationRequest, result: Dict) -> bool:
+        """
+        Queues a completed simulation without blocking. Returns False if it was
+        dropped (writer not running, or queue full with drop policy 'newest').
+        """
+        if not self.enabled or self._queue is None:
+            return False
+
+        item = (request, result, datetime.utcnow())
+        if self._queue.full():
+            self.stats["dropped"] += 1
+            if self.drop_policy == "newest":
+                return False
+            self._queue.get_nowait()
+            self._queue.task_done()
+
+        self._queue.put_nowait(item)
+        self.stats["enqueued"] += 1
+        return True
+
+    async def start(self):
+        """Starts the background flusher (app startup)."""
+        if not self.enabled or self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flushes everything still queued, then stops (app shutdown)."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        try:
+            await asyncio.wait_for(self._drain(), timeout=self.SHUTDOWN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"Persistence shutdown timed out, {self._queue.qsize()} simulations not written.")
+        self._queue = None
+
+    async def _drain(self):
+        if self._current_flush is not None and not self._current_flush.done():
+            await self._current_flush
+        if self._pending:
+            pending, self._pending = self._pending, []
+            await self._flush(pending)
+        while not self._queue.empty():
+            await self._flush(self._take_batch())
+
+    def _take_batch(self) -> List[Tuple]:
+        batch = []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+            self._queue.task_done()
+        return batch
+
+    async def _run(self):
+        """Waits for the first item, gives the batch up to flush_seconds to fill, then writes it."""
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                self._queue.task_done()
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self.flush_seconds
+                while len(batch) < self.batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                        self._queue.task_done()
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Keep what was already taken off the queue for the shutdown flush
+                self._pending.extend(batch)
+                raise
+
+            # Shielded: a shutdown during a write lets the write finish
+            self._current_flush = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._current_flush)
+
+    async def _flush(self, batch: List[Tuple]):
+        if not batch:
+            return
+        try:
+            await self._write_batch(batch)
+            self.stats["written"] += len(batch)
+        except Exception as e:
+            # Never retry into an unavailable database; history is best-effort
+            self.stats["failed"] += len(batch)
+            print(f"Persistence write error ({len(batch)} simulations dropped): {e}")
+
+    async def _write_batch(self, batch: List[Tuple]):
+        """One transaction, one multi-row INSERT per table."""
+        site_rows, result_rows = [], []
+        for request, result, completed_at in batch:
+            site_id = uuid.uuid4()
+            energy = result["energy_output"]
+            financials = result["financials"]
+            site_rows.append({
+                "id": site_id,
+                "roof_polygon": WKTElement(polygon_to_wkt(request.polygon), srid=4326),
+                "area_sqm": result["site_details"]["roof_area_sqm"],
+                "tilt": request.tilt,
+                "azimuth": request.azimuth,
+                "monthly_bill_idr": request.bill_idr,
+                "created_at": completed_at,
+            })
+            result_rows.append({
+                "id": uuid.uuid4(),
+                "site_id": site_id,
+                "installed_capacity_kwp": energy["recommended_system_size_kwp"],
+                "annual_production_kwh": energy["annual_production_kwh"],
+                "daily_production_kwh": energy["daily_production_kwh"],
+                "system_cost_idr": financials["estimated_system_cost_idr"],
+                "annual_savings_idr": financials["annual_savings_idr"],
+                "roi_years": financials["break_even_point_years"],
+                "co2_reduced_ton": result["environment"]["co2_offset_ton"],
+                "calculated_at": completed_at,
+            })
+
+        async with engine.begin() as conn:
+            await conn.execute(insert(Site.__table__).values(site_rows))
+            await conn.execute(insert(SimulationResult.__table__).values(result_rows))
+
+
+# Singleton instance
+_writer: Optional[SimulationWriter] = None
+
+def get_simulation_writer() -> SimulationWriter:
+    """Get or create SimulationWriter singleton."""
+    global _writer
+    if _writer is None:
+        _writer = SimulationWriter()
+    return _writer
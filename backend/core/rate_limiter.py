@@ -0,0 +1,160 @@
+"""
+Outbound Rate Limiter for SolarRoute.
+A token bucket that keeps every OpenWeatherMap call (user requests, batch
+jobs, cache warming, forecasts) inside the paid quota. The bucket lives in
+Redis, so all uvicorn workers and pods draw from one budget; while Redis is
+unreachable each process falls back to a local bucket.
+
+Callers reserve a token and sleep until its slot comes up, so bursts are
+queued and spread out instead of being answered with mock data.
+"""
+
+import os
+import math
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Atomic refill + reserve on the shared bucket, timed by the Redis server clock.
+# Returns {1, wait} when a token was reserved (usable after `wait` seconds) or
+# {0, wait} when the wait would exceed max_wait (nothing reserved).
+_RESERVE_SCRIPT = """
+local now = redis.call('TIME')
+local t = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate, capacity, max_wait = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or t
+tokens = math.min(capacity, tokens + math.max(0, t - ts) * rate)
+local wait = 0
+if tokens < 1 then wait = (1 - tokens) / rate end
+local reserved = 0
+if max_wait < 0 or wait <= max_wait then
+    tokens = tokens - 1
+    reserved = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(t))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return {reserved, tostring(wait)}
+"""
+
+
+class RateLimitExceededError(Exception):
+    """Raised when an API call cannot get a token in time. Mapped to 503 + Retry-After."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Weather API quota exhausted, retry later.")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """
+    In-process token bucket with reservations: a taken token may be negative
+    balance, and the caller waits until the refill covers it (virtual
+    scheduling), so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, calls_per_minute: float, capacity: float):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = capacity
+        self._tokens = capacity
+        self._refilled_at = time.monotonic()
+
+    def reserve(self, max_wait: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        Reserves one token unless it would come later than `max_wait`.
+        Returns (reserved, seconds until the token is usable).
+        """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        wait = max(0.0, (1.0 - self._tokens) / self.rate)
+        if max_wait is not None and wait > max_wait:
+            return False, wait
+        self._tokens -= 1.0
+        return True, wait
+
+
+class RateLimiter:
+    """
+    Shared outbound token bucket (Redis) with a local stand-in.
+
+    Configuration (environment):
+        OWM_CALLS_PER_MINUTE      sustained rate across all workers (default: 60)
+        OWM_BURST                 bucket capacity (default: 10)
+        OWM_RATE_LIMIT_REDIS      share the bucket via Redis (default: true)
+    """
+
+    KEY = "ratelimit:owm"
+
+    def __init__(
+        self,
+        redis_getter: Optional[Callable[[], Awaitable]] = None,
+        on_redis_error: Optional[Callable[[Exception, str], None]] = None,
+        calls_per_minute: Optional[float] = None,
+        burst: Optional[float] = None
+    ):
+        self.calls_per_minute = calls_per_minute or float(os.getenv("OWM_CALLS_PER_MINUTE", 60))
+        self.burst = burst or float(os.getenv("OWM_BURST", 10))
+        self.shared = redis_getter is not None and os.getenv("OWM_RATE_LIMIT_REDIS", "true").lower() == "true"
+        self._redis_getter = redis_getter
+        self._on_redis_error = on_redis_error
+        self._local = TokenBucket(self.calls_per_minute, self.burst)
+        self._scripts = {}
+        # Set after an upstream 429: nobody in this process calls before then
+        self._blocked_until = 0.0
+        self.counters = {"acquired": 0, "queued_seconds": 0.0, "rejected": 0}
+
+    async def _reserve_shared(self, max_wait: Optional[float]) -> Optional[Tuple[bool, float]]:
+        """Like TokenBucket.reserve on the Redis bucket; None while Redis is unavailable."""
+        redis_client = await self._redis_getter() if self.shared else None
+        if not redis_client:
+            return None
+        try:
+            script = self._scripts.get(id(redis_client))
+            if script is None:
+                script = self._scripts[id(redis_client)] = redis_client.register_script(_RESERVE_SCRIPT)
+            reserved, wait = await script(
+                keys=[self.KEY],
+                args=[self.calls_per_minute / 60.0, self.burst, -1 if max_wait is None else max_wait]
+            )
+        except Exception as e:
+            if self._on_redis_error is not None:
+                self._on_redis_error(e, "rate limit")
+            return None
+        return bool(int(reserved)), float(wait)
+
+    async def acquire(self, max_wait: Optional[float] = None) -> float:
+        """
+        Waits for a token. `max_wait` None waits as long as needed (bulk work);
+        otherwise RateLimitExceededError is raised, without consuming a token,
+        if the token would come later than that. Returns the seconds waited.
+        """
+        blocked = max(0.0, self._blocked_until - time.monotonic())
+        budget = None if max_wait is None else max_wait - blocked
+        if budget is not None and budget < 0:
+            self.counters["rejected"] += 1
+            raise RateLimitExceededError(blocked)
+
+        reservation = await self._reserve_shared(budget)
+        reserved, wait = reservation if reservation is not None else self._local.reserve(budget)
+        if not reserved:
+            self.counters["rejected"] += 1
+            raise RateLimitExceededError(blocked + wait)
+
+        total = blocked + wait
+        if total > 0:
+            await asyncio.sleep(total)
+        self.counters["acquired"] += 1
+        self.counters["queued_seconds"] += total
+        return total
+
+    def backoff(self, seconds: float):
+        """Holds back every call from this process for `seconds` (after an upstream 429)."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict:
+        return {**self.counters, "calls_per_minute": self.calls_per_minute, "burst": self.burst}
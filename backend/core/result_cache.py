@@ -0,0 +1,180 @@
+"""
+Simulation Result Cache for SolarRoute.
+Caches complete SimulationResponse payloads keyed by a hash of the
+canonicalized request plus the version of the weather entry used, so
+re-submitted requests (same polygon, same sliders) cost a hash and a lookup.
+Entries expire together with the underlying weather entry.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from core.cache import TTLCache
+from core.cache_codec import decode_result, encode_result
+from core import metrics
+from core.weather_service import WeatherService, get_weather_service
+from models.schemas import SimulationRequest
+
+load_dotenv()
+
+# Bump when the simulation pipeline changes in a way that alters results
+RESULT_CACHE_VERSION = 5
+
+# Coordinate quantization (~0.1 m); absorbs float noise from the map widget
+COORD_DECIMALS = 6
+
+
+def canonicalize_polygon(polygon: Sequence[Sequence[float]]) -> List[Tuple[float, float]]:
+    """
+    Quantized, orientation- and rotation-normalized polygon.
+
+    The closing vertex and consecutive duplicates are dropped, the ring is made
+    counter-clockwise (in lon/lat), and it starts at its smallest vertex, so the
+    same roof drawn from a different corner or direction maps to the same key.
+    """
+    ring: List[Tuple[float, float]] = []
+    for lat, lon in polygon:
+        point = (round(lat, COORD_DECIMALS), round(lon, COORD_DECIMALS))
+        if not ring or ring[-1] != point:
+            ring.append(point)
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring.pop()
+
+    # Shoelace with x = lon, y = lat; negative means clockwise
+    signed_area = sum(
+        ring[i][1] * ring[(i + 1) % len(ring)][0] - ring[(i + 1) % len(ring)][1] * ring[i][0]
+        for i in range(len(ring))
+    )
+    if signed_area < 0:
+        ring.reverse()
+
+    start = ring.index(min(ring))
+    return ring[start:] + ring[:start]
+
+
+def result_cache_key(request: SimulationRequest, weather_version: str) -> str:
+    """Hash of every input that affects the result (bill_idr does not)."""
+    canonical = {
+        "v": RESULT_CACHE_VERSION,
+        "polygon": canonicalize_polygon(request.polygon),
+        "tilt": round(request.tilt, 2),
+        "azimuth": round(request.azimuth % 360.0, 2),
+        "panel_efficiency": round(request.panel_efficiency, 4),
+        "system_cost_per_kwp": round(request.system_cost_per_kwp, 0),
+        "electricity_tariff": round(request.electricity_tariff, 2),
+        "uncertainty_samples": request.uncertainty_samples,
+        "weather": weather_version,
+    }
+    digest = hashlib.sha256(json.dumps(canonical, separators=(",", ":")).encode()).hexdigest()
+    return f"result:{digest}"
+
+
+def weather_version(weather: Dict) -> Optional[str]:
+    """Version of a weather entry (its cached_at), or None if it is not cacheable."""
+    cached_at = weather.get("cached_at")
+    return cached_at.isoformat() if isinstance(cached_at, datetime) else None
+
+
+class ResultCache:
+    """
+    Two-tier cache for SimulationResponse payloads.
+    L1: in-process TTL/LRU. L2: Redis, shared with (and gated by) WeatherService.
+    """
+
+    L1_MAX_ENTRIES = 2048
+
+    def __init__(self, weather_service: WeatherService):
+        self.weather_service = weather_service
+        self._l1_cache = TTLCache(
+            max_size=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", self.L1_MAX_ENTRIES)),
+            ttl_seconds=WeatherService.CACHE_TTL_HOURS * 3600
+        )
+
+    def key_for(self, request: SimulationRequest, weather: Dict) -> Optional[str]:
+        """Cache key for a request, or None if the weather entry has no version."""
+        version = weather_version(weather)
+        if version is None:
+            return None
+        return result_cache_key(request, version)
+
+    def _ttl_seconds(self, weather: Dict) -> float:
+        """Remaining lifetime of the weather entry the result was computed from."""
+        expires_at = self.weather_service.get_entry_expiry(weather)
+        if expires_at is None:
+            return 0.0
+        return (expires_at - datetime.utcnow()).total_seconds()
+
+    async def get(self, key: Optional[str]) -> Optional[Dict]:
+        """Cached response for a key (L1, then L2), or None."""
+        if key is None:
+            return None
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[Optional[str]]) -> Dict[str, Dict]:
+        """
+        Cached responses for many keys, {key: response}: L1, then L2 with one
+        MGET per WeatherService.REDIS_BATCH_SIZE missing keys.
+        """
+        found: Dict[str, Dict] = {}
+        missing: List[str] = []
+        for key in keys:
+            if key is None or key in found or key in missing:
+                continue
+            cached = self._l1_cache.get(key)
+            metrics.record_cache_lookup("result", "l1", hit=cached is not None)
+            if cached is not None:
+                found[key] = cached
+            else:
+                missing.append(key)
+
+        if not missing or not await self.weather_service._get_redis():
+            return found
+        payloads = await self.weather_service._redis_get_many(missing)
+        for key in missing:
+            decoded = decode_result(payloads.get(key))
+            remaining = (decoded[1] - datetime.utcnow()).total_seconds() if decoded is not None else 0.0
+            # Redis may keep an entry briefly past its weather's expiry
+            metrics.record_cache_lookup("result", "l2", hit=remaining > 0)
+            if remaining <= 0:
+                continue
+            self._l1_cache.set(key, decoded[0], ttl_seconds=remaining)
+            found[key] = decoded[0]
+        return found
+
+    async def set(self, key: Optional[str], result: Dict, weather: Dict):
+        """Stores a response until its weather entry expires."""
+        await self.set_many([(key, result, weather)])
+
+    async def set_many(self, entries: Iterable[Tuple[Optional[str], Dict, Dict]]):
+        """
+        Stores many (key, response, weather) entries until their weather entries
+        expire; L2 writes go out as one pipelined SETEX round-trip per
+        WeatherService.REDIS_BATCH_SIZE keys.
+        """
+        writes = []
+        for key, result, weather in entries:
+            if key is None:
+                continue
+            ttl = self._ttl_seconds(weather)
+            if ttl <= 1:
+                continue
+            self._l1_cache.set(key, result, ttl_seconds=ttl)
+            writes.append((key, ttl, encode_result(result, self.weather_service.get_entry_expiry(weather))))
+        await self.weather_service._redis_set_many(writes)
+
+    def stats(self) -> Dict:
+        return self._l1_cache.stats()
+
+
+# Singleton instance
+_result_cache: Optional[ResultCache] = None
+
+async def get_result_cache() -> ResultCache:
+    """Get or create ResultCache singleton."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(await get_weather_service())
+    return _result_cache
@@ -1,8 +1,16 @@
 import pandas as pd
 import numpy as np
 import pvlib
-from datetime import datetime
 from typing import Dict, Optional, List, Tuple
+from core.transposition_table import (
+    get_transposition_table, compute_monthly_factors, REFERENCE_YEAR, REPRESENTATIVE_DAYS_OF_YEAR
+)
+from core.climatology import get_climatology
+from core.ephemeris import get_ephemeris_cache, hourly_times, FIELDS as EPHEMERIS_FIELDS
+from core.geometry import unproject_points, local_timezone
+from core.optimum_cache import get_optimum_cache
+from core.panel_packing import pack_panels
+from shapely.geometry import Polygon
 
 class SolarEngine:
     """
@@ -37,6 +45,58 @@ class SolarEngine:
         LOSS_SOILING + LOSS_CABLING + LOSS_INVERTER +
         LOSS_MISMATCH + LOSS_NAMEPLATE
     )
+
+    # Nationwide monthly adjustment factors, used where no climatology grid covers the site
+    # Values represent ratio of monthly average to annual average
+    MONTHLY_GHI_FACTORS = {
+        1: 0.95,   # January - Wet season
+        2: 0.92,   # February - Peak wet
+        3: 0.93,   # March - Wet season
+        4: 0.96,   # April - Transition
+        5: 1.05,   # May - Dry season starts
+        6: 1.10,   # June - Dry season
+        7: 1.12,   # July - Peak dry
+        8: 1.10,   # August - Dry season
+        9: 1.05,   # September - Transition
+        10: 1.02,  # October - Transition
+        11: 0.98,  # November - Wet season starts
+        12: 0.96   # December - Wet season
+    }
+
+    # Monthly temperature variations (offset from base temp)
+    MONTHLY_TEMP_OFFSET = {
+        1: -1.5,   # January
+        2: -1.0,   # February
+        3: -0.5,   # March
+        4: 0.0,    # April
+        5: 0.5,    # May
+        6: 1.0,    # June
+        7: 1.5,    # July
+        8: 1.0,    # August
+        9: 0.5,    # September
+        10: 0.0,   # October
+        11: -0.5,  # November
+        12: -1.0   # December
+    }
+
+    MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    DAYS_IN_MONTH = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+    # Fixed non-leap simulation year so results don't drift with the calendar
+    SIMULATION_YEAR = REFERENCE_YEAR
+    HOURS_PER_YEAR = 8760
+
+    # Ground reflectance for the isotropic transposition (pvlib default)
+    ALBEDO = 0.25
+    # Orientation grid used as the reference for orientation losses
+    REFERENCE_TILTS = np.arange(0.0, 61.0, 5.0)
+    REFERENCE_AZIMUTHS = np.arange(0.0, 360.0, 15.0)
+    # Bounds the (tilt, azimuth, hour) working set of an orientation sweep
+    SWEEP_CHUNK_ELEMENTS = 2_000_000
+    # Kasten & Czeplak (1980) cloud-cover model: GHI = GHI_clear * (1 - 0.75 * cover^3.4)
+    CLOUD_ATTENUATION = 0.75
+    CLOUD_EXPONENT = 3.4
     
     @staticmethod
     def calculate_cell_temperature(t_air: float, ghi: float) -> float:
@@ -117,48 +177,24 @@ class SolarEngine:
         # I will update the signature to accept location.
         raise NotImplementedError("Use calculate_energy_simulation for full logic")
 
-    @classmethod
-    def calculate_daily_simulation(
-        cls,
+    @staticmethod
+    def calculate_clearsky_transposition(
         latitude: float,
         longitude: float,
-        area_sqm: float,
         tilt: float,
         azimuth: float,
-        ghi_daily_kwh: float, # Input from OWM Daily API usually in kWh/m2 or J/m2
-        temp_day_c: float,
-        panel_efficiency: float = 0.20  # Default 20%, can be overridden
-    ) -> Dict[str, float]:
+        times: pd.DatetimeIndex
+    ) -> float:
         """
-        Performs a daily simulation.
-
-        Since we might only have daily aggregates from OWM Free API (or limited OneCall),
-        we will use pvlib to get a transposition factor based on geometry.
-
-        However, to be "Scientific", we should generate a clearsky profile for the day,
-        scale it to match the observed GHI, and then transpose that.
+        Live pvlib path: k_trans = sum(POA_clearsky) / sum(GHI_clearsky) over `times`.
         """
-
-        # 1. Get POA (Plane of Array) Irradiance Factor
-        # For Indonesia (near equator), optimal tilt is low.
-        # We will use pvlib.irradiance.get_total_irradiance if we had components.
-        # With only GHI, we estimate.
-
-        # Create a Location object
         site_location = pvlib.location.Location(latitude, longitude)
-
-        # Get clear sky data for today to calculate the geometric factor
-        times = pd.date_range(start=datetime.now().date(), periods=24, freq='h', tz='Asia/Jakarta')
         solpos = site_location.get_solarposition(times)
 
-        # Calculate extraterrestrial radiation
-        dni_extra = pvlib.irradiance.get_extra_radiation(times)
-
         # Simple Clear Sky Model (Ineichen)
         clearsky = site_location.get_clearsky(times)
 
         # Calculate POA for Clear Sky
-        # We need surface_tilt and surface_azimuth
         poa_sky = pvlib.irradiance.get_total_irradiance(
             surface_tilt=tilt,
             surface_azimuth=azimuth,
@@ -169,15 +205,139 @@ class SolarEngine:
             solar_azimuth=solpos['azimuth']
         )
 
-        # Calculate Transposition Factor (k_trans) = POA_global / GHI
-        # Sum of daily irradiance
         daily_ghi_clearsky = clearsky['ghi'].sum()
         daily_poa_clearsky = poa_sky['poa_global'].sum()
+        return daily_poa_clearsky / daily_ghi_clearsky if daily_ghi_clearsky > 0 else 1.0
+
+    @classmethod
+    def get_transposition_factor(
+        cls,
+        latitude: float,
+        longitude: float,
+        tilt: float,
+        azimuth: float,
+        month: int
+    ) -> Optional[float]:
+        """
+        k_trans for a month from the precomputed table.
+        Returns None when no table is loaded or the site is outside its domain.
+        """
+        table = get_transposition_table()
+        if table is None:
+            return None
+        return table.lookup(latitude, longitude, tilt, azimuth, month)
+
+    @classmethod
+    def get_daily_transposition_factor(
+        cls,
+        latitude: float,
+        longitude: float,
+        tilt: float,
+        azimuth: float,
+        geometry: Optional[Dict[str, np.ndarray]] = None
+    ) -> float:
+        """
+        k_trans for the site's local today: precomputed table first, then today's
+        slice of a shared annual `geometry` if given, the ephemeris cache otherwise.
+        Both take the date from the site's time zone, not the server clock.
+        """
+        today = pd.Timestamp.now(tz=local_timezone(latitude, longitude))
+        k_trans = cls.get_transposition_factor(latitude, longitude, tilt, azimuth, today.month)
+        if k_trans is None:
+            day = min(today.dayofyear, 365)
+            if geometry is not None:
+                hours = slice((day - 1) * 24, day * 24)
+                sky = {field: geometry[field][hours] for field in EPHEMERIS_FIELDS}
+            else:
+                sky = get_ephemeris_cache().days(latitude, longitude, [day])
+            poa_sky = pvlib.irradiance.get_total_irradiance(
+                surface_tilt=tilt,
+                surface_azimuth=azimuth,
+                dni=sky['clearsky_dni'],
+                ghi=sky['clearsky_ghi'],
+                dhi=sky['clearsky_dhi'],
+                solar_zenith=sky['solar_zenith'],
+                solar_azimuth=sky['solar_azimuth']
+            )
+            daily_ghi_clearsky = sky['clearsky_ghi'].sum()
+            daily_poa_clearsky = np.nansum(poa_sky['poa_global'])
+            k_trans = daily_poa_clearsky / daily_ghi_clearsky if daily_ghi_clearsky > 0 else 1.0
+        return k_trans
+
+    @classmethod
+    def get_monthly_transposition_factors(
+        cls,
+        latitude: float,
+        longitude: float,
+        tilt: float,
+        azimuth: float
+    ) -> np.ndarray:
+        """
+        k_trans for all 12 representative days (15th of each month).
+        Uses the precomputed table and falls back to the cached ephemeris.
+        """
+        table = get_transposition_table()
+        if table is not None:
+            factors = table.lookup_months(latitude, longitude, tilt, azimuth)
+            if factors is not None:
+                return factors
+        sky = get_ephemeris_cache().days(latitude, longitude, REPRESENTATIVE_DAYS_OF_YEAR)
+        return compute_monthly_factors(latitude, longitude, [tilt], [azimuth], sky=sky)[0, 0]
+
+    @classmethod
+    def get_monthly_climate_factors(cls, latitude: float, longitude: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-site seasonality: (GHI ratio to the annual mean, temperature offset from
+        the annual mean) for each month.
+
+        Taken from the offline climatology grid when it covers the site, otherwise
+        the nationwide MONTHLY_GHI_FACTORS / MONTHLY_TEMP_OFFSET.
+        """
+        grid = get_climatology()
+        climate = grid.lookup(latitude, longitude) if grid is not None else None
+        if climate is not None:
+            days = np.array(cls.DAYS_IN_MONTH)
+            ghi, temp = climate['ghi_daily_kwh'], climate['temp_c']
+            annual_ghi = np.average(ghi, weights=days)
+            if annual_ghi > 0:
+                return ghi / annual_ghi, temp - np.average(temp, weights=days)
+
+        ghi_factors = np.array([cls.MONTHLY_GHI_FACTORS[m] for m in range(1, 13)])
+        temp_offsets = np.array([cls.MONTHLY_TEMP_OFFSET[m] for m in range(1, 13)])
+        return ghi_factors, temp_offsets
+
+    @classmethod
+    def calculate_daily_simulation(
+        cls,
+        latitude: float,
+        longitude: float,
+        area_sqm: float,
+        tilt: float,
+        azimuth: float,
+        ghi_daily_kwh: float, # Input from OWM Daily API usually in kWh/m2 or J/m2
+        temp_day_c: float,
+        panel_efficiency: float = 0.20,  # Default 20%, can be overridden
+        transposition_factor: Optional[float] = None  # Precomputed k_trans, shared across roofs
+    ) -> Dict[str, float]:
+        """
+        Performs a daily simulation.
+
+        Since we might only have daily aggregates from OWM Free API (or limited OneCall),
+        we will use pvlib to get a transposition factor based on geometry.
+
+        However, to be "Scientific", we should generate a clearsky profile for the day,
+        scale it to match the observed GHI, and then transpose that.
+        """
+
+        # 1. Get POA (Plane of Array) Irradiance Factor
+        # For Indonesia (near equator), optimal tilt is low.
+        # We will use pvlib.irradiance.get_total_irradiance if we had components.
+        # With only GHI, we estimate.
 
-        if daily_ghi_clearsky > 0:
-            k_trans = daily_poa_clearsky / daily_ghi_clearsky
+        if transposition_factor is None:
+            k_trans = cls.get_daily_transposition_factor(latitude, longitude, tilt, azimuth)
         else:
-            k_trans = 1.0 # Fallback
+            k_trans = transposition_factor
 
         # 2. Calculate GHI_adj (GTI - Global Tilted Irradiance)
         # Scale the observed daily GHI by the calculated transposition factor
@@ -223,92 +383,31 @@ class SolarEngine:
         """
         Calculates monthly and annual energy production with seasonal variation.
 
-        For Indonesia, we model:
+        Seasonality comes from the site's climatology (see
+        `get_monthly_climate_factors`); without a grid, Indonesia is modelled as:
         - Wet season (Nov-Apr): ~15-20% lower irradiance due to cloud cover
         - Dry season (May-Oct): ~10-15% higher irradiance
 
         Returns detailed monthly breakdown and annual totals.
         """
-        site_location = pvlib.location.Location(latitude, longitude)
-
-        # Monthly adjustment factors for Indonesia (based on climatology)
-        # Values represent ratio of monthly average to annual average
-        monthly_factors = {
-            1: 0.95,   # January - Wet season
-            2: 0.92,   # February - Peak wet
-            3: 0.93,   # March - Wet season
-            4: 0.96,   # April - Transition
-            5: 1.05,   # May - Dry season starts
-            6: 1.10,   # June - Dry season
-            7: 1.12,   # July - Peak dry
-            8: 1.10,   # August - Dry season
-            9: 1.05,   # September - Transition
-            10: 1.02,  # October - Transition
-            11: 0.98,  # November - Wet season starts
-            12: 0.96   # December - Wet season
-        }
-
-        # Monthly temperature variations (offset from base temp)
-        monthly_temp_offset = {
-            1: -1.5,   # January
-            2: -1.0,   # February
-            3: -0.5,   # March
-            4: 0.0,    # April
-            5: 0.5,    # May
-            6: 1.0,    # June
-            7: 1.5,    # July
-            8: 1.0,    # August
-            9: 0.5,    # September
-            10: 0.0,   # October
-            11: -0.5,  # November
-            12: -1.0   # December
-        }
-
-        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        # Transposition factors for all 12 months (table lookup or one pvlib pass)
+        monthly_k_trans = cls.get_monthly_transposition_factors(latitude, longitude, tilt, azimuth)
+        ghi_factors, temp_offsets = cls.get_monthly_climate_factors(latitude, longitude)
 
         monthly_production = []
         annual_total = 0
 
         for month in range(1, 13):
-            # Get days in month
-            if month in [1, 3, 5, 7, 8, 10, 12]:
-                days = 31
-            elif month in [4, 6, 9, 11]:
-                days = 30
-            else:
-                days = 28  # Simplified for February
+            days = cls.DAYS_IN_MONTH[month - 1]
 
             # Adjusted GHI for this month
-            monthly_ghi = base_ghi_daily_kwh * monthly_factors[month]
+            monthly_ghi = base_ghi_daily_kwh * ghi_factors[month - 1]
 
             # Adjusted temperature for this month
-            monthly_temp = base_temp_c + monthly_temp_offset[month]
-
-            # Calculate transposition factor for this month
-            # Use the 15th of each month as representative
-            year = datetime.now().year
-            month_times = pd.date_range(
-                start=datetime(year, month, 15),
-                periods=24,
-                freq='h',
-                tz='Asia/Jakarta'
-            )
-            solpos = site_location.get_solarposition(month_times)
-            clearsky = site_location.get_clearsky(month_times)
-            poa_sky = pvlib.irradiance.get_total_irradiance(
-                surface_tilt=tilt,
-                surface_azimuth=azimuth,
-                dni=clearsky['dni'],
-                ghi=clearsky['ghi'],
-                dhi=clearsky['dhi'],
-                solar_zenith=solpos['apparent_zenith'],
-                solar_azimuth=solpos['azimuth']
-            )
+            monthly_temp = base_temp_c + temp_offsets[month - 1]
 
-            daily_ghi_clearsky = clearsky['ghi'].sum()
-            daily_poa_clearsky = poa_sky['poa_global'].sum()
-            k_trans = daily_poa_clearsky / daily_ghi_clearsky if daily_ghi_clearsky > 0 else 1.0
+            # Transposition factor for this month's representative day
+            k_trans = monthly_k_trans[month - 1]
 
             # Calculate POA irradiance
             ghi_adj = monthly_ghi * k_trans
@@ -323,7 +422,7 @@ class SolarEngine:
             monthly_energy = daily_energy * days
 
             monthly_production.append({
-                'month': month_names[month - 1],
+                'month': cls.MONTH_NAMES[month - 1],
                 'days': days,
                 'ghi_daily_kwh': round(monthly_ghi, 2),
                 'temp_avg_c': round(monthly_temp, 1),
@@ -334,17 +433,458 @@ class SolarEngine:
 
             annual_total += monthly_energy
 
+        return cls._summarize_monthly(monthly_production, annual_total)
+
+    @staticmethod
+    def _summarize_monthly(monthly_production: List[Dict], annual_total: float) -> Dict[str, any]:
+        """Builds the monthly/annual summary shared by the monthly and annual engines."""
+        peak = max(monthly_production, key=lambda x: x['monthly_energy_kwh'])
+        lowest = min(monthly_production, key=lambda x: x['monthly_energy_kwh'])
         return {
             'monthly_breakdown': monthly_production,
             'annual_total_kwh': round(annual_total, 0),
             'average_daily_kwh': round(annual_total / 365, 2),
-            'peak_month': max(monthly_production, key=lambda x: x['monthly_energy_kwh'])['month'],
-            'lowest_month': min(monthly_production, key=lambda x: x['monthly_energy_kwh'])['month'],
+            'peak_month': peak['month'],
+            'lowest_month': lowest['month'],
             'seasonal_variation': round(
-                (max(monthly_production, key=lambda x: x['monthly_energy_kwh'])['monthly_energy_kwh'] -
-                 min(monthly_production, key=lambda x: x['monthly_energy_kwh'])['monthly_energy_kwh']) /
+                (peak['monthly_energy_kwh'] - lowest['monthly_energy_kwh']) /
                 (annual_total / 12) * 100, 1
-            )
+            ) if annual_total > 0 else 0.0
+        }
+
+    @classmethod
+    def get_hourly_times(cls, latitude: float, longitude: float) -> pd.DatetimeIndex:
+        """
+        Hourly timestamps for the simulation year in the site's local time zone.
+        Stamped at mid-hour so each sample represents the average of its hour.
+        """
+        return hourly_times(local_timezone(latitude, longitude))
+
+    @classmethod
+    def prepare_annual_geometry(cls, latitude: float, longitude: float) -> Dict[str, np.ndarray]:
+        """
+        Solar geometry and monthly climate factors for the simulation year,
+        independent of roof orientation.
+
+        Solar position and clear-sky irradiance come from the shared ephemeris
+        cache (0.1 degree cells, local time); the result is shared across every
+        tilt/azimuth evaluated at the site (or weather grid cell).
+        """
+        ephemeris = get_ephemeris_cache().get(latitude, longitude)
+        ghi_factors, temp_offsets = cls.get_monthly_climate_factors(latitude, longitude)
+        geometry = {field: ephemeris[field].astype(float) for field in EPHEMERIS_FIELDS}
+        geometry.update({
+            'day_of_year': np.repeat(np.arange(1, 366), 24),
+            'ghi_factors': ghi_factors,
+            'temp_offsets': temp_offsets,
+        })
+        return geometry
+
+    @classmethod
+    def build_hourly_weather(
+        cls,
+        geometry: Dict[str, np.ndarray],
+        base_ghi_daily_kwh: Optional[float] = None,
+        base_temp_c: Optional[float] = None,
+        hourly_ghi: Optional[np.ndarray] = None,
+        hourly_temp: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hourly GHI (W/m2) and air temperature (Celsius) for the simulation year.
+
+        Hourly arrays are used as-is; daily scalars are shaped into an hourly year
+        by scaling each day's clear-sky curve with the site's monthly climate factors.
+        """
+        days_per_month = np.array(cls.DAYS_IN_MONTH)
+        month_of_day = np.repeat(np.arange(12), days_per_month)  # 0-based, length 365
+
+        if hourly_ghi is not None:
+            ghi = np.asarray(hourly_ghi, dtype=float)
+            if ghi.shape != (cls.HOURS_PER_YEAR,):
+                raise ValueError(f"hourly_ghi must have {cls.HOURS_PER_YEAR} values")
+        elif base_ghi_daily_kwh is not None:
+            clearsky_ghi = geometry['clearsky_ghi']
+            ghi_factors = geometry['ghi_factors']
+            target_wh = base_ghi_daily_kwh * 1000 * ghi_factors[month_of_day]
+            clearsky_wh = clearsky_ghi.reshape(365, 24).sum(axis=1)
+            scale = np.divide(target_wh, clearsky_wh, out=np.zeros(365), where=clearsky_wh > 0)
+            ghi = clearsky_ghi * np.repeat(scale, 24)
+        else:
+            raise ValueError("Either hourly_ghi or base_ghi_daily_kwh is required")
+
+        if hourly_temp is not None:
+            temp_air = np.asarray(hourly_temp, dtype=float)
+            if temp_air.shape != (cls.HOURS_PER_YEAR,):
+                raise ValueError(f"hourly_temp must have {cls.HOURS_PER_YEAR} values")
+        elif base_temp_c is not None:
+            temp_offsets = geometry['temp_offsets']
+            temp_air = np.repeat(base_temp_c + temp_offsets[month_of_day], 24)
+        else:
+            raise ValueError("Either hourly_temp or base_temp_c is required")
+
+        return ghi, temp_air
+
+    @classmethod
+    def calculate_hourly_yield(
+        cls,
+        geometry: Dict[str, np.ndarray],
+        tilt: float,
+        azimuth: float,
+        ghi: np.ndarray,
+        temp_air: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Hourly plane-of-array irradiance and PR for one orientation.
+
+        The result is independent of roof area and panel efficiency, so it can be
+        shared by every roof with the same weather cell and orientation.
+        """
+        # Decompose GHI (Erbs) and transpose to the plane of array
+        components = pvlib.irradiance.erbs(ghi, geometry['solar_zenith'], geometry['day_of_year'])
+        poa = pvlib.irradiance.get_total_irradiance(
+            surface_tilt=tilt,
+            surface_azimuth=azimuth,
+            solar_zenith=geometry['solar_zenith'],
+            solar_azimuth=geometry['solar_azimuth'],
+            dni=np.asarray(components['dni']),
+            ghi=ghi,
+            dhi=np.asarray(components['dhi']),
+            albedo=cls.ALBEDO
+        )
+        poa_global = np.nan_to_num(np.asarray(poa['poa_global'], dtype=float)).clip(min=0.0)
+
+        # Cell temperature & PR per hour
+        t_cell = cls.calculate_cell_temperature(temp_air, ghi)
+        pr = cls.calculate_dynamic_pr(t_cell)
+
+        return {
+            'ghi': ghi,
+            'temp_air': temp_air,
+            'poa_global': poa_global,
+            'pr': pr,
+        }
+
+    @classmethod
+    def calculate_orientation_sweep(
+        cls,
+        geometry: Dict[str, np.ndarray],
+        ghi: np.ndarray,
+        temp_air: np.ndarray,
+        tilts: np.ndarray,
+        azimuths: np.ndarray
+    ) -> np.ndarray:
+        """
+        Annual specific yield (kWh/kWp, i.e. sum of POA kWh/m2 x PR) for every
+        tilt x azimuth in one vectorized pass.
+
+        Same physics as `calculate_hourly_yield` (Erbs, isotropic transposition),
+        but the decomposition, PR and sun vectors are computed once and shared by
+        all orientations. Only the beam term depends on azimuth; the sky-diffuse
+        and ground terms reduce to per-tilt scalars.
+
+        Returns:
+            float array of shape (len(tilts), len(azimuths))
+        """
+        tilts = np.asarray(tilts, dtype=float)
+        azimuths = np.asarray(azimuths, dtype=float)
+
+        zenith = geometry['solar_zenith']
+        components = pvlib.irradiance.erbs(ghi, zenith, geometry['day_of_year'])
+        dni = np.nan_to_num(np.asarray(components['dni'], dtype=float))
+        dhi = np.nan_to_num(np.asarray(components['dhi'], dtype=float))
+        weight = cls.calculate_dynamic_pr(cls.calculate_cell_temperature(temp_air, ghi)) / 1000
+
+        # Hours without sun contribute nothing
+        daylight = (ghi > 0) & (zenith < 90)
+        zen = np.radians(zenith[daylight])
+        sun_az = np.radians(geometry['solar_azimuth'][daylight])
+        sun_z = np.cos(zen)
+        sun_n = np.sin(zen) * np.cos(sun_az)
+        sun_e = np.sin(zen) * np.sin(sun_az)
+        beam_weight = (weight * dni)[daylight]
+
+        cos_t, sin_t = np.cos(np.radians(tilts)), np.sin(np.radians(tilts))
+        cos_a, sin_a = np.cos(np.radians(azimuths)), np.sin(np.radians(azimuths))
+        # Horizontal component of the sun vector projected on each azimuth: (A, H)
+        horizontal = cos_a[:, None] * sun_n + sin_a[:, None] * sun_e
+
+        beam = np.empty((len(tilts), len(azimuths)))
+        chunk = max(1, cls.SWEEP_CHUNK_ELEMENTS // max(1, horizontal.size))
+        for start in range(0, len(tilts), chunk):
+            t = slice(start, start + chunk)
+            cos_aoi = cos_t[t, None, None] * sun_z + sin_t[t, None, None] * horizontal
+            beam[t] = np.maximum(cos_aoi, 0.0) @ beam_weight
+
+        sky = (1 + cos_t) / 2 * np.sum(weight * dhi)
+        ground = cls.ALBEDO * (1 - cos_t) / 2 * np.sum(weight * ghi)
+        return beam + (sky + ground)[:, None]
+
+    @staticmethod
+    def find_optimal_orientation(
+        yields: np.ndarray,
+        tilts: np.ndarray,
+        azimuths: np.ndarray,
+        tolerance: float = 0.02
+    ) -> Dict[str, any]:
+        """
+        Optimum of an orientation sweep and every orientation whose yield is
+        within `tolerance` (fraction) of it.
+        """
+        best = np.unravel_index(np.argmax(yields), yields.shape)
+        best_yield = float(yields[best])
+        threshold = best_yield * (1 - tolerance)
+        tilt_index, azimuth_index = np.nonzero(yields >= threshold)
+        return {
+            'tilt': float(tilts[best[0]]),
+            'azimuth': float(azimuths[best[1]]),
+            'yield_kwh_per_kwp': best_yield,
+            'threshold_kwh_per_kwp': threshold,
+            'near_optimal': [
+                (float(tilts[i]), float(azimuths[j])) for i, j in zip(tilt_index, azimuth_index)
+            ],
+        }
+
+    @classmethod
+    def calculate_optimal_yield(
+        cls,
+        geometry: Dict[str, np.ndarray],
+        ghi: np.ndarray,
+        temp_air: np.ndarray
+    ) -> float:
+        """Best annual specific yield (kWh/kWp) on the REFERENCE_TILTS x REFERENCE_AZIMUTHS grid."""
+        return float(cls.calculate_orientation_sweep(
+            geometry, ghi, temp_air, cls.REFERENCE_TILTS, cls.REFERENCE_AZIMUTHS
+        ).max())
+
+    @classmethod
+    def get_optimal_yield(
+        cls,
+        latitude: float,
+        longitude: float,
+        ghi_daily_kwh: float,
+        temp_avg_c: float
+    ) -> float:
+        """
+        `calculate_optimal_yield` at a weather grid cell centre under daily
+        weather; the reference sweep runs once per (cell, weather) and is then
+        served from the optimum cache.
+        """
+        cache = get_optimum_cache()
+        key = (latitude, longitude, ghi_daily_kwh, temp_avg_c)
+        optimum = cache.get(key)
+        if optimum is None:
+            geometry = cls.prepare_annual_geometry(latitude, longitude)
+            ghi, temp_air = cls.build_hourly_weather(geometry, ghi_daily_kwh, temp_avg_c)
+            optimum = cls.calculate_optimal_yield(geometry, ghi, temp_air)
+            cache.set(key, optimum)
+        return optimum
+
+    @classmethod
+    def calculate_orientation_loss(
+        cls,
+        geometry: Dict[str, np.ndarray],
+        ghi: np.ndarray,
+        temp_air: np.ndarray,
+        tilt: float,
+        azimuth: float,
+        optimal_yield: Optional[float] = None
+    ) -> float:
+        """
+        Fractional yield loss of (tilt, azimuth) relative to the best orientation
+        on the REFERENCE_TILTS x REFERENCE_AZIMUTHS grid at this site.
+
+        Pass `optimal_yield` (see `get_optimal_yield`) to skip the reference sweep.
+        """
+        if optimal_yield is None:
+            optimal_yield = cls.calculate_optimal_yield(geometry, ghi, temp_air)
+        actual = cls.calculate_orientation_sweep(geometry, ghi, temp_air, [tilt], [azimuth])[0, 0]
+        best = max(optimal_yield, float(actual))
+        return 1 - actual / best if best > 0 else 0.0
+
+    @classmethod
+    def aggregate_annual_yield(
+        cls,
+        hourly_yield: Dict[str, np.ndarray],
+        area_sqm: float,
+        panel_efficiency: float = 0.20
+    ) -> Dict[str, any]:
+        """Scales an hourly yield to a roof and aggregates it per month."""
+        days_per_month = np.array(cls.DAYS_IN_MONTH)
+        month_start_hours = np.concatenate(([0], np.cumsum(days_per_month)[:-1])) * 24
+
+        poa_global = hourly_yield['poa_global']
+
+        # Hourly energy (kWh): A * POA(kWh/m2) * eta * PR
+        energy = area_sqm * (poa_global / 1000) * panel_efficiency * hourly_yield['pr']
+
+        monthly_energy = np.add.reduceat(energy, month_start_hours)
+        monthly_ghi_kwh = np.add.reduceat(hourly_yield['ghi'], month_start_hours) / 1000
+        monthly_temp = np.add.reduceat(hourly_yield['temp_air'], month_start_hours) / (days_per_month * 24)
+        monthly_poa_kwh = np.add.reduceat(poa_global, month_start_hours) / 1000
+
+        # Energy-weighted PR: what the month actually achieved relative to its POA
+        reference = area_sqm * monthly_poa_kwh * panel_efficiency
+        monthly_pr = np.divide(monthly_energy, reference, out=np.zeros(12), where=reference > 0)
+
+        monthly_production = [
+            {
+                'month': cls.MONTH_NAMES[i],
+                'days': int(days_per_month[i]),
+                'ghi_daily_kwh': round(float(monthly_ghi_kwh[i] / days_per_month[i]), 2),
+                'temp_avg_c': round(float(monthly_temp[i]), 1),
+                'pr_value': round(float(monthly_pr[i]), 3),
+                'daily_energy_kwh': round(float(monthly_energy[i] / days_per_month[i]), 2),
+                'monthly_energy_kwh': round(float(monthly_energy[i]), 0)
+            }
+            for i in range(12)
+        ]
+
+        return cls._summarize_monthly(monthly_production, float(energy.sum()))
+
+    @classmethod
+    def calculate_annual_simulation(
+        cls,
+        latitude: float,
+        longitude: float,
+        area_sqm: float,
+        tilt: float,
+        azimuth: float,
+        base_ghi_daily_kwh: Optional[float] = None,
+        base_temp_c: Optional[float] = None,
+        hourly_ghi: Optional[np.ndarray] = None,
+        hourly_temp: Optional[np.ndarray] = None,
+        panel_efficiency: float = 0.20,
+        geometry: Optional[Dict[str, np.ndarray]] = None
+    ) -> Dict[str, any]:
+        """
+        Simulates a full hourly year (8760 h) in a single vectorized pass.
+
+        Weather input is either:
+        - hourly arrays: `hourly_ghi` (W/m2) and `hourly_temp` (Celsius), 8760 values each
+        - daily scalars: `base_ghi_daily_kwh` and `base_temp_c`, shaped into an hourly
+          year by scaling the clear-sky profile with the monthly climatology factors
+
+        GHI is split into DNI/DHI with the Erbs model, transposed to the plane of
+        array, and the tropical PR is applied hour by hour. Returns the same
+        structure as `calculate_monthly_simulation`.
+
+        Pass `geometry` from `prepare_annual_geometry` to skip the solar position
+        and clear-sky computation when simulating many roofs at one site.
+        """
+        if geometry is None:
+            geometry = cls.prepare_annual_geometry(latitude, longitude)
+
+        ghi, temp_air = cls.build_hourly_weather(
+            geometry, base_ghi_daily_kwh, base_temp_c, hourly_ghi, hourly_temp
+        )
+        hourly_yield = cls.calculate_hourly_yield(geometry, tilt, azimuth, ghi, temp_air)
+        return cls.aggregate_annual_yield(hourly_yield, area_sqm, panel_efficiency)
+
+    @classmethod
+    def prepare_forecast_geometry(
+        cls,
+        latitude: float,
+        longitude: float,
+        times: pd.DatetimeIndex
+    ) -> Dict[str, np.ndarray]:
+        """
+        Solar geometry for tz-aware mid-hour timestamps of any year, looked up
+        in the ephemeris cache by local (day-of-year, hour). Leap days reuse
+        Feb 28; the sun's position drifts well under a degree between years.
+        """
+        ephemeris = get_ephemeris_cache().get(latitude, longitude)
+        local = times.tz_convert(ephemeris['timezone'])
+        day = local.dayofyear.values - (local.is_leap_year & (local.month > 2))
+        day = np.minimum(day, 365)
+        hours = (day - 1) * 24 + local.hour.values
+        geometry = {field: ephemeris[field][hours].astype(float) for field in EPHEMERIS_FIELDS}
+        geometry['day_of_year'] = day
+        return geometry
+
+    @classmethod
+    def build_forecast_weather(
+        cls,
+        geometry: Dict[str, np.ndarray],
+        times: pd.DatetimeIndex,
+        forecast_times: pd.DatetimeIndex,
+        cloud_cover: np.ndarray,
+        temp_air: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Hourly (GHI W/m2, air temperature Celsius, cloud cover %) at `times` from
+        a coarser forecast: cover and temperature are interpolated linearly
+        (held constant beyond the ends), GHI follows from the clear-sky GHI of
+        `geometry` with the Kasten-Czeplak cloud-cover model.
+        """
+        x = times.asi8 / 1e9
+        xp = forecast_times.asi8 / 1e9
+        cover = np.interp(x, xp, np.asarray(cloud_cover, dtype=float)).clip(0.0, 100.0)
+        temp = np.interp(x, xp, np.asarray(temp_air, dtype=float))
+        ghi = geometry['clearsky_ghi'] * (1 - cls.CLOUD_ATTENUATION * (cover / 100) ** cls.CLOUD_EXPONENT)
+        return ghi, temp, cover
+
+    @classmethod
+    def calculate_forecast_simulation(
+        cls,
+        latitude: float,
+        longitude: float,
+        area_sqm: float,
+        tilt: float,
+        azimuth: float,
+        forecast_times: pd.DatetimeIndex,
+        cloud_cover: np.ndarray,
+        temp_air: np.ndarray,
+        start: pd.Timestamp,
+        hours: Optional[int] = None,
+        panel_efficiency: float = 0.20
+    ) -> Dict[str, any]:
+        """
+        Expected production per hour from `start` (UTC, floored to the hour) to
+        the last forecast step, at most `hours` hours, in one vectorized pass.
+
+        The forecast (e.g. OWM's 3-hourly steps) is interpolated to hourly
+        mid-hour samples and run through the same Erbs / transposition / PR chain
+        as the annual simulation. Hourly and daily results are in local time.
+        """
+        start = pd.Timestamp(start).tz_convert('UTC').floor('h')
+        count = int((forecast_times[-1] - start) / pd.Timedelta(hours=1))
+        if hours is not None:
+            count = min(count, hours)
+        if count <= 0:
+            raise ValueError("Forecast does not extend past the start time")
+        times = pd.date_range(start=start + pd.Timedelta(minutes=30), periods=count, freq='h')
+
+        geometry = cls.prepare_forecast_geometry(latitude, longitude, times)
+        ghi, temp, cover = cls.build_forecast_weather(geometry, times, forecast_times, cloud_cover, temp_air)
+        hourly_yield = cls.calculate_hourly_yield(geometry, tilt, azimuth, ghi, temp)
+        energy = area_sqm * (hourly_yield['poa_global'] / 1000) * panel_efficiency * hourly_yield['pr']
+
+        tz = local_timezone(latitude, longitude)
+        local_start = (times - pd.Timedelta(minutes=30)).tz_convert(tz)
+        hourly = [
+            {
+                'time': local_start[i].to_pydatetime(),
+                'ghi_w_m2': round(float(ghi[i]), 1),
+                'temp_c': round(float(temp[i]), 1),
+                'cloud_cover_percent': round(float(cover[i]), 1),
+                'energy_kwh': round(float(energy[i]), 3),
+            }
+            for i in range(count)
+        ]
+        frame = pd.DataFrame({'energy': energy, 'cover': cover}, index=local_start)
+        daily = [
+            {
+                'day': day.date(),
+                'energy_kwh': round(float(row['energy']), 2),
+                'mean_cloud_cover_percent': round(float(row['cover']), 1),
+            }
+            for day, row in frame.groupby(frame.index.normalize()).agg({'energy': 'sum', 'cover': 'mean'}).iterrows()
+        ]
+        return {
+            'timezone': tz,
+            'hourly': hourly,
+            'daily': daily,
+            'total_energy_kwh': round(float(energy.sum()), 2),
         }
 
     @classmethod
@@ -356,7 +896,9 @@ class SolarEngine:
         setback_m: float = 0.5,       # Edge setback
         row_spacing_m: float = 0.2,   # Spacing between rows
         tilt: float = 20.0,
-        panel_efficiency: float = 0.20
+        panel_efficiency: float = 0.20,
+        roof_polygon: Optional[Polygon] = None,
+        epsg: Optional[int] = None
     ) -> Dict[str, any]:
         """
         Calculates optimal panel layout and counts for a given roof area.
@@ -367,47 +909,65 @@ class SolarEngine:
         - Panel dimensions
         - Tilt angle (affects effective coverage)
 
+        With `roof_polygon` (projected, meters) panels are packed into the real
+        roof shape (see `core.panel_packing`); with `epsg` as well, the panel
+        rectangles are returned as [[lat, lng], ...] for the map. Without it the
+        roof is approximated as a square of the same area.
+
         Returns panel count, layout dimensions, and coverage percentage.
         """
-        # Calculate usable area after setbacks
-        # Assuming rectangular roof for simplicity
-        usable_width = np.sqrt(area_sqm) - (2 * setback_m)
-        usable_length = np.sqrt(area_sqm) - (2 * setback_m)
-
-        if usable_width <= 0 or usable_length <= 0:
-            return {
-                'total_panels': 0,
-                'rows': 0,
-                'columns': 0,
-                'usable_area_sqm': 0,
-                'coverage_percentage': 0,
-                'total_panel_area_sqm': 0
+        if roof_polygon is not None:
+            packed = pack_panels(roof_polygon, panel_width_m, panel_height_m, setback_m, row_spacing_m)
+            usable_area = packed['usable_area_sqm']
+            columns, rows = packed['columns'], packed['rows']
+            total_panels = packed['total_panels']
+            layout_width, layout_height = packed['layout_width_m'], packed['layout_height_m']
+            extra = {
+                'orientation_deg': round(packed['orientation_deg'], 1),
+                'panel_orientation': packed['panel_orientation'],
             }
-
-        # Calculate how many panels fit in each dimension
-        panels_per_row = int(usable_width // panel_width_m)
-        panels_per_column = int(usable_length // (panel_height_m + row_spacing_m))
-
-        # Also try swapping dimensions (panels rotated)
-        panels_per_row_alt = int(usable_width // panel_height_m)
-        panels_per_column_alt = int(usable_length // (panel_width_m + row_spacing_m))
-
-        # Use the orientation that fits more panels
-        if panels_per_row * panels_per_column >= panels_per_row_alt * panels_per_column_alt:
-            columns = panels_per_row
-            rows = panels_per_column
-            layout_width = columns * panel_width_m
-            layout_height = rows * panel_height_m + (rows - 1) * row_spacing_m
+            if epsg is not None:
+                extra['panels'] = np.round(unproject_points(packed['corners'], epsg), 7).tolist()
         else:
-            columns = panels_per_row_alt
-            rows = panels_per_column_alt
-            layout_width = columns * panel_height_m
-            layout_height = rows * panel_width_m + (rows - 1) * row_spacing_m
+            # Assuming square roof of the same area
+            usable_width = np.sqrt(area_sqm) - (2 * setback_m)
+            usable_length = np.sqrt(area_sqm) - (2 * setback_m)
+
+            if usable_width <= 0 or usable_length <= 0:
+                return {
+                    'total_panels': 0,
+                    'rows': 0,
+                    'columns': 0,
+                    'usable_area_sqm': 0,
+                    'coverage_percentage': 0,
+                    'total_panel_area_sqm': 0
+                }
+
+            # Calculate how many panels fit in each dimension
+            panels_per_row = int(usable_width // panel_width_m)
+            panels_per_column = int(usable_length // (panel_height_m + row_spacing_m))
+
+            # Also try swapping dimensions (panels rotated)
+            panels_per_row_alt = int(usable_width // panel_height_m)
+            panels_per_column_alt = int(usable_length // (panel_width_m + row_spacing_m))
+
+            # Use the orientation that fits more panels
+            if panels_per_row * panels_per_column >= panels_per_row_alt * panels_per_column_alt:
+                columns = panels_per_row
+                rows = panels_per_column
+                layout_width = columns * panel_width_m
+                layout_height = rows * panel_height_m + (rows - 1) * row_spacing_m
+            else:
+                columns = panels_per_row_alt
+                rows = panels_per_column_alt
+                layout_width = columns * panel_height_m
+                layout_height = rows * panel_width_m + (rows - 1) * row_spacing_m
 
-        total_panels = columns * rows
+            total_panels = columns * rows
+            usable_area = usable_width * usable_length
+            extra = {}
 
         # Calculate areas
-        usable_area = usable_width * usable_length
         total_panel_area = total_panels * panel_width_m * panel_height_m
         coverage_percentage = (total_panel_area / usable_area * 100) if usable_area > 0 else 0
 
@@ -433,7 +993,8 @@ class SolarEngine:
             },
             'estimated_system_kwp': round(total_panels * 0.45, 2),  # Assuming 450W panels
             'setback_distance_m': setback_m,
-            'row_spacing_m': row_spacing_m
+            'row_spacing_m': row_spacing_m,
+            **extra
         }
 
     @classmethod
@@ -442,7 +1003,8 @@ class SolarEngine:
         latitude: float,
         tilt: float,
         azimuth: float,
-        temp_avg_c: float
+        temp_avg_c: float,
+        orientation_loss: Optional[float] = None
     ) -> Dict[str, float]:
         """
         Calculates detailed system losses by component.
@@ -454,6 +1016,10 @@ class SolarEngine:
         - Wiring losses
         - Inverter efficiency
         - Orientation losses (for suboptimal tilt/azimuth)
+
+        Pass `orientation_loss` from `calculate_orientation_loss` (simulated
+        against the site's best orientation); otherwise it is estimated from
+        the deviation from tilt = |latitude|, north-facing.
         """
         # 1. Temperature losses
         # Higher temperatures in tropical regions increase losses
@@ -473,20 +1039,21 @@ class SolarEngine:
         inverter_loss = 1 - inverter_efficiency  # 3%
 
         # 6. Orientation losses (deviation from optimal)
-        # Optimal for Indonesia (near equator): tilt ~latitude, azimuth ~0 (North)
-        # Calculate optimal tilt based on latitude
-        optimal_tilt = abs(latitude)  # Simplified
-        optimal_azimuth = 0  # North-facing
+        if orientation_loss is None:
+            # Optimal for Indonesia (near equator): tilt ~latitude, azimuth ~0 (North)
+            # Calculate optimal tilt based on latitude
+            optimal_tilt = abs(latitude)  # Simplified
+            optimal_azimuth = 0  # North-facing
 
-        # Tilt penalty
-        tilt_diff = abs(tilt - optimal_tilt)
-        tilt_loss = tilt_diff * 0.0015  # ~0.15% loss per degree deviation
+            # Tilt penalty
+            tilt_diff = abs(tilt - optimal_tilt)
+            tilt_loss = tilt_diff * 0.0015  # ~0.15% loss per degree deviation
 
-        # Azimuth penalty (East/West deviations)
-        azimuth_diff = min(abs(azimuth - optimal_azimuth), abs(azimuth - 180))
-        azimuth_loss = azimuth_diff * 0.0005  # ~0.05% loss per degree deviation
+            # Azimuth penalty (East/West deviations)
+            azimuth_diff = min(abs(azimuth - optimal_azimuth), abs(azimuth - 180))
+            azimuth_loss = azimuth_diff * 0.0005  # ~0.05% loss per degree deviation
 
-        orientation_loss = min(tilt_loss + azimuth_loss, 0.15)  # Cap at 15%
+            orientation_loss = min(tilt_loss + azimuth_loss, 0.15)  # Cap at 15%
 
         # Calculate total DC losses
         total_dc_losses = temp_loss + soiling_loss + mismatch_loss + wiring_loss + orientation_loss
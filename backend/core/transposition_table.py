@@ -0,0 +1,300 @@
+"""
+Precomputed Transposition Factor Table for SolarRoute.
+
+The transposition factor k_trans = sum(POA_clearsky) / sum(GHI_clearsky) only
+depends on site geometry and the time of year, never on the user. Instead of
+running a full pvlib clear-sky pass per request we build a table offline,
+indexed by (lat, lon, tilt, azimuth, month), and interpolate it at query time.
+
+Build the table with:
+    python -m core.transposition_table --output data/k_trans_v1.npz
+"""
+
+import os
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import pvlib
+from typing import Dict, Optional
+from core.geometry import local_timezone
+
+# Bump whenever the physics used to build the table changes.
+TABLE_VERSION = 1
+
+# Representative day of each month (matches SolarEngine's monthly simulation)
+REPRESENTATIVE_DAY = 15
+REFERENCE_YEAR = 2023  # Non-leap reference year, keeps the table reproducible
+REPRESENTATIVE_DAYS_OF_YEAR = pd.DatetimeIndex([
+    pd.Timestamp(REFERENCE_YEAR, month, REPRESENTATIVE_DAY) for month in range(1, 13)
+]).dayofyear.values
+
+DEFAULT_TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data', f'k_trans_v{TABLE_VERSION}.npz'
+)
+
+# Default grid covers Indonesia (Sabang to Merauke, Miangas to Rote)
+DEFAULT_GRID = {
+    'lat': (-11.0, 6.0, 1.0),
+    'lon': (95.0, 141.0, 2.0),
+    'tilt': (0.0, 90.0, 5.0),
+    'azimuth': (0.0, 360.0, 15.0),
+}
+
+
+def _axis(start: float, stop: float, step: float) -> np.ndarray:
+    """Inclusive, evenly spaced grid axis."""
+    count = int(round((stop - start) / step)) + 1
+    return np.linspace(start, stop, count)
+
+
+def compute_monthly_factors(
+    latitude: float,
+    longitude: float,
+    tilts: np.ndarray,
+    azimuths: np.ndarray,
+    sky: Optional[Dict[str, np.ndarray]] = None
+) -> np.ndarray:
+    """
+    Computes clear-sky k_trans for every (tilt, azimuth, month) at one site.
+
+    All twelve representative days (24 local hours each, in the site's time
+    zone) are evaluated in a single pvlib pass and the tilt/azimuth grid is
+    broadcast against the time axis. `sky` may supply those 288 hours of
+    solar_zenith/solar_azimuth/clearsky_* (e.g. from the ephemeris cache).
+
+    Returns:
+        float array of shape (len(tilts), len(azimuths), 12)
+    """
+    if sky is None:
+        site_location = pvlib.location.Location(latitude, longitude)
+        tz = local_timezone(latitude, longitude)
+        days = [
+            pd.date_range(
+                start=pd.Timestamp(REFERENCE_YEAR, month, REPRESENTATIVE_DAY),
+                periods=24, freq='h', tz=tz
+            )
+            for month in range(1, 13)
+        ]
+        times = days[0].append(days[1:])
+        solpos = site_location.get_solarposition(times)
+        clearsky = site_location.get_clearsky(times, solar_position=solpos)
+        sky = {
+            'solar_zenith': solpos['apparent_zenith'].values,
+            'solar_azimuth': solpos['azimuth'].values,
+            'clearsky_ghi': clearsky['ghi'].values,
+            'clearsky_dni': clearsky['dni'].values,
+            'clearsky_dhi': clearsky['dhi'].values,
+        }
+
+    poa_sky = pvlib.irradiance.get_total_irradiance(
+        surface_tilt=np.asarray(tilts, dtype=float)[:, None, None],
+        surface_azimuth=np.asarray(azimuths, dtype=float)[None, :, None],
+        solar_zenith=sky['solar_zenith'],
+        solar_azimuth=sky['solar_azimuth'],
+        dni=sky['clearsky_dni'],
+        ghi=sky['clearsky_ghi'],
+        dhi=sky['clearsky_dhi']
+    )
+
+    # (tilt, azimuth, month, hour) -> daily sums per month
+    poa = np.nan_to_num(np.asarray(poa_sky['poa_global'], dtype=float))
+    poa = poa.reshape(len(tilts), len(azimuths), 12, 24).sum(axis=-1)
+    ghi = np.asarray(sky['clearsky_ghi'], dtype=float).reshape(12, 24).sum(axis=-1)
+
+    k_trans = np.ones_like(poa)
+    np.divide(poa, ghi, out=k_trans, where=ghi > 0)
+    return k_trans
+
+
+class TranspositionTable:
+    """
+    Versioned k_trans lookup table with multilinear interpolation.
+
+    Axes: lat, lon, tilt, azimuth (0-360 inclusive, wraps) and month (exact).
+    """
+
+    AXES = ('lat', 'lon', 'tilt', 'azimuth')
+
+    def __init__(self, k_trans: np.ndarray, axes: Dict[str, np.ndarray], version: int = TABLE_VERSION):
+        self.k_trans = k_trans
+        self.axes = axes
+        self.version = version
+
+    @classmethod
+    def build(
+        cls,
+        lat_axis: np.ndarray,
+        lon_axis: np.ndarray,
+        tilt_axis: np.ndarray,
+        azimuth_axis: np.ndarray,
+        progress: bool = False
+    ) -> "TranspositionTable":
+        """Builds the table by running one pvlib pass per (lat, lon) node."""
+        k_trans = np.empty(
+            (len(lat_axis), len(lon_axis), len(tilt_axis), len(azimuth_axis), 12),
+            dtype=np.float32
+        )
+        total = len(lat_axis) * len(lon_axis)
+        for i, lat in enumerate(lat_axis):
+            for j, lon in enumerate(lon_axis):
+                k_trans[i, j] = compute_monthly_factors(lat, lon, tilt_axis, azimuth_axis)
+                if progress:
+                    done = i * len(lon_axis) + j + 1
+                    print(f"  [{done}/{total}] lat={lat:.2f} lon={lon:.2f}")
+
+        axes = {
+            'lat': np.asarray(lat_axis, dtype=float),
+            'lon': np.asarray(lon_axis, dtype=float),
+            'tilt': np.asarray(tilt_axis, dtype=float),
+            'azimuth': np.asarray(azimuth_axis, dtype=float),
+        }
+        return cls(k_trans, axes)
+
+    def save(self, path: str):
+        """Stores the table as a compressed .npz archive."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(
+            path,
+            version=np.array(self.version),
+            k_trans=self.k_trans,
+            **{f'axis_{name}': self.axes[name] for name in self.AXES}
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "TranspositionTable":
+        """Loads a table written by `save`. Raises ValueError on version mismatch."""
+        with np.load(path) as data:
+            version = int(data['version'])
+            if version != TABLE_VERSION:
+                raise ValueError(
+                    f"Transposition table version {version} does not match "
+                    f"expected version {TABLE_VERSION}"
+                )
+            axes = {name: data[f'axis_{name}'] for name in cls.AXES}
+            k_trans = data['k_trans']
+        return cls(k_trans, axes, version)
+
+    def contains(self, latitude: float, longitude: float, tilt: float) -> bool:
+        """Whether a site lies inside the table's domain."""
+        for name, value in (('lat', latitude), ('lon', longitude), ('tilt', tilt)):
+            axis = self.axes[name]
+            if not axis[0] <= value <= axis[-1]:
+                return False
+        return True
+
+    @staticmethod
+    def _bracket(axis: np.ndarray, value: float):
+        """Returns (lower index, upper index, weight of upper) for a value on an axis."""
+        if len(axis) == 1:
+            return 0, 0, 0.0
+        upper = int(np.clip(np.searchsorted(axis, value, side='right'), 1, len(axis) - 1))
+        lower = upper - 1
+        weight = (value - axis[lower]) / (axis[upper] - axis[lower])
+        return lower, upper, float(np.clip(weight, 0.0, 1.0))
+
+    def lookup_months(
+        self,
+        latitude: float,
+        longitude: float,
+        tilt: float,
+        azimuth: float
+    ) -> Optional[np.ndarray]:
+        """
+        Interpolated k_trans for all 12 months.
+
+        Returns None if the site is outside the table's domain so callers
+        can fall back to the live pvlib path.
+        """
+        if not self.contains(latitude, longitude, tilt):
+            return None
+
+        azimuth = azimuth % 360.0
+        az_axis = self.axes['azimuth']
+        if not az_axis[0] <= azimuth <= az_axis[-1]:
+            return None
+
+        brackets = [
+            self._bracket(self.axes['lat'], latitude),
+            self._bracket(self.axes['lon'], longitude),
+            self._bracket(self.axes['tilt'], tilt),
+            self._bracket(az_axis, azimuth),
+        ]
+
+        # Multilinear interpolation over the 16 surrounding grid nodes
+        result = np.zeros(12, dtype=float)
+        for corner in range(16):
+            weight = 1.0
+            index = []
+            for dim, (lower, upper, w) in enumerate(brackets):
+                if corner >> dim & 1:
+                    weight *= w
+                    index.append(upper)
+                else:
+                    weight *= 1.0 - w
+                    index.append(lower)
+            if weight > 0.0:
+                result += weight * self.k_trans[tuple(index)]
+        return result
+
+    def lookup(
+        self,
+        latitude: float,
+        longitude: float,
+        tilt: float,
+        azimuth: float,
+        month: int
+    ) -> Optional[float]:
+        """Interpolated k_trans for a single month (1-12), or None outside the domain."""
+        factors = self.lookup_months(latitude, longitude, tilt, azimuth)
+        if factors is None:
+            return None
+        return float(factors[month - 1])
+
+
+# Lazily loaded singleton, False marks "tried and unavailable"
+_table = None
+
+def get_transposition_table() -> Optional[TranspositionTable]:
+    """Get the process-wide table, or None if no (valid) table file exists."""
+    global _table
+    if _table is None:
+        path = os.getenv("TRANSPOSITION_TABLE_PATH", DEFAULT_TABLE_PATH)
+        try:
+            _table = TranspositionTable.load(path)
+        except FileNotFoundError:
+            print(f"Transposition table not found at {path}. Using live pvlib path.")
+            _table = False
+        except Exception as e:
+            print(f"Transposition table load failed: {e}. Using live pvlib path.")
+            _table = False
+    return _table or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the SolarRoute k_trans lookup table.")
+    parser.add_argument('--output', default=DEFAULT_TABLE_PATH, help="Output .npz path")
+    for name, (start, stop, step) in DEFAULT_GRID.items():
+        parser.add_argument(
+            f'--{name}', nargs=3, type=float, default=[start, stop, step],
+            metavar=('START', 'STOP', 'STEP'), help=f"{name} grid (inclusive)"
+        )
+    args = parser.parse_args()
+
+    axes = {name: _axis(*getattr(args, name)) for name in DEFAULT_GRID}
+    shape = tuple(len(axes[name]) for name in TranspositionTable.AXES) + (12,)
+    print(f"Building transposition table v{TABLE_VERSION} with shape {shape}")
+
+    started = time.perf_counter()
+    table = TranspositionTable.build(
+        axes['lat'], axes['lon'], axes['tilt'], axes['azimuth'], progress=True
+    )
+    table.save(args.output)
+
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"[OK] Wrote {args.output} ({size_mb:.1f} MB) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Monte Carlo Production Uncertainty for SolarRoute.
+Bank-style P50/P90 estimates of annual production and payback.
+
+The engine's annual energy is linear in the hourly PR, which is itself linear
+in cell temperature, so the hourly year reduces to three sums over POA
+(see `yield_statistics`). Every sample is then evaluated in closed form from
+those sums: the whole ensemble is a handful of NumPy array operations, and
+the site's geometry, transposition and hourly weather are computed once.
+"""
+
+import numpy as np
+from typing import Dict, Optional
+from core.solar_engine import SolarEngine
+
+# Exceedance probabilities reported (P90 = value exceeded in 90% of samples)
+EXCEEDANCE_LEVELS = (50, 75, 90, 99)
+
+
+class UncertaintyModel:
+    """
+    Sampling distributions for the uncertain inputs (per simulated year).
+
+    Irradiance combines resource-data and inter-annual variability. Soiling
+    replaces the deterministic LOSS_SOILING share of SYSTEM_LOSS; the other
+    system losses get a symmetric spread.
+    """
+
+    GHI_SIGMA = 0.05                       # relative
+    TEMP_SIGMA_C = 1.0
+    TEMP_COEFF_SIGMA = 0.0003              # per degree C
+    SOILING = (0.01, 0.02, 0.05)           # triangular: min, mode, max
+    OTHER_LOSS_SIGMA = 0.02                # absolute, on SYSTEM_LOSS
+    DEGRADATION_MEAN = 0.005               # per year
+    DEGRADATION_SIGMA = 0.002
+    PAYBACK_HORIZON_YEARS = 25             # paybacks beyond this are reported as the horizon
+
+    @classmethod
+    def draw(cls, samples: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """One array of `samples` values per uncertain input."""
+        return {
+            'ghi_scale': np.clip(rng.normal(1.0, cls.GHI_SIGMA, samples), 0.5, 1.5),
+            'temp_offset': rng.normal(0.0, cls.TEMP_SIGMA_C, samples),
+            'temp_coeff': np.clip(rng.normal(SolarEngine.TEMP_COEFF, cls.TEMP_COEFF_SIGMA, samples), 0.0, None),
+            'soiling': rng.triangular(*cls.SOILING, samples),
+            'other_loss': rng.normal(0.0, cls.OTHER_LOSS_SIGMA, samples),
+            'degradation': np.clip(rng.normal(cls.DEGRADATION_MEAN, cls.DEGRADATION_SIGMA, samples), 0.0, None),
+        }
+
+
+def yield_statistics(hourly_yield: Dict[str, np.ndarray]) -> Dict[str, float]:
+    """
+    POA-weighted sums over the hourly year (kWh/m2 based):
+    'poa' = sum(POA), 'poa_temp' = sum(POA * T_air), 'poa_ghi' = sum(POA * GHI).
+    """
+    poa_kwh = hourly_yield['poa_global'] / 1000
+    return {
+        'poa': float(poa_kwh.sum()),
+        'poa_temp': float(poa_kwh @ hourly_yield['temp_air']),
+        'poa_ghi': float(poa_kwh @ hourly_yield['ghi']),
+    }
+
+
+def sample_annual_production(
+    stats: Dict[str, float],
+    area_sqm: float,
+    panel_efficiency: float,
+    draws: Dict[str, np.ndarray]
+) -> np.ndarray:
+    """
+    First-year production (kWh) per sample.
+
+    E = A * eta * s * sum(POA * PR) with
+    PR = 1 - L - gamma * (T_air + dT + 0.025 * s * GHI - 25), summed in closed form.
+    POA is assumed to scale with GHI (s), ignoring the small non-linearity of
+    the diffuse split.
+    """
+    s = draws['ghi_scale']
+    gamma = draws['temp_coeff']
+    system_loss = (SolarEngine.SYSTEM_LOSS - SolarEngine.LOSS_SOILING
+                   + draws['soiling'] + draws['other_loss'])
+
+    sum_poa_pr = (
+        stats['poa'] * (1.0 - system_loss + 25.0 * gamma)
+        - gamma * (stats['poa_temp'] + draws['temp_offset'] * stats['poa'] + 0.025 * s * stats['poa_ghi'])
+    )
+    return np.clip(area_sqm * panel_efficiency * s * sum_poa_pr, 0.0, None)
+
+
+def payback_years(
+    annual_kwh: np.ndarray,
+    degradation: np.ndarray,
+    system_cost: float,
+    tariff: float,
+    horizon: float = UncertaintyModel.PAYBACK_HORIZON_YEARS
+) -> np.ndarray:
+    """
+    Years until cumulative savings with degrading output cover the system cost.
+    Solves cost = E * tariff * (1 - (1 - d)^Y) / d for Y; capped at `horizon`.
+    """
+    savings = annual_kwh * tariff
+    with np.errstate(divide='ignore', invalid='ignore'):
+        no_degradation = system_cost / savings
+        ratio = 1.0 - system_cost * degradation / savings
+        degrading = np.log(ratio) / np.log1p(-degradation)
+        years = np.where(degradation > 1e-9, degrading, no_degradation)
+    years = np.where((savings > 0) & np.isfinite(years) & (years > 0), years, np.inf)
+    return np.minimum(years, horizon)
+
+
+def run_monte_carlo(
+    hourly_yield: Dict[str, np.ndarray],
+    area_sqm: float,
+    panel_efficiency: float,
+    system_cost: float,
+    tariff: float,
+    samples: int = 10_000,
+    seed: Optional[int] = 0
+) -> Dict[str, any]:
+    """
+    P-values of first-year production and payback for one roof.
+
+    Production P90 is the value exceeded in 90% of samples (10th percentile);
+    payback P90 is the payback reached within that time in 90% of samples
+    (90th percentile). The default seed makes responses reproducible (and
+    cacheable).
+    """
+    rng = np.random.default_rng(seed)
+    draws = UncertaintyModel.draw(samples, rng)
+    annual = sample_annual_production(yield_statistics(hourly_yield), area_sqm, panel_efficiency, draws)
+    payback = payback_years(annual, draws['degradation'], system_cost, tariff)
+
+    horizon = UncertaintyModel.PAYBACK_HORIZON_YEARS
+    return {
+        'samples': samples,
+        'annual_production_kwh': {
+            f'p{level}': round(float(np.percentile(annual, 100 - level)), 0) for level in EXCEEDANCE_LEVELS
+        },
+        'annual_production_std_kwh': round(float(annual.std()), 0),
+        'payback_years': {
+            f'p{level}': round(float(np.percentile(payback, level)), 1) for level in EXCEEDANCE_LEVELS
+        },
+        'payback_horizon_years': horizon,
+        'probability_payback_within_horizon': round(float(np.mean(payback < horizon)), 4),
+    }
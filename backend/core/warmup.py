@@ -0,0 +1,97 @@
+"""
+Startup Warm-up for SolarRoute.
+Right after startup the heavy engine modules (pvlib, pandas, scipy, shapely)
+are imported, lookup tables and connection pools are pre-loaded and one
+throwaway simulation runs on every executor worker, all in the background so
+the process answers liveness checks at once. A readiness probe only reports
+"warm" afterwards, so autoscaled pods receive traffic when the first real
+request is as fast as the hundredth.
+"""
+
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class StartupWarmup:
+    """
+    Runs warm-up steps once in the background and tracks readiness.
+
+    Each step is an async callable; its duration (seconds) is reported by
+    `status()`. A failing step is logged and skipped: the service still works,
+    the affected path just stays cold until first use.
+
+    Configuration (environment):
+        STARTUP_WARMUP   true | false (default: true); when false the app is
+                         ready immediately
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+        self.state = "cold" if self.enabled else "disabled"
+        self.durations: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ("warm", "disabled")
+
+    async def _run(self, steps: Dict[str, Callable[[], Awaitable]]):
+        started = time.perf_counter()
+        for name, step in steps.items():
+            step_started = time.perf_counter()
+            try:
+                await step()
+            except Exception as e:
+                print(f"Warm-up step '{name}' failed: {e}")
+                self.errors[name] = str(e)
+            self.durations[name] = time.perf_counter() - step_started
+        self.durations["total"] = time.perf_counter() - started
+        self.state = "warm"
+        print(f"Warm-up finished in {self.durations['total']:.2f}s")
+
+    def start(self, steps: Dict[str, Callable[[], Awaitable]]):
+        """Runs `steps` in order in a background task (app startup)."""
+        if not self.enabled or self._task is not None:
+            return
+        self.state = "warming"
+        self._task = asyncio.create_task(self._run(steps))
+
+    async def wait(self):
+        """Waits for the warm-up to finish (no-op if it never started)."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def stop(self):
+        """Cancels an unfinished warm-up (app shutdown)."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def status(self) -> Dict:
+        return {
+            "status": self.state,
+            "steps": {name: round(seconds, 3) for name, seconds in self.durations.items()},
+            "errors": self.errors,
+        }
+
+
+# Singleton instance
+_warmup: Optional[StartupWarmup] = None
+
+def get_startup_warmup() -> StartupWarmup:
+    """Get or create StartupWarmup singleton."""
+    global _warmup
+    if _warmup is None:
+        _warmup = StartupWarmup()
+    return _warmup
@@ -1,23 +1,55 @@
 """
 Weather Service for SolarRoute.
 Fetches solar irradiance and temperature data from OpenWeatherMap API
-with Redis caching for performance and cost optimization.
+with in-process (L1) and Redis (L2) caching for performance and cost optimization.
+Expired entries are served stale while a background fetch refreshes them, and a
+circuit breaker stops calling the API while it keeps failing.
 """
 
 import os
-import json
+import time
+import uuid
+import asyncio
+import contextvars
 import httpx
 import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from dotenv import load_dotenv
+from prometheus_client import Gauge
+from core.cache import TTLCache
+from core.weather_store import PostGISWeatherStore
+from core.climatology import get_climatology
+from core.rate_limiter import RateLimiter, RateLimitExceededError
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.cache_codec import decode_forecast, decode_weather, encode_forecast, encode_weather
+from core import metrics
 
 load_dotenv()
 
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Set by bulk work (batch jobs, cache warming): wait for a rate-limit token as
+# long as needed instead of failing after OWM_RATE_LIMIT_MAX_WAIT_SECONDS
+_unbounded_wait: contextvars.ContextVar[bool] = contextvars.ContextVar("owm_unbounded_wait", default=False)
+
 class WeatherService:
     """
     Handles fetching weather data from OpenWeatherMap API.
-    Implements smart caching using Redis to minimize API calls.
+    Implements smart caching to minimize API calls:
+    L1 in-process TTL/LRU cache, L2 Redis (optional, skipped while unreachable),
+    L3 PostGIS `solar_data_cache` (durable, nearest-neighbour within a radius).
+
+    Entries stay available as the grid cell's last known value for
+    WEATHER_STALE_HOURS after they expire (L1 and Redis): a request for an
+    expired cell gets that value at once, with source "stale", and a background
+    fetch refreshes it (stale-while-revalidate).
     """
     
     # OpenWeatherMap API Configuration
@@ -26,27 +58,131 @@ class WeatherService:
     # Cache Configuration
     CACHE_TTL_HOURS = 6
     GRID_PRECISION = 2
+
+    # L1 (in-process) cache size; TTL follows CACHE_TTL_HOURS
+    L1_MAX_ENTRIES = 4096
+    # Expired entries are still served (as stale) for this long while they are refreshed
+    STALE_HOURS = 48
+    # After a Redis connection failure, skip L2 for this long before retrying
+    REDIS_RETRY_SECONDS = 30
+    REDIS_SOCKET_TIMEOUT = 1.0
+    # Keys per MGET / SETEX pipeline in multi-key cache access
+    REDIS_BATCH_SIZE = 500
+
+    # Cross-worker single-flight (Redis lock) configuration
+    LOCK_LEASE_SECONDS = 10
+    LOCK_POLL_SECONDS = 0.1
+
+    # 5-day / 3-hour forecast; OWM issues a new one every 3 hours
+    FORECAST_TTL_HOURS = 3
+    FORECAST_L1_MAX_ENTRIES = 1024
+    # Pooled OWM client
+    HTTP_TIMEOUT_SECONDS = 30.0
+    HTTP_MAX_CONNECTIONS = 20
+    # Current-weather calls: per-call timeout, and successful calls slower than
+    # this still count against the circuit breaker
+    OWM_TIMEOUT_SECONDS = 5.0
+    OWM_SLOW_CALL_SECONDS = 3.0
+
+    # Outbound rate limiting: attempts per call and pause after an upstream 429
+    # without Retry-After
+    OWM_MAX_ATTEMPTS = 3
+    OWM_429_BACKOFF_SECONDS = 5.0
+    BULK_CONCURRENCY = 8
     
     def __init__(self):
         self.api_key = os.getenv("OPENWEATHER_API_KEY", "")
+        # Overridable to point at a local stub server in tests
+        self.base_url = os.getenv("OWM_BASE_URL", self.OWM_BASE_URL).rstrip("/")
+        self.http2 = HTTP2_AVAILABLE and os.getenv("WEATHER_HTTP2", "true").lower() == "true"
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.distributed_single_flight = os.getenv("WEATHER_SINGLE_FLIGHT_REDIS", "false").lower() == "true"
         self._redis_client: Optional[redis.Redis] = None
+        self._redis_down_until = 0.0
         self._http_client: Optional[httpx.AsyncClient] = None
+        self._l1_cache = TTLCache(
+            max_size=int(os.getenv("WEATHER_L1_MAX_ENTRIES", self.L1_MAX_ENTRIES)),
+            ttl_seconds=self.CACHE_TTL_HOURS * 3600
+        )
+        self.stale_seconds = float(os.getenv("WEATHER_STALE_HOURS", self.STALE_HOURS)) * 3600
+        # Last known value per grid key, kept STALE_HOURS past expiry
+        self._stale_cache = TTLCache(
+            max_size=self._l1_cache.max_size,
+            ttl_seconds=self.CACHE_TTL_HOURS * 3600 + self.stale_seconds
+        )
+        self._forecast_cache = TTLCache(
+            max_size=self.FORECAST_L1_MAX_ENTRIES,
+            ttl_seconds=self.FORECAST_TTL_HOURS * 3600
+        )
+        self.store = PostGISWeatherStore()
+        # In-process single-flight: grid key -> in-flight fetch
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Popularity observer (CacheWarmer), attached at app startup
+        self.warmer = None
+        # Every OWM call draws from one token bucket, shared across workers via Redis
+        self.rate_limiter = RateLimiter(redis_getter=self._get_redis, on_redis_error=self._handle_redis_error)
+        self.rate_limit_max_wait = float(os.getenv("OWM_RATE_LIMIT_MAX_WAIT_SECONDS", 10))
+        self.bulk_concurrency = int(os.getenv("OWM_BULK_CONCURRENCY", self.BULK_CONCURRENCY))
+        # Fail fast (stale or mock data) while OWM keeps failing or timing out
+        self.breaker = CircuitBreaker()
+        self.owm_timeout = float(os.getenv("OWM_TIMEOUT_SECONDS", self.OWM_TIMEOUT_SECONDS))
+        self.owm_slow_call = float(os.getenv("OWM_SLOW_CALL_SECONDS", self.OWM_SLOW_CALL_SECONDS))
+        self.counters = {"stale_served": 0, "revalidations": 0}
         
     async def _get_redis(self) -> Optional[redis.Redis]:
-        """Lazy initialization of Redis connection."""
+        """
+        Lazy initialization of Redis connection.
+        Returns None while Redis is marked unreachable, so callers fall back to L1 only.
+        """
+        if time.monotonic() < self._redis_down_until:
+            return None
         if self._redis_client is None:
             try:
-                self._redis_client = redis.from_url(self.redis_url, decode_responses=True)
+                # Raw bytes: cache values are binary (core.cache_codec)
+                self._redis_client = redis.from_url(
+                    self.redis_url,
+                    socket_connect_timeout=self.REDIS_SOCKET_TIMEOUT,
+                    socket_timeout=self.REDIS_SOCKET_TIMEOUT
+                )
             except Exception as e:
                 print(f"Redis connection failed: {e}. Caching disabled.")
                 return None
         return self._redis_client
+
+    def _handle_redis_error(self, e: Exception, operation: str):
+        """Logs a Redis error; connection failures take L2 offline for REDIS_RETRY_SECONDS."""
+        if isinstance(e, (RedisConnectionError, RedisTimeoutError, OSError)):
+            if time.monotonic() >= self._redis_down_until:
+                print(f"Redis unreachable ({e}). Using in-process cache only for {self.REDIS_RETRY_SECONDS}s.")
+            self._redis_down_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+        else:
+            print(f"Cache {operation} error: {e}")
+
+    def cache_stats(self) -> Dict:
+        """L1 hit/miss counters, whether L2 (Redis) is currently in use, and warmer counters."""
+        stats = self._l1_cache.stats()
+        stats["redis_available"] = time.monotonic() >= self._redis_down_until
+        if self.warmer is not None:
+            stats["warmer"] = self.warmer.stats()
+        stats["rate_limiter"] = self.rate_limiter.stats()
+        stats["circuit_breaker"] = self.breaker.stats()
+        stats.update(self.counters)
+        return stats
     
     async def _get_http_client(self) -> httpx.AsyncClient:
-        """Lazy initialization of HTTP client."""
+        """
+        Lazy initialization of the pooled HTTP client (keep-alive, HTTP/2 when
+        h2 is installed so concurrent OWM calls share one connection).
+        """
         if self._http_client is None:
-            self._http_client = httpx.AsyncClient(timeout=30.0)
+            self._http_client = httpx.AsyncClient(
+                timeout=self.HTTP_TIMEOUT_SECONDS,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=self.HTTP_MAX_CONNECTIONS
+                )
+            )
         return self._http_client
     
     def _get_grid_key(self, lat: float, lon: float) -> str:
@@ -55,52 +191,229 @@ class WeatherService:
         grid_lon = round(lon, self.GRID_PRECISION)
         return f"weather:{grid_lat}:{grid_lon}"
     
-    async def _get_cached_weather(self, lat: float, lon: float) -> Optional[Dict]:
-        """Try to get weather data from Redis cache."""
+    def _set_l1(self, cache_key: str, entry: Dict, ttl_seconds: Optional[float] = None):
+        """Stores a fresh entry in L1 and keeps it as the cell's last known value."""
+        ttl = self.CACHE_TTL_HOURS * 3600 if ttl_seconds is None else ttl_seconds
+        self._l1_cache.set(cache_key, entry, ttl_seconds=ttl)
+        self._stale_cache.set(cache_key, entry, ttl_seconds=ttl + self.stale_seconds)
+
+    async def _redis_get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        Raw L2 values for many keys, one MGET per REDIS_BATCH_SIZE keys.
+        Missing keys are left out; an unreachable Redis yields {}.
+        """
         redis_client = await self._get_redis()
-        if not redis_client:
-            return None
-            
+        values: Dict[str, bytes] = {}
+        if not redis_client or not keys:
+            return values
         try:
-            cache_key = self._get_grid_key(lat, lon)
-            cached_data = await redis_client.get(cache_key)
-            
-            if cached_data:
-                data = json.loads(cached_data)
-                cached_time = datetime.fromisoformat(data.get('cached_at', '2000-01-01'))
-                if datetime.utcnow() - cached_time < timedelta(hours=self.CACHE_TTL_HOURS):
-                    return {
-                        "ghi_daily_kwh": data['ghi_daily_kwh'],
-                        "temp_avg": data['temp_avg'],
-                        "source": "cache",
-                        "cached_at": cached_time
-                    }
+            for start in range(0, len(keys), self.REDIS_BATCH_SIZE):
+                chunk = keys[start:start + self.REDIS_BATCH_SIZE]
+                for key, value in zip(chunk, await redis_client.mget(chunk)):
+                    if value is not None:
+                        values[key] = value
         except Exception as e:
-            print(f"Cache read error: {e}")
-            
-        return None
-    
-    async def _cache_weather(self, lat: float, lon: float, data: Dict):
-        """Store weather data in Redis cache."""
+            self._handle_redis_error(e, "read")
+        return values
+
+    async def _redis_set_many(self, items: List[Tuple[str, float, bytes]]):
+        """
+        SETEX many (key, ttl seconds, value), one pipelined round-trip per
+        REDIS_BATCH_SIZE keys; entries with less than a second left are skipped.
+        """
         redis_client = await self._get_redis()
-        if not redis_client:
+        if not redis_client or not items:
             return
-            
         try:
+            for start in range(0, len(items), self.REDIS_BATCH_SIZE):
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for key, ttl, value in items[start:start + self.REDIS_BATCH_SIZE]:
+                        # Whole seconds, rounded down: never outlives the entry's own expiry
+                        if int(ttl) >= 1:
+                            pipe.setex(key, int(ttl), value)
+                    await pipe.execute()
+        except Exception as e:
+            self._handle_redis_error(e, "write")
+
+    def _promote_l2_weather(self, cache_key: str, payload: bytes) -> Optional[Dict]:
+        """
+        Decodes an L2 value; fresh entries are promoted to L1 for the rest of
+        their lifetime and returned, expired ones become the cell's last known value.
+        """
+        data = decode_weather(payload)
+        if data is None:
+            return None
+        cached = {**data, "source": "cache"}
+        remaining = timedelta(hours=self.CACHE_TTL_HOURS) - (datetime.utcnow() - data['cached_at'])
+        if remaining.total_seconds() > 0:
+            self._set_l1(cache_key, cached, ttl_seconds=remaining.total_seconds())
+            return cached
+        self._stale_cache.set(cache_key, cached, ttl_seconds=remaining.total_seconds() + self.stale_seconds)
+        return None
+
+    async def _get_redis_weather(self, cache_key: str) -> Optional[Dict]:
+        """L2 lookup of one key (see _promote_l2_weather)."""
+        if not await self._get_redis():
+            return None
+        with metrics.stage("weather_l2"):
+            payload = (await self._redis_get_many([cache_key])).get(cache_key)
+        cached = self._promote_l2_weather(cache_key, payload) if payload else None
+        metrics.record_cache_lookup("weather", "l2", hit=bool(cached))
+        return cached
+
+    async def get_many(self, coordinates: Iterable[Tuple[float, float]]) -> Dict[str, Dict]:
+        """
+        Cached weather for many sites, {grid key: entry}: L1, then L2 with one
+        MGET per REDIS_BATCH_SIZE missing keys. Cells cached in neither are left
+        out (L3 and the API are not consulted).
+        """
+        found: Dict[str, Dict] = {}
+        missing: List[str] = []
+        for lat, lon in coordinates:
             cache_key = self._get_grid_key(lat, lon)
-            cache_data = {
-                'ghi_daily_kwh': data['ghi_daily_kwh'],
-                'temp_avg': data['temp_avg'],
-                'cached_at': datetime.utcnow().isoformat()
+            if cache_key in found or cache_key in missing:
+                continue
+            cached = self._l1_cache.get(cache_key)
+            metrics.record_cache_lookup("weather", "l1", hit=bool(cached))
+            if cached:
+                found[cache_key] = cached
+            else:
+                missing.append(cache_key)
+
+        if missing and await self._get_redis():
+            with metrics.stage("weather_l2"):
+                payloads = await self._redis_get_many(missing)
+            for cache_key in missing:
+                payload = payloads.get(cache_key)
+                cached = self._promote_l2_weather(cache_key, payload) if payload else None
+                metrics.record_cache_lookup("weather", "l2", hit=bool(cached))
+                if cached:
+                    found[cache_key] = cached
+        return found
+
+    async def _get_cached_weather(self, lat: float, lon: float) -> Optional[Dict]:
+        """Try to get weather data from L1, then the Redis cache (L2), then PostGIS (L3)."""
+        cache_key = self._get_grid_key(lat, lon)
+
+        # L1: in-process
+        cached = self._l1_cache.get(cache_key)
+        metrics.record_cache_lookup("weather", "l1", hit=bool(cached))
+        if cached:
+            return cached
+
+        # L2: Redis
+        cached = await self._get_redis_weather(cache_key)
+        if cached:
+            return cached
+
+        # L3: PostGIS, nearest unexpired cell within the configured radius
+        if self.store.available:
+            with metrics.stage("weather_l3"):
+                nearest = await self.store.get_nearest(lat, lon)
+            metrics.record_cache_lookup("weather", "l3", hit=bool(nearest))
+        else:
+            nearest = None
+        if nearest:
+            cached = {
+                "ghi_daily_kwh": nearest['ghi_daily_kwh'],
+                "temp_avg": nearest['temp_avg'],
+                "source": "cache",
+                "cached_at": nearest['cached_at']
             }
-            await redis_client.setex(
+            remaining = nearest['expires_at'] - datetime.utcnow()
+            self._set_l1(cache_key, cached, ttl_seconds=remaining.total_seconds())
+            return cached
+            
+        return None
+    
+    async def _cache_weather(self, lat: float, lon: float, data: Dict) -> datetime:
+        """Store weather data in L1, the Redis cache (L2) and PostGIS (L3, write-behind). Returns the entry's cached_at."""
+        return (await self.set_many([(lat, lon, data)]))[0]
+
+    async def set_many(self, entries: Iterable[Tuple[float, float, Dict]]) -> List[datetime]:
+        """
+        Stores many (lat, lon, weather data) entries in L1, Redis (one pipelined
+        SETEX round-trip per REDIS_BATCH_SIZE keys) and PostGIS (write-behind).
+        Returns each entry's cached_at.
+        """
+        cached_at = datetime.utcnow()
+        # Kept past expiry as the last known value for other workers
+        redis_ttl = self.CACHE_TTL_HOURS * 3600 + self.stale_seconds
+        writes = []
+        for lat, lon, data in entries:
+            cache_key = self._get_grid_key(lat, lon)
+            self._set_l1(cache_key, {
+                "ghi_daily_kwh": data['ghi_daily_kwh'],
+                "temp_avg": data['temp_avg'],
+                "source": "cache",
+                "cached_at": cached_at
+            })
+
+            # L3 write-behind, keyed by grid cell centre
+            self.store.upsert_later(
                 cache_key,
-                timedelta(hours=self.CACHE_TTL_HOURS),
-                json.dumps(cache_data)
+                round(lat, self.GRID_PRECISION),
+                round(lon, self.GRID_PRECISION),
+                data,
+                cached_at,
+                cached_at + timedelta(hours=self.CACHE_TTL_HOURS)
             )
-        except Exception as e:
-            print(f"Cache write error: {e}")
+            writes.append((cache_key, redis_ttl, encode_weather(data['ghi_daily_kwh'], data['temp_avg'], cached_at)))
+
+        await self._redis_set_many(writes)
+        return [cached_at] * len(writes)
     
+    async def _owm_get(
+        self, path: str, lat: float, lon: float, timeout: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        Rate-limited GET {base_url}/{path} for a site.
+
+        Waits for a token from the shared bucket (recorded as the 'owm_queue'
+        stage). An upstream 429 pauses all calls from this process for its
+        Retry-After and the call is queued again, up to OWM_MAX_ATTEMPTS; then,
+        like a token that does not come within OWM_RATE_LIMIT_MAX_WAIT_SECONDS,
+        RateLimitExceededError is raised rather than answering with mock data.
+
+        Transport errors, timeouts (`timeout` seconds per call, default the
+        client's), 5xx responses and calls slower than OWM_SLOW_CALL_SECONDS
+        count against the circuit breaker; while it is open CircuitOpenError is
+        raised without a call.
+        """
+        client = await self._get_http_client()
+        params = {"lat": lat, "lon": lon, "appid": self.api_key, "units": "metric"}
+        timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else timeout
+        max_wait = None if _unbounded_wait.get() else self.rate_limit_max_wait
+
+        for attempt in range(self.OWM_MAX_ATTEMPTS):
+            self.breaker.check()
+            with metrics.stage("owm_queue"):
+                await self.rate_limiter.acquire(max_wait)
+            started = time.perf_counter()
+            try:
+                with metrics.stage("weather_owm"):
+                    response = await client.get(f"{self.base_url}/{path}", params=params, timeout=timeout)
+            except Exception:
+                metrics.OWM_REQUESTS.labels(status="error").inc()
+                self.breaker.record_failure()
+                raise
+            metrics.OWM_REQUESTS.labels(status=str(response.status_code)).inc()
+            if response.status_code >= 500 or time.perf_counter() - started > self.owm_slow_call:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if response.status_code != 429:
+                return response
+
+            metrics.OWM_RATE_LIMITED.inc()
+            try:
+                retry_after = float(response.headers.get("Retry-After", self.OWM_429_BACKOFF_SECONDS))
+            except ValueError:
+                retry_after = self.OWM_429_BACKOFF_SECONDS
+            print(f"Warning: OWM rate limit hit; pausing calls for {retry_after:.0f}s.")
+            self.rate_limiter.backoff(retry_after)
+        raise RateLimitExceededError(self.OWM_429_BACKOFF_SECONDS)
+
     async def _fetch_from_owm(self, lat: float, lon: float) -> Dict:
         """
         Fetch weather data from OpenWeatherMap API.
@@ -110,28 +423,14 @@ class WeatherService:
             print("Warning: No OpenWeatherMap API key found. Using mock data.")
             return self._get_mock_weather(lat, lon)
         
-        client = await self._get_http_client()
-        
         try:
             # Current Weather API (Free tier)
-            url = f"{self.OWM_BASE_URL}/weather"
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            
-            response = await client.get(url, params=params)
+            response = await self._owm_get("weather", lat, lon, timeout=self.owm_timeout)
             
             if response.status_code == 401:
                 print("Warning: Invalid OpenWeatherMap API key. Using mock data.")
                 return self._get_mock_weather(lat, lon)
             
-            if response.status_code == 429:
-                print("Warning: API rate limit exceeded. Using mock data.")
-                return self._get_mock_weather(lat, lon)
-            
             response.raise_for_status()
             data = response.json()
             
@@ -174,15 +473,34 @@ class WeatherService:
                 "location": data.get('name', 'Unknown')
             }
             
+        except RateLimitExceededError:
+            raise
+        except CircuitOpenError:
+            return self._get_fallback_weather(lat, lon)
         except httpx.HTTPStatusError as e:
             print(f"OWM API error: {e}. Using mock data.")
-            return self._get_mock_weather(lat, lon)
+            return self._get_fallback_weather(lat, lon)
         except Exception as e:
             print(f"Weather fetch error: {e}. Using mock data.")
-            return self._get_mock_weather(lat, lon)
+            return self._get_fallback_weather(lat, lon)
+
+    def _get_fallback_weather(self, lat: float, lon: float) -> Dict:
+        """Mock data standing in for a failed API call; never cached (see _fetch_and_cache)."""
+        return {**self._get_mock_weather(lat, lon), "fallback": True}
     
     def _get_mock_weather(self, lat: float, lon: float) -> Dict:
         """Provide realistic mock weather data based on location."""
+        # Annual means from the offline climatology grid where it covers the site
+        grid = get_climatology()
+        climate = grid.lookup(lat, lon) if grid is not None else None
+        if climate is not None:
+            return {
+                "ghi_daily_kwh": round(float(climate['ghi_daily_kwh'].mean()), 1),
+                "temp_avg": round(float(climate['temp_c'].mean()), 1),
+                "source": "mock",
+                "note": "Using climatology - check API key or connection"
+            }
+
         abs_lat = abs(lat)
         
         # Base GHI for equatorial regions
@@ -203,32 +521,352 @@ class WeatherService:
             "note": "Using mock data - check API key or connection"
         }
     
-    async def get_weather_data(self, lat: float, lon: float) -> Dict:
-        """Main method to get weather data with caching."""
-        # 1. Check cache
-        cached = await self._get_cached_weather(lat, lon)
-        if cached:
-            return cached
-        
-        # 2. Fetch from API
+    async def _fetch_and_cache(self, lat: float, lon: float) -> Dict:
+        """
+        Fetch from the API and store the result in the cache. Fallbacks for a
+        failed call are not cached, so they never replace a cell's last known
+        value and the cell recovers as soon as the API does.
+        """
         weather_data = await self._fetch_from_owm(lat, lon)
-        
-        # 3. Cache the result
-        await self._cache_weather(lat, lon, weather_data)
-        
+        if not weather_data.get("fallback"):
+            weather_data["cached_at"] = await self._cache_weather(lat, lon, weather_data)
         return weather_data
+
+    def get_entry_expiry(self, weather: Dict) -> Optional[datetime]:
+        """When a weather entry returned by get_weather_data expires (UTC), if known."""
+        cached_at = weather.get("cached_at")
+        if not isinstance(cached_at, datetime):
+            return None
+        return cached_at + timedelta(hours=self.CACHE_TTL_HOURS)
+
+    async def _fetch_with_redis_lock(self, lat: float, lon: float) -> Dict:
+        """
+        Cross-worker single-flight: only the worker holding a short-lived Redis
+        lock for the grid key calls the API; the others poll the cache until the
+        value appears or the lease expires.
+        """
+        redis_client = await self._get_redis()
+        if not redis_client:
+            return await self._fetch_and_cache(lat, lon)
+
+        lock_key = f"lock:{self._get_grid_key(lat, lon)}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await redis_client.set(lock_key, token, nx=True, ex=self.LOCK_LEASE_SECONDS)
+        except Exception as e:
+            self._handle_redis_error(e, "lock")
+            return await self._fetch_and_cache(lat, lon)
+
+        if acquired:
+            try:
+                return await self._fetch_and_cache(lat, lon)
+            finally:
+                try:
+                    # Release only if the lease is still ours
+                    if await redis_client.get(lock_key) == token.encode():
+                        await redis_client.delete(lock_key)
+                except Exception as e:
+                    self._handle_redis_error(e, "unlock")
+
+        # Another worker is fetching; wait for its result to land in the cache
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.LOCK_LEASE_SECONDS
+        while loop.time() < deadline:
+            await asyncio.sleep(self.LOCK_POLL_SECONDS)
+            cached = await self._get_cached_weather(lat, lon)
+            if cached:
+                return cached
+        return await self._fetch_and_cache(lat, lon)
+
+    async def get_weather_data(self, lat: float, lon: float) -> Dict:
+        """
+        Main method to get weather data with caching.
+
+        Cache misses are coalesced per grid key: only one fetch is in flight per
+        key in this process (and, with WEATHER_SINGLE_FLIGHT_REDIS=true, across
+        workers); concurrent callers await its result.
+        """
+        # 1. Check cache
+        weather = await self._get_cached_weather(lat, lon)
+
+        # 2. Serve the cell's last known value and refresh it in the background
+        if not weather:
+            weather = self._get_stale_weather(lat, lon)
+
+        # 3. Join an in-flight fetch for this grid key, or start one
+        if not weather:
+            weather = await self._fetch_single_flight(lat, lon)
+
+        self._record_served(lat, lon, weather)
+        return weather
+
+    def _record_served(self, lat: float, lon: float, weather: Dict):
+        metrics.WEATHER_RESPONSES.labels(source=weather.get("source", "unknown")).inc()
+        if self.warmer is not None:
+            self.warmer.record(self._get_grid_key(lat, lon), lat, lon, weather)
+
+    def _get_stale_weather(self, lat: float, lon: float) -> Optional[Dict]:
+        """
+        The cell's expired last known value, marked "stale", or None. Starts
+        (or joins) a background fetch that replaces it.
+        """
+        cache_key = self._get_grid_key(lat, lon)
+        last_known = self._stale_cache.get(cache_key)
+        if not last_known:
+            return None
+
+        self.counters["stale_served"] += 1
+        if cache_key not in self._inflight:
+            self.counters["revalidations"] += 1
+        task = self._start_single_flight(cache_key, lambda: self._revalidate(lat, lon))
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return {**last_known, "source": "stale"}
+
+    async def _revalidate(self, lat: float, lon: float) -> Dict:
+        """Background refresh of a stale cell; failures keep serving the last known value."""
+        fetch = self._fetch_with_redis_lock if self.distributed_single_flight else self._fetch_and_cache
+        try:
+            return await fetch(lat, lon)
+        except Exception as e:
+            print(f"Weather revalidation failed for {self._get_grid_key(lat, lon)}: {e}")
+            raise
+
+    async def refresh_weather(self, lat: float, lon: float) -> Dict:
+        """
+        Fetches and caches a fresh entry regardless of what is cached (cache
+        warming); waits for a rate-limit token as long as needed.
+        """
+        token = _unbounded_wait.set(True)
+        try:
+            return await self._fetch_single_flight(lat, lon)
+        finally:
+            _unbounded_wait.reset(token)
+
+    async def fetch_weather_many(
+        self,
+        coordinates: Iterable[Tuple[float, float]],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, asyncio.Future]:
+        """
+        Starts weather lookups for many sites (batch jobs) and returns
+        {grid key: future}, one per distinct grid cell.
+
+        Cached cells are looked up together first (get_many: one Redis
+        round-trip per REDIS_BATCH_SIZE cells) and come back already resolved.
+        For the rest, at most `concurrency` (OWM_BULK_CONCURRENCY) lookups run at
+        a time, all on the pooled HTTP client; API calls queue on the shared rate
+        limiter for as long as needed, so a large batch is spread over the quota
+        instead of failing or degrading to mock data. Callers should shield the
+        futures they await and cancel the ones they no longer need.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.bulk_concurrency)
+
+        async def fetch(lat: float, lon: float) -> Dict:
+            async with semaphore:
+                _unbounded_wait.set(True)
+                try:
+                    return await self.get_weather_data(lat, lon)
+                except RateLimitExceededError:
+                    # Joined a bounded user-initiated fetch that gave up; queue our own
+                    return await self.get_weather_data(lat, lon)
+
+        coordinates = list(coordinates)
+        cached = await self.get_many(coordinates)
+        loop = asyncio.get_running_loop()
+        tasks: Dict[str, asyncio.Future] = {}
+        for lat, lon in coordinates:
+            key = self._get_grid_key(lat, lon)
+            if key in tasks:
+                continue
+            if key in cached:
+                self._record_served(lat, lon, cached[key])
+                tasks[key] = loop.create_future()
+                tasks[key].set_result(cached[key])
+            else:
+                tasks[key] = asyncio.ensure_future(fetch(lat, lon))
+        return tasks
+
+    async def get_weather_many(
+        self,
+        coordinates: Iterable[Tuple[float, float]],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Dict]:
+        """Weather for many sites: {grid key: weather}; see fetch_weather_many."""
+        tasks = await self.fetch_weather_many(coordinates, concurrency)
+        try:
+            results = await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return dict(zip(tasks, results))
+
+    async def _fetch_single_flight(self, lat: float, lon: float) -> Dict:
+        """Fetches a grid cell, sharing one in-flight fetch among concurrent callers."""
+        fetch = self._fetch_with_redis_lock if self.distributed_single_flight else self._fetch_and_cache
+        return await self._single_flight(self._get_grid_key(lat, lon), lambda: fetch(lat, lon))
+
+    def _start_single_flight(self, key: str, fetch) -> asyncio.Task:
+        """The in-flight task for a key, starting `fetch()` if there is none."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+
+            def _release(done: asyncio.Task):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+            task.add_done_callback(_release)
+        return task
+
+    async def _single_flight(self, key: str, fetch) -> Dict:
+        """Runs `fetch()` once per key at a time; concurrent callers await the same task."""
+        task = self._start_single_flight(key, fetch)
+        # Shield so one cancelled caller does not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    def _get_forecast_key(self, lat: float, lon: float) -> str:
+        """Forecast cache key; same grid as the current-weather cache."""
+        return "forecast:" + self._get_grid_key(lat, lon).split(":", 1)[1]
+
+    async def get_forecast(self, lat: float, lon: float) -> Dict:
+        """
+        OWM 5-day / 3-hour forecast for the site's grid cell:
+        {"steps": [{"dt": unix seconds, "temp": Celsius, "clouds": %}, ...], "source", "cached_at"}.
+
+        Cached per grid cell in L1 and Redis for FORECAST_TTL_HOURS, so every
+        roof in a cell shares one API call per forecast issue; concurrent
+        misses share one fetch.
+        """
+        cache_key = self._get_forecast_key(lat, lon)
+        forecast = self._forecast_cache.get(cache_key)
+        metrics.record_cache_lookup("forecast", "l1", hit=bool(forecast))
+        if not forecast:
+            forecast = await self._get_redis_forecast(cache_key)
+        if not forecast:
+            forecast = await self._single_flight(cache_key, lambda: self._fetch_and_cache_forecast(lat, lon))
+        metrics.WEATHER_RESPONSES.labels(source=forecast.get("source", "unknown")).inc()
+        return forecast
+
+    async def _get_redis_forecast(self, cache_key: str) -> Optional[Dict]:
+        """L2 forecast lookup; promotes hits to L1 for the rest of the entry's lifetime."""
+        redis_client = await self._get_redis()
+        if not redis_client:
+            return None
+        try:
+            with metrics.stage("weather_l2"):
+                cached_data = await redis_client.get(cache_key)
+            data = decode_forecast(cached_data)
+            if data is not None:
+                remaining = timedelta(hours=self.FORECAST_TTL_HOURS) - (datetime.utcnow() - data['cached_at'])
+                if remaining.total_seconds() > 0:
+                    cached = {**data, "source": "cache"}
+                    self._forecast_cache.set(cache_key, cached, ttl_seconds=remaining.total_seconds())
+                    metrics.record_cache_lookup("forecast", "l2", hit=True)
+                    return cached
+            metrics.record_cache_lookup("forecast", "l2", hit=False)
+        except Exception as e:
+            self._handle_redis_error(e, "read")
+        return None
+
+    async def _fetch_and_cache_forecast(self, lat: float, lon: float) -> Dict:
+        """Fetches the forecast and caches it (mock forecasts are not cached)."""
+        forecast = await self._fetch_forecast_from_owm(lat, lon)
+        if forecast["source"] == "mock":
+            return forecast
+
+        cache_key = self._get_forecast_key(lat, lon)
+        cached_at = datetime.utcnow()
+        forecast["cached_at"] = cached_at
+        self._forecast_cache.set(cache_key, {"steps": forecast["steps"], "source": "cache", "cached_at": cached_at})
+
+        await self._redis_set_many([
+            (cache_key, self.FORECAST_TTL_HOURS * 3600, encode_forecast(forecast["steps"], cached_at))
+        ])
+        return forecast
+
+    async def _fetch_forecast_from_owm(self, lat: float, lon: float) -> Dict:
+        """
+        Fetch the free 5-day / 3-hour forecast (40 steps) from OpenWeatherMap.
+        Falls back to a flat mock forecast like the current-weather path.
+        """
+        if not self.api_key or self.api_key == "your_api_key_here":
+            print("Warning: No OpenWeatherMap API key found. Using mock forecast.")
+            return self._get_mock_forecast(lat, lon)
+
+        try:
+            response = await self._owm_get("forecast", lat, lon)
+            response.raise_for_status()
+            data = response.json()
+
+            steps = [
+                {
+                    "dt": int(item["dt"]),
+                    "temp": float(item.get("main", {}).get("temp", 28.0)),
+                    "clouds": float(item.get("clouds", {}).get("all", 0)),
+                }
+                for item in data.get("list", [])
+            ]
+            if len(steps) < 2:
+                raise ValueError("forecast has fewer than two steps")
+            return {"steps": steps, "source": "openweathermap"}
+
+        except RateLimitExceededError:
+            raise
+        except CircuitOpenError:
+            return self._get_mock_forecast(lat, lon)
+        except Exception as e:
+            print(f"Forecast fetch error: {e}. Using mock forecast.")
+            return self._get_mock_forecast(lat, lon)
+
+    def _get_mock_forecast(self, lat: float, lon: float) -> Dict:
+        """Flat 5-day forecast at the mock weather's temperature and 40% cloud cover."""
+        weather = self._get_mock_weather(lat, lon)
+        start = int(time.time() // 10800 * 10800)
+        return {
+            "steps": [
+                {"dt": start + i * 10800, "temp": weather["temp_avg"], "clouds": 40.0}
+                for i in range(40)
+            ],
+            "source": "mock",
+            "note": weather["note"]
+        }
     
+    async def connect(self):
+        """
+        Opens the HTTP client and the Redis pool ahead of the first request
+        (app warm-up). An unreachable Redis is marked down as usual.
+        """
+        await self._get_http_client()
+        redis_client = await self._get_redis()
+        if redis_client:
+            try:
+                await redis_client.ping()
+            except Exception as e:
+                self._handle_redis_error(e, "ping")
+
     async def close(self):
-        """Cleanup resources."""
+        """Cleanup resources (app shutdown); clients are recreated lazily if used again."""
+        await self.store.close()
         if self._http_client:
             await self._http_client.aclose()
+            self._http_client = None
         if self._redis_client:
-            await self._redis_client.close()
+            await self._redis_client.aclose()
+            self._redis_client = None
 
 
 # Singleton instance
 _weather_service: Optional[WeatherService] = None
 
+Gauge(
+    "solarroute_weather_fetches_in_flight", "Distinct weather grid cells being fetched.",
+    registry=metrics.REGISTRY
+).set_function(lambda: len(_weather_service._inflight) if _weather_service is not None else 0)
+Gauge(
+    "solarroute_owm_circuit_open", "1 while the OpenWeatherMap circuit breaker is open or half-open.",
+    registry=metrics.REGISTRY
+).set_function(lambda: int(_weather_service is not None and _weather_service.breaker.is_open))
+
 async def get_weather_service() -> WeatherService:
     """Get or create WeatherService singleton."""
     global _weather_service
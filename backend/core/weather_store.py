@@ -0,0 +1,188 @@
+"""
+PostGIS Weather Store for SolarRoute.
+Durable L3 weather cache in the `solar_data_cache` table. Survives Redis
+flushes and restarts, and serves the nearest cached grid cell within a
+radius when the exact cell is cold.
+"""
+
+import os
+import json
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Set
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+
+class PostGISWeatherStore:
+    """
+    Nearest-neighbour weather lookups (KNN `<->` within ST_DWithin), upserts
+    keyed by grid key, and batched purging of expired rows.
+
+    Configuration (environment):
+        WEATHER_POSTGIS_CACHE       true | false (default: true)
+        WEATHER_POSTGIS_RADIUS_M    max distance to a neighbouring cell (default: 2000)
+    """
+
+    # Lookups are on the request path: bound them, and back off when the DB is down
+    QUERY_TIMEOUT_SECONDS = 0.5
+    RETRY_SECONDS = 30
+    PURGE_BATCH_SIZE = 1000
+    PURGE_INTERVAL_SECONDS = 900
+
+    NEAREST_SQL = text("""
+        SELECT ghi_daily_avg, temp_daily_avg, cached_at, expires_at,
+               ST_Distance(grid_location, ref.point) AS distance_m
+        FROM solar_data_cache,
+             (SELECT ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography AS point) AS ref
+        WHERE expires_at > :now
+          AND ST_DWithin(grid_location, ref.point, :radius_m)
+        ORDER BY grid_location <-> ref.point
+        LIMIT 1
+    """)
+
+    UPSERT_SQL = text("""
+        INSERT INTO solar_data_cache
+            (grid_key, grid_location, raw_weather_data, ghi_daily_avg, temp_daily_avg, cached_at, expires_at)
+        VALUES
+            (:grid_key, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
+             CAST(:raw AS JSONB), :ghi, :temp, :cached_at, :expires_at)
+        ON CONFLICT (grid_key) DO UPDATE SET
+            raw_weather_data = EXCLUDED.raw_weather_data,
+            ghi_daily_avg = EXCLUDED.ghi_daily_avg,
+            temp_daily_avg = EXCLUDED.temp_daily_avg,
+            cached_at = EXCLUDED.cached_at,
+            expires_at = EXCLUDED.expires_at
+    """)
+
+    PURGE_SQL = text("""
+        DELETE FROM solar_data_cache
+        WHERE id IN (
+            SELECT id FROM solar_data_cache
+            WHERE expires_at <= :now
+            LIMIT :batch_size
+        )
+    """)
+
+    def __init__(self, engine=None):
+        self.enabled = os.getenv("WEATHER_POSTGIS_CACHE", "true").lower() == "true"
+        self.radius_m = float(os.getenv("WEATHER_POSTGIS_RADIUS_M", 2000))
+        self._engine = engine
+        self._down_until = 0.0
+        self._pending_writes: Set[asyncio.Task] = set()
+        self._purger: Optional[asyncio.Task] = None
+
+    def _get_engine(self):
+        """Lazy access to the shared async engine."""
+        if self._engine is None:
+            from core.database import engine
+            self._engine = engine
+        return self._engine
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._down_until
+
+    def _handle_error(self, e: Exception, operation: str):
+        if time.monotonic() >= self._down_until:
+            print(f"PostGIS weather cache {operation} error: {e}. Skipping L3 for {self.RETRY_SECONDS}s.")
+        self._down_until = time.monotonic() + self.RETRY_SECONDS
+
+    async def get_nearest(self, lat: float, lon: float) -> Optional[Dict]:
+        """Nearest unexpired cached cell within `radius_m`, or None."""
+        if not self.available:
+            return None
+        async def query():
+            async with self._get_engine().connect() as conn:
+                result = await conn.execute(self.NEAREST_SQL, {
+                    "lat": lat, "lon": lon, "radius_m": self.radius_m, "now": datetime.utcnow()
+                })
+                return result.first()
+
+        try:
+            # Bounds connection setup as well as the query itself
+            row = await asyncio.wait_for(query(), timeout=self.QUERY_TIMEOUT_SECONDS)
+        except Exception as e:
+            self._handle_error(e, "read")
+            return None
+
+        if row is None:
+            return None
+        return {
+            "ghi_daily_kwh": row.ghi_daily_avg,
+            "temp_avg": row.temp_daily_avg,
+            "cached_at": row.cached_at,
+            "expires_at": row.expires_at,
+            "distance_m": round(row.distance_m, 1),
+        }
+
+    async def upsert(self, grid_key: str, lat: float, lon: float, data: Dict,
+                     cached_at: datetime, expires_at: datetime):
+        """Inserts or refreshes the row for a grid cell."""
+        if not self.available:
+            return
+        try:
+            async with self._get_engine().begin() as conn:
+                await conn.execute(self.UPSERT_SQL, {
+                    "grid_key": grid_key,
+                    "lat": lat,
+                    "lon": lon,
+                    "raw": json.dumps(data, default=str),
+                    "ghi": data["ghi_daily_kwh"],
+                    "temp": data["temp_avg"],
+                    "cached_at": cached_at,
+                    "expires_at": expires_at,
+                })
+        except Exception as e:
+            self._handle_error(e, "write")
+
+    def upsert_later(self, *args, **kwargs):
+        """Fire-and-forget upsert, kept off the request path."""
+        if not self.available:
+            return
+        task = asyncio.ensure_future(self.upsert(*args, **kwargs))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    async def purge_expired(self) -> int:
+        """Deletes expired rows in batches of PURGE_BATCH_SIZE. Returns rows deleted."""
+        deleted = 0
+        while self.available:
+            try:
+                async with self._get_engine().begin() as conn:
+                    result = await conn.execute(self.PURGE_SQL, {
+                        "now": datetime.utcnow(), "batch_size": self.PURGE_BATCH_SIZE
+                    })
+            except Exception as e:
+                self._handle_error(e, "purge")
+                break
+            deleted += result.rowcount
+            if result.rowcount < self.PURGE_BATCH_SIZE:
+                break
+            await asyncio.sleep(0)  # Yield between batches
+        return deleted
+
+    async def _purge_loop(self):
+        while True:
+            await self.purge_expired()
+            await asyncio.sleep(self.PURGE_INTERVAL_SECONDS)
+
+    def start_purger(self):
+        """Starts periodic purging (app startup)."""
+        if self.enabled and self._purger is None:
+            self._purger = asyncio.create_task(self._purge_loop())
+
+    async def close(self):
+        """Stops the purger and waits for pending writes."""
+        if self._purger is not None:
+            self._purger.cancel()
+            try:
+                await self._purger
+            except asyncio.CancelledError:
+                pass
+            self._purger = None
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
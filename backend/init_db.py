@@ -64,6 +64,24 @@ async def create_tables() -> bool:
         return False
 
 
+async def migrate_tables() -> bool:
+    """Idempotent column/index additions for tables created by older versions."""
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "ALTER TABLE solar_data_cache ADD COLUMN IF NOT EXISTS grid_key VARCHAR"
+            ))
+            await conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_solar_data_cache_grid_key "
+                "ON solar_data_cache (grid_key)"
+            ))
+        print("[OK] Migrations applied")
+        return True
+    except Exception as e:
+        print(f"[ERROR] Failed to apply migrations: {e}")
+        return False
+
+
 async def verify_tables() -> bool:
     """Verify that all tables were created correctly."""
     expected_tables = ["sites", "solar_data_cache", "simulation_results"]
@@ -105,7 +123,11 @@ async def main():
     if not await create_tables():
         sys.exit(1)
     
-    print("\nStep 4: Verifying tables...")
+    print("\nStep 4: Applying migrations...")
+    if not await migrate_tables():
+        sys.exit(1)
+    
+    print("\nStep 5: Verifying tables...")
     if not await verify_tables():
         sys.exit(1)
     
@@ -1,15 +1,51 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from contextlib import asynccontextmanager
 from api.v1.endpoints import simulation
+from core.executor import ExecutorSaturatedError, shutdown_executor
+from core.persistence import get_simulation_writer
+from core.database import engine as db_engine
+from core.weather_service import get_weather_service
+from core.rate_limiter import RateLimitExceededError
+from core.cache_warmer import get_cache_warmer
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from core.metrics import REGISTRY, MetricsMiddleware
+from core.warmup import get_startup_warmup
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: write-behind persistence of simulations
+    writer = get_simulation_writer()
+    await writer.start()
+    # Startup: periodic purge of expired PostGIS weather rows
+    weather_service = await get_weather_service()
+    weather_service.store.start_purger()
+    # Startup: refresh-ahead of popular weather cells
+    warmer = await get_cache_warmer()
+    warmer.start()
+    # Startup: background warm-up (connections, engine, one simulation per worker); see /ready
+    warmup = get_startup_warmup()
+    warmup.start({"connections": weather_service.connect, **simulation.warmup_steps()})
+    yield
+    # Shutdown: flush queued simulations and weather rows, close the httpx/Redis/DB pools,
+    # stop simulation workers
+    await warmup.stop()
+    await warmer.stop()
+    await writer.stop()
+    await weather_service.close()
+    await db_engine.dispose()
+    shutdown_executor()
+
 app = FastAPI(
     title="SolarRoute API",
     description="Precision Solar Potential Calculator for Indonesia",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -25,11 +61,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser devtools show stage timings cross-origin
+    expose_headers=["Server-Timing"],
 )
 
+# Outermost: request latency, in-flight gauge and Server-Timing for everything below
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(RateLimitExceededError)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceededError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Include Routers
 app.include_router(simulation.router, prefix="/api/v1/simulation", tags=["simulation"])
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (per worker process)."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Readiness probe: 200 once the startup warm-up finished ("warm"), 503 before."""
+    warmup = get_startup_warmup()
+    return JSONResponse(warmup.status(), status_code=200 if warmup.ready else 503)
+
 if __name__ == "__main__":
     import uvicorn
     import sys
@@ -27,6 +27,8 @@ class SolarCache(Base):
     __tablename__ = "solar_data_cache"
 
     id = Column(Integer, primary_key=True, index=True)
+    # WeatherService grid key (e.g. "weather:-6.92:107.62"), upsert target
+    grid_key = Column(String, unique=True, index=True)
     # Spatial Index Grid (Point or Polygon representing the grid cell)
     grid_location = Column(Geography('POINT', srid=4326), index=True)
     raw_weather_data = Column(JSONB)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, UUID4
 from typing import List, Optional, Tuple, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 
 class RoofPolygonInput(BaseModel):
     # List of [lat, lng]
@@ -14,6 +14,7 @@ class SimulationRequest(BaseModel):
     panel_efficiency: float = Field(0.20, ge=0.15, le=0.25, description="Panel efficiency (0.15-0.25)")
     system_cost_per_kwp: float = Field(15_000_000, ge=10_000_000, le=25_000_000, description="System cost per kWp in IDR")
     electricity_tariff: float = Field(1444.7, ge=1000, le=5000, description="Electricity tariff per kWh in IDR")
+    uncertainty_samples: Optional[int] = Field(None, ge=100, le=100_000, description="Monte Carlo samples for P50/P90 estimates (e.g. 10000); omit to skip")
 
 class MonthlyProduction(BaseModel):
     month: str
@@ -46,6 +47,10 @@ class PanelLayout(BaseModel):
     estimated_system_kwp: float
     setback_distance_m: float
     row_spacing_m: float
+    # Polygon-aware packing only
+    orientation_deg: Optional[float] = None
+    panel_orientation: Optional[str] = None
+    panels: Optional[List[List[List[float]]]] = None  # Panel rectangles as [[lat, lng], ...]
 
 class DetailedLosses(BaseModel):
     temperature_loss_percent: float
@@ -71,21 +76,124 @@ class SiteDetails(BaseModel):
     panel_layout: Optional[PanelLayout] = None
     detailed_losses: Optional[DetailedLosses] = None
 
+class CashFlowYear(BaseModel):
+    year: int
+    production_kwh: float
+    savings_idr: float
+    om_cost_idr: float
+    net_cash_flow_idr: float
+    cumulative_cash_flow_idr: float
+
 class FinancialOutput(BaseModel):
     estimated_system_cost_idr: float
     annual_savings_idr: float
     break_even_point_years: float
+    # Project-life projection (degradation, tariff escalation, O&M, inverter, discounting)
+    npv_idr: Optional[float] = None
+    irr_percent: Optional[float] = None
+    lcoe_idr_per_kwh: Optional[float] = None
+    payback_years: Optional[float] = None
+    discounted_payback_years: Optional[float] = None
+    cash_flows: Optional[List[CashFlowYear]] = None
 
 class EnvironmentOutput(BaseModel):
     co2_offset_ton: float
 
+class UncertaintyOutput(BaseModel):
+    samples: int
+    annual_production_kwh: Dict[str, float]  # p50, p75, p90, p99 (exceedance)
+    annual_production_std_kwh: float
+    payback_years: Dict[str, float]          # p50, p75, p90, p99 (reached within)
+    payback_horizon_years: float
+    probability_payback_within_horizon: float
+
 class MetaInfo(BaseModel):
     weather_source: str
     calculation_timestamp: datetime
+    cached: bool = False  # served from the result cache; calculation_timestamp is the serve time
 
 class SimulationResponse(BaseModel):
     site_details: SiteDetails
     energy_output: EnergyOutput
     financials: FinancialOutput
     environment: EnvironmentOutput
+    uncertainty: Optional[UncertaintyOutput] = None
+    meta: MetaInfo
+
+class BatchSimulationRequest(BaseModel):
+    items: List[SimulationRequest] = Field(..., min_length=1, max_length=1000, description="Rooftops to simulate")
+
+class BatchItemError(BaseModel):
+    status_code: int
+    detail: str
+
+class BatchItemResult(BaseModel):
+    index: int
+    result: Optional[SimulationResponse] = None
+    error: Optional[BatchItemError] = None
+
+class BatchSimulationResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    weather_cells: int
+    results: List[BatchItemResult]
+
+class OrientationRequest(BaseModel):
+    polygon: List[List[float]] # [[lat, lng], [lat, lng], ...]
+    panel_efficiency: float = Field(0.20, ge=0.15, le=0.25, description="Panel efficiency (0.15-0.25)")
+    max_tilt: float = Field(60.0, ge=0, le=90, description="Largest tilt evaluated, in degrees")
+    tilt_step: float = Field(2.0, ge=0.5, le=30, description="Tilt grid step in degrees")
+    azimuth_step: float = Field(10.0, ge=1, le=90, description="Azimuth grid step in degrees")
+    tolerance_percent: float = Field(2.0, gt=0, le=20, description="Near-optimal band below the optimum")
+
+class OrientationOptimum(BaseModel):
+    tilt: float
+    azimuth: float
+    yield_kwh_per_kwp: float
+    annual_production_kwh: float
+
+class NearOptimalRegion(BaseModel):
+    tolerance_percent: float
+    min_yield_kwh_per_kwp: float
+    tilt_range: Tuple[float, float]
+    orientations: List[Tuple[float, float]]  # [tilt, azimuth] pairs
+
+class OrientationResponse(BaseModel):
+    location: str
+    roof_area_sqm: float
+    tilts: List[float]
+    azimuths: List[float]
+    yield_kwh_per_kwp: List[List[float]]  # [tilt index][azimuth index]
+    optimum: OrientationOptimum
+    near_optimal: NearOptimalRegion
+    meta: MetaInfo
+
+class ForecastRequest(BaseModel):
+    polygon: List[List[float]] # [[lat, lng], [lat, lng], ...]
+    tilt: float = Field(20.0, description="Roof tilt in degrees")
+    azimuth: float = Field(180.0, description="Roof azimuth (0=North, 180=South)")
+    panel_efficiency: float = Field(0.20, ge=0.15, le=0.25, description="Panel efficiency (0.15-0.25)")
+    days: int = Field(5, ge=1, le=5, description="Forecast horizon in days (OWM forecasts 5)")
+
+class ForecastHour(BaseModel):
+    time: datetime  # Start of the hour, site-local time zone
+    ghi_w_m2: float
+    temp_c: float
+    cloud_cover_percent: float
+    energy_kwh: float
+
+class ForecastDay(BaseModel):
+    day: date  # Site-local; the first day starts at the current hour
+    energy_kwh: float
+    mean_cloud_cover_percent: float
+
+class ForecastResponse(BaseModel):
+    location: str
+    roof_area_sqm: float
+    timezone: str
+    total_energy_kwh: float
+    hourly: List[ForecastHour]
+    daily: List[ForecastDay]
+    forecast_issued_at: Optional[datetime] = None  # When the cached forecast was fetched (UTC)
     meta: MetaInfo
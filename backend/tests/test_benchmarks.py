@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+from benchmarks.fixtures import roof_polygons
+from benchmarks.suite import compare, main, measure
+
+
+def results(**ops_per_sec) -> dict:
+    return {"version": 1, "benchmarks": {name: {"ops_per_sec": ops} for name, ops in ops_per_sec.items()}}
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_fixture_vertex_counts_match_names(self):
+        for name, polygon in roof_polygons().items():
+            self.assertEqual(len(polygon), int(name.rsplit("_", 1)[1]))
+
+    def test_measure_reports_throughput(self):
+        stats = measure(lambda: sum(range(100)), rounds=3, min_round_seconds=0.001)
+        self.assertEqual(stats["rounds"], 3)
+        self.assertGreaterEqual(stats["iterations"], 1)
+        self.assertLessEqual(stats["min_s"], stats["median_s"])
+        self.assertAlmostEqual(stats["ops_per_sec"], 1.0 / stats["median_s"])
+
+    def test_compare_flags_throughput_drop_beyond_threshold(self):
+        report = compare(
+            results(a=100.0, b=100.0, c=100.0, gone=1.0),
+            results(a=80.0, b=90.0, c=130.0, added=1.0),
+            threshold=0.15
+        )
+        status = {row["name"]: row["status"] for row in report["rows"]}
+        self.assertEqual(status, {"a": "regressed", "b": "ok", "c": "improved", "gone": "missing", "added": "new"})
+        self.assertEqual(report["regressions"], ["a"])
+
+    def test_compare_command_exit_code(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline, current = os.path.join(tmp, "base.json"), os.path.join(tmp, "cur.json")
+            with open(baseline, "w") as f:
+                json.dump(results(a=100.0), f)
+            with open(current, "w") as f:
+                json.dump(results(a=50.0), f)
+            self.assertEqual(main(["compare", baseline, current]), 1)
+            self.assertEqual(main(["compare", baseline, current, "--threshold", "0.6"]), 0)
+
+    def test_run_writes_results_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            code = main(["run", "--filter", "calculate_geodesic_area[house_4]", "--rounds", "2",
+                         "--min-time", "0.001", "--output", output])
+            self.assertEqual(code, 0)
+            with open(output) as f:
+                document = json.load(f)
+        self.assertEqual(list(document["benchmarks"]), ["geometry.calculate_geodesic_area[house_4]"])
+        self.assertIn("pvlib", document["environment"]["packages"])
+
+
+if __name__ == '__main__':
+    unittest.main()
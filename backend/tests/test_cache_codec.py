@@ -0,0 +1,144 @@
+import asyncio
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from core.cache_codec import (
+    decode_forecast, decode_result, decode_weather, encode_forecast, encode_result, encode_weather
+)
+from core.result_cache import ResultCache
+from core.weather_service import WeatherService
+
+
+class RecordingRedis:
+    """In-memory stand-in for the redis.asyncio calls used by the caches; counts round-trips."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.round_trips = 0
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self)
+
+
+class RecordingPipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def setex(self, key, ttl, value):
+        assert isinstance(value, bytes) and isinstance(ttl, int) and ttl >= 1
+        self.commands.append((key, value))
+        self.redis.ttls[key] = ttl
+        return self
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        self.redis.data.update(self.commands)
+        return [True] * len(self.commands)
+
+
+class TestCacheCodec(unittest.TestCase):
+
+    def test_weather_round_trip_is_exact_and_compact(self):
+        cached_at = datetime(2026, 10, 17, 4, 5, 6, 123456)
+        payload = encode_weather(4.83, 27.9, cached_at)
+        legacy = json.dumps({"ghi_daily_kwh": 4.83, "temp_avg": 27.9, "cached_at": cached_at.isoformat()})
+        self.assertLess(len(payload), len(legacy) / 3)
+        self.assertEqual(decode_weather(payload), {"ghi_daily_kwh": 4.83, "temp_avg": 27.9, "cached_at": cached_at})
+
+    def test_unknown_formats_are_misses(self):
+        legacy = json.dumps({"ghi_daily_kwh": 4.8, "temp_avg": 28.0, "cached_at": "2026-01-01T00:00:00"}).encode()
+        for decode in (decode_weather, decode_forecast, decode_result):
+            self.assertIsNone(decode(legacy))
+            self.assertIsNone(decode(None))
+        self.assertIsNone(decode_weather(b"\x02" + encode_weather(4.8, 28.0, datetime(2026, 1, 1))[1:]))
+        self.assertIsNone(decode_weather(encode_weather(4.8, 28.0, datetime(2026, 1, 1))[:-1]))
+
+    def test_forecast_and_result_round_trip(self):
+        cached_at = datetime(2026, 10, 17, 3, 0)
+        steps = [{"dt": 1792206000 + i * 10800, "temp": 26.57 + i % 3, "clouds": float(i % 100)} for i in range(40)]
+        self.assertEqual(decode_forecast(encode_forecast(steps, cached_at)), {"steps": steps, "cached_at": cached_at})
+
+        result = {"energy_output": {"monthly": [412.5] * 12}, "meta": {"weather_source": "cache"}}
+        payload = encode_result(result, cached_at)
+        self.assertEqual(decode_result(payload), (result, cached_at))
+        self.assertLess(len(payload), len(json.dumps(result)))
+
+
+class TestMultiKeyAccess(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = RecordingRedis()
+        self.service = WeatherService()
+        self.service.store.enabled = False
+        self.service.REDIS_BATCH_SIZE = 4
+        patcher = patch.object(self.service, '_get_redis', new=AsyncMock(return_value=self.redis))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_weather_round_trips_per_chunk(self):
+        sites = [(-6.2 - i * 0.01, 106.8) for i in range(10)]
+        data = {"ghi_daily_kwh": 5.0, "temp_avg": 28.0, "source": "openweathermap"}
+
+        async def scenario():
+            cached_at = await self.service.set_many([(lat, lon, data) for lat, lon in sites])
+            writes = self.redis.round_trips
+            # Another worker: empty L1, same Redis
+            self.service._l1_cache.clear()
+            found = await self.service.get_many(sites + [(-9.0, 120.0)])
+            return cached_at, writes, found
+
+        cached_at, writes, found = asyncio.run(scenario())
+        self.assertEqual(writes, 3)
+        self.assertEqual(self.redis.round_trips, 6)
+        self.assertEqual(len(found), 10)
+        entry = found[self.service._get_grid_key(*sites[0])]
+        self.assertEqual((entry["source"], entry["ghi_daily_kwh"], entry["cached_at"]), ("cache", 5.0, cached_at[0]))
+        # Promoted to L1: the next lookup needs no round-trip
+        asyncio.run(self.service.get_many(sites))
+        self.assertEqual(self.redis.round_trips, 6)
+
+    def test_results_round_trip_per_chunk(self):
+        cache = ResultCache(self.service)
+        weather = {"source": "cache", "cached_at": datetime.utcnow() - timedelta(hours=1)}
+        entries = [(f"result:{i}", {"energy_output": {"annual_production_kwh": 4000.0 + i}}, weather) for i in range(6)]
+
+        async def scenario():
+            await cache.set_many(entries + [(None, {}, weather)])
+            cache._l1_cache.clear()
+            return await cache.get_many([key for key, _, _ in entries] + ["result:missing", None])
+
+        found = asyncio.run(scenario())
+        self.assertEqual(self.redis.round_trips, 4)
+        self.assertEqual(len(found), 6)
+        self.assertEqual(found["result:5"], {"energy_output": {"annual_production_kwh": 4005.0}})
+        self.assertGreater(cache._l1_cache.ttl("result:5"), 4.9 * 3600)
+
+    def test_results_never_outlive_their_weather(self):
+        cache = ResultCache(self.service)
+        # Weather expiring in 10.7 s: Redis keeps the result 10 s, not 11
+        weather = {"source": "cache", "cached_at": datetime.utcnow() - timedelta(hours=6) + timedelta(seconds=10.7)}
+        asyncio.run(cache.set_many([("result:short", {"a": 1}, weather)]))
+        self.assertEqual(self.redis.ttls["result:short"], 10)
+
+        # An entry Redis still holds just past its expiry is a miss
+        self.redis.data["result:expired"] = encode_result({"a": 2}, datetime.utcnow() - timedelta(seconds=0.5))
+        self.assertEqual(asyncio.run(cache.get_many(["result:expired"])), {})
+        self.assertNotIn("result:expired", cache._l1_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from core.cache_warmer import CacheWarmer
+from core.weather_service import WeatherService
+
+
+class TestCacheWarmer(unittest.TestCase):
+
+    def setUp(self):
+        self.service = WeatherService()
+        self.service.store.enabled = False
+        patcher = patch.object(self.service, '_get_redis', new=AsyncMock(return_value=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.warmer = CacheWarmer(self.service, top_n=2, calls_per_minute=60, refresh_ahead_seconds=600)
+        self.service.warmer = self.warmer
+
+    def weather(self, age_hours):
+        cached_at = datetime.utcnow() - timedelta(hours=age_hours)
+        return {"ghi_daily_kwh": 5.0, "temp_avg": 28.0, "source": "cache", "cached_at": cached_at}
+
+    def test_only_popular_cells_close_to_expiry_are_due(self):
+        almost_expired = self.weather(WeatherService.CACHE_TTL_HOURS - 0.05)
+        for _ in range(5):
+            self.warmer.record("weather:-6.2:106.8", -6.2, 106.8, almost_expired)    # Jakarta, hot
+        for _ in range(3):
+            self.warmer.record("weather:-6.92:107.62", -6.92, 107.62, self.weather(1))  # Bandung, fresh
+        self.warmer.record("weather:-8.5:115.2", -8.5, 115.2, almost_expired)        # rarely used
+
+        due = [key for key, _ in self.warmer.due_cells()]
+        self.assertEqual(due, ["weather:-6.2:106.8"])
+
+    def test_refresh_extends_entry_and_counts_saved_request(self):
+        stale = self.weather(WeatherService.CACHE_TTL_HOURS - 0.05)
+        for _ in range(3):
+            self.warmer.record("weather:-6.2:106.8", -6.2, 106.8, stale)
+
+        fetch = AsyncMock(return_value={"ghi_daily_kwh": 5.3, "temp_avg": 28.0, "source": "openweathermap"})
+
+        async def scenario():
+            with patch.object(self.service, '_fetch_from_owm', new=fetch):
+                refreshed = await self.warmer.run_once()
+                # After the replaced entry's expiry, the user is served from cache
+                self.warmer._replaced_expiry["weather:-6.2:106.8"] = datetime.utcnow() - timedelta(seconds=1)
+                weather = await self.service.get_weather_data(-6.2, 106.8)
+                return refreshed, weather
+
+        refreshed, weather = asyncio.run(scenario())
+        self.assertEqual(refreshed, 1)
+        self.assertEqual(fetch.await_count, 1)
+        self.assertEqual(weather["source"], "cache")
+        self.assertEqual(self.warmer.counters["requests_saved"], 1)
+        self.assertEqual(self.warmer.due_cells(), [])
+
+    def test_budget_limits_refreshes(self):
+        self.warmer.calls_per_minute = 1
+        self.warmer._tokens = 1
+        stale = self.weather(WeatherService.CACHE_TTL_HOURS - 0.05)
+        for key, lat in (("weather:-6.2:106.8", -6.2), ("weather:-7.25:112.75", -7.25)):
+            for _ in range(3):
+                self.warmer.record(key, lat, 106.8, stale)
+
+        fetch = AsyncMock(return_value={"ghi_daily_kwh": 5.0, "temp_avg": 28.0, "source": "openweathermap"})
+
+        async def scenario():
+            with patch.object(self.service, '_fetch_from_owm', new=fetch):
+                return await self.warmer.run_once()
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        self.assertEqual(self.warmer.counters["skipped_budget"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
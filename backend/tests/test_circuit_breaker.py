@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, patch
+import httpx
+from fastapi.testclient import TestClient
+from core import weather_service as weather_module
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.rate_limiter import RateLimiter
+from core.weather_service import WeatherService
+from main import app
+from tests.test_rate_limiter import WEATHER_BODY
+from tests.test_simulation_api import roof
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        with self.assertRaises(CircuitOpenError) as raised:
+            breaker.check()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, "half_open")
+        self.assertFalse(breaker.allow())
+
+        # Failed probe: open for another cool-down
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.stats()["opened"], 2)
+
+
+class HangingOWM(BaseHTTPRequestHandler):
+    """Upstream that accepts the connection and never answers in time."""
+
+    def do_GET(self):
+        time.sleep(2)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+
+    def setUp(self):
+        self.service = WeatherService()
+        self.service.api_key = "test-key"
+        self.service.store.enabled = False
+        self.service.rate_limiter = RateLimiter(calls_per_minute=6000, burst=100)
+        self.service.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+        redis = patch.object(self.service, '_get_redis', new=AsyncMock(return_value=None))
+        redis.start()
+        self.addCleanup(redis.stop)
+        self.requests = []
+
+    def use_transport(self, handler):
+        self.service._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def test_open_circuit_skips_upstream(self):
+        def handler(request):
+            self.requests.append(request)
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        async def scenario():
+            self.use_transport(handler)
+            try:
+                return [await self.service.get_weather_data(-6.2 - i * 0.01, 106.8) for i in range(4)]
+            finally:
+                await self.service.close()
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.service.breaker.state, "open")
+        self.assertTrue(all(weather["source"] == "mock" for weather in results))
+        # Fallbacks are not cached
+        self.assertEqual(len(self.service._l1_cache), 0)
+
+    def test_hanging_upstream_opens_circuit_within_short_timeout(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), HangingOWM)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.service.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        self.service.owm_timeout = 0.2
+
+        async def scenario():
+            try:
+                started = time.monotonic()
+                results = [await self.service.get_weather_data(-6.2 - i * 0.01, 106.8) for i in range(3)]
+                return results, time.monotonic() - started
+            finally:
+                await self.service.close()
+
+        results, elapsed = asyncio.run(scenario())
+        self.assertEqual(self.service.breaker.state, "open")
+        self.assertTrue(all(weather["source"] == "mock" for weather in results))
+        # Two timed-out calls, the third is not attempted
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(self.service.breaker.stats()["rejected"], 1)
+
+    def test_slow_successful_calls_count_as_failures(self):
+        self.service.owm_slow_call = 0.05
+
+        async def handler(request):
+            self.requests.append(request)
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json=WEATHER_BODY)
+
+        async def scenario():
+            self.use_transport(handler)
+            try:
+                return [await self.service.get_weather_data(-6.2 - i * 0.01, 106.8) for i in range(3)]
+            finally:
+                await self.service.close()
+
+        results = asyncio.run(scenario())
+        self.assertEqual([weather["source"] for weather in results], ["openweathermap", "openweathermap", "mock"])
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.service.breaker.state, "open")
+
+    def test_expired_cell_is_served_stale_and_refreshed_in_background(self):
+        temps = iter([27.0, 29.0])
+
+        async def handler(request):
+            self.requests.append(request)
+            if len(self.requests) > 1:
+                await asyncio.sleep(0.2)
+            return httpx.Response(200, json={**WEATHER_BODY, "main": {"temp": next(temps)}})
+
+        async def scenario():
+            self.use_transport(handler)
+            try:
+                await self.service.get_weather_data(-6.2, 106.8)
+                # The entry expires; its last known value stays
+                self.service._l1_cache.clear()
+                started = time.monotonic()
+                stale = await self.service.get_weather_data(-6.2, 106.8)
+                elapsed = time.monotonic() - started
+                await asyncio.gather(*self.service._inflight.values())
+                refreshed = await self.service.get_weather_data(-6.2, 106.8)
+                return stale, elapsed, refreshed
+            finally:
+                await self.service.close()
+
+        stale, elapsed, refreshed = asyncio.run(scenario())
+        self.assertEqual(stale["source"], "stale")
+        self.assertEqual(stale["temp_avg"], 27.0)
+        self.assertLess(elapsed, 0.1)
+        self.assertEqual(refreshed["source"], "cache")
+        self.assertEqual(refreshed["temp_avg"], 29.0)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.service.cache_stats()["stale_served"], 1)
+
+    def test_stale_source_is_reported_in_meta(self):
+        async def seed():
+            self.use_transport(lambda request: httpx.Response(200, json=WEATHER_BODY))
+            await self.service.get_weather_data(-6.2, 106.8)
+            await self.service.close()
+            self.service._l1_cache.clear()
+            self.service.breaker.record_failure()
+            self.service.breaker.record_failure()
+
+        asyncio.run(seed())
+        with patch.object(weather_module, "_weather_service", self.service):
+            response = TestClient(app).post("/api/v1/simulation/calculate", json=roof(-6.2, 106.8))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["meta"]["weather_source"], "stale")
+
+
+if __name__ == '__main__':
+    unittest.main()
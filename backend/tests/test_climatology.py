@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from core.climatology import ClimatologyGrid, header_path
+from core.solar_engine import SolarEngine
+
+
+def make_grid(diffuse=True):
+    """2x2 grid around Bandung; the eastern column is twice as sunny."""
+    months = np.arange(1, 13, dtype=float)
+    ghi = np.empty((12, 2, 2))
+    ghi[:, :, 0] = (4.0 + 0.1 * months)[:, None]
+    ghi[:, :, 1] = 2 * ghi[:, :, 0]
+    temp = np.broadcast_to((26.0 + 0.2 * months)[:, None, None], (12, 2, 2)).copy()
+    return ClimatologyGrid.from_arrays(
+        lat_axis=np.array([-7.0, -6.0]),
+        lon_axis=np.array([107.0, 108.0]),
+        ghi_daily_kwh=ghi,
+        temp_c=temp,
+        diffuse_fraction=np.full((12, 2, 2), 0.4) if diffuse else None
+    )
+
+
+class TestClimatologyGrid(unittest.TestCase):
+
+    def test_bilinear_interpolation(self):
+        climate = make_grid().lookup(-6.5, 107.25)
+        expected_ghi = (4.0 + 0.1 * np.arange(1, 13)) * 1.25
+        np.testing.assert_allclose(climate['ghi_daily_kwh'], expected_ghi, rtol=1e-6)
+        np.testing.assert_allclose(climate['diffuse_fraction'], 0.4, rtol=1e-6)
+
+    def test_missing_nodes_are_skipped(self):
+        grid = make_grid()
+        grid.data[:, :, :, 1] = np.nan
+        climate = grid.lookup(-6.5, 107.5)
+        np.testing.assert_allclose(climate['ghi_daily_kwh'], 4.0 + 0.1 * np.arange(1, 13), rtol=1e-6)
+
+        grid.data[:] = np.nan
+        self.assertIsNone(grid.lookup(-6.5, 107.5))
+
+    def test_outside_grid_returns_none(self):
+        self.assertIsNone(make_grid().lookup(-8.0, 107.5))
+
+    def test_save_load_is_memory_mapped(self):
+        grid = make_grid(diffuse=False)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'climatology_v1.npy')
+            grid.save(path)
+            self.assertTrue(os.path.exists(header_path(path)))
+
+            loaded = ClimatologyGrid.load(path)
+            self.assertIsInstance(loaded.data, np.memmap)
+            self.assertEqual(loaded.variables, ['ghi_daily_kwh', 'temp_c'])
+            np.testing.assert_allclose(
+                loaded.lookup(-6.2, 107.7)['temp_c'], grid.lookup(-6.2, 107.7)['temp_c']
+            )
+            del loaded
+
+    def test_from_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'climatology.csv')
+            with open(path, 'w') as f:
+                f.write("lat,lon,month,ghi_daily_kwh,temp_c\n")
+                for lat in (-7.0, -6.0):
+                    for lon in (107.0, 108.0):
+                        for month in range(1, 13):
+                            f.write(f"{lat},{lon},{month},{4.0 + month / 10},27.0\n")
+            grid = ClimatologyGrid.from_csv(path)
+        self.assertEqual(grid.data.shape, (2, 12, 2, 2))
+        self.assertAlmostEqual(float(grid.lookup(-6.5, 107.5)['ghi_daily_kwh'][6]), 4.7, places=5)
+
+
+class TestSolarEngineClimatology(unittest.TestCase):
+
+    def test_factors_follow_site_climatology(self):
+        with patch('core.solar_engine.get_climatology', return_value=make_grid()):
+            ghi_factors, temp_offsets = SolarEngine.get_monthly_climate_factors(-6.5, 107.5)
+        self.assertAlmostEqual(np.average(ghi_factors, weights=SolarEngine.DAYS_IN_MONTH), 1.0)
+        self.assertLess(ghi_factors[0], ghi_factors[11])
+        self.assertAlmostEqual(temp_offsets[11] - temp_offsets[0], 2.2, places=5)
+
+    def test_falls_back_to_nationwide_factors(self):
+        with patch('core.solar_engine.get_climatology', return_value=make_grid()):
+            ghi_factors, _ = SolarEngine.get_monthly_climate_factors(3.6, 98.7)  # Medan
+        self.assertEqual(ghi_factors[6], SolarEngine.MONTHLY_GHI_FACTORS[7])
+
+
+if __name__ == '__main__':
+    unittest.main()
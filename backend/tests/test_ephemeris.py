@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pvlib
+from core import ephemeris
+from core.ephemeris import EphemerisCache, FIELDS, grid_cell, hourly_times
+from core.geometry import local_timezone
+from core.solar_engine import SolarEngine
+
+
+class TestLocalTimezone(unittest.TestCase):
+
+    def test_indonesian_zones(self):
+        cases = {
+            (-6.2088, 106.8456): 'Asia/Jakarta',    # Jakarta
+            (3.5952, 98.6722): 'Asia/Jakarta',      # Medan
+            (-7.2575, 112.7521): 'Asia/Jakarta',    # Surabaya
+            (-8.2192, 114.3691): 'Asia/Jakarta',    # Banyuwangi
+            (-2.2161, 113.9135): 'Asia/Jakarta',    # Palangka Raya
+            (-8.6705, 115.2126): 'Asia/Makassar',   # Denpasar
+            (-3.3194, 114.5908): 'Asia/Makassar',   # Banjarmasin
+            (-0.5022, 117.1536): 'Asia/Makassar',   # Samarinda
+            (-5.1477, 119.4327): 'Asia/Makassar',   # Makassar
+            (-10.1772, 123.6070): 'Asia/Makassar',  # Kupang
+            (0.7893, 127.3819): 'Asia/Jayapura',    # Ternate
+            (-3.6954, 128.1814): 'Asia/Jayapura',   # Ambon
+            (-3.2400, 126.1100): 'Asia/Jayapura',   # Buru
+            (-2.5337, 140.7181): 'Asia/Jayapura',   # Jayapura
+        }
+        for (lat, lon), tz in cases.items():
+            self.assertEqual(local_timezone(lat, lon), tz, (lat, lon))
+
+
+class TestEphemerisCache(unittest.TestCase):
+
+    def test_matches_pvlib_at_cell_center(self):
+        cache = EphemerisCache()
+        entry = cache.get(-6.93, 107.61)
+        self.assertEqual((entry['lat'], entry['lon']), (-6.9, 107.6))
+        self.assertEqual(entry['timezone'], 'Asia/Jakarta')
+
+        times = hourly_times('Asia/Jakarta')
+        location = pvlib.location.Location(-6.9, 107.6)
+        solpos = location.get_solarposition(times)
+        clearsky = location.get_clearsky(times, solar_position=solpos)
+        for field in FIELDS:
+            self.assertEqual(entry[field].dtype, np.float32)
+            self.assertEqual(entry[field].shape, (8760,))
+            self.assertFalse(entry[field].flags.writeable)
+        np.testing.assert_allclose(entry['solar_zenith'], solpos['apparent_zenith'].values, atol=1e-3)
+        np.testing.assert_allclose(entry['clearsky_ghi'], clearsky['ghi'].values, atol=1e-2)
+
+    def test_local_hours_follow_site_timezone(self):
+        cache = EphemerisCache()
+        # Solar noon falls in local hour 11-12 in all three zones, not two hours late in Papua
+        for lat, lon in ((-6.2, 106.8), (-5.1, 119.4), (-2.5, 140.7)):
+            noon = cache.days(lat, lon, [80])['solar_zenith'].argmin()
+            self.assertIn(noon, (11, 12), (lat, lon))
+
+    def test_lru_shares_cells_and_evicts(self):
+        cache = EphemerisCache(max_cells=2)
+        with patch.object(ephemeris, 'compute_ephemeris', wraps=ephemeris.compute_ephemeris) as compute:
+            first = cache.get(-6.91, 107.62)
+            self.assertIs(cache.get(-6.94, 107.58), first)
+            cache.get(-7.5, 110.4)
+            cache.get(-6.91, 107.62)
+            cache.get(-8.6, 115.2)
+            self.assertEqual(compute.call_count, 3)
+        self.assertEqual(grid_cell(-6.94, 107.58), grid_cell(-6.91, 107.62))
+        self.assertNotIn(grid_cell(-7.5, 110.4), cache._data)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_days_slices_local_days(self):
+        cache = EphemerisCache()
+        entry = cache.get(-2.5, 140.7)
+        sky = cache.days(-2.5, 140.7, [1, 365])
+        np.testing.assert_array_equal(sky['clearsky_dni'][:24], entry['clearsky_dni'][:24])
+        np.testing.assert_array_equal(sky['clearsky_dni'][24:], entry['clearsky_dni'][-24:])
+        self.assertEqual(sky['clearsky_dni'].dtype, np.float64)
+
+    def test_engine_paths_share_the_cache(self):
+        cache = EphemerisCache()
+        with patch.object(ephemeris, '_cache', cache):
+            geometry = SolarEngine.prepare_annual_geometry(-6.9, 107.6)
+            SolarEngine.get_daily_transposition_factor(-6.9, 107.6, 20.0, 0.0)
+            SolarEngine.get_monthly_transposition_factors(-6.9, 107.6, 20.0, 0.0)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(geometry['solar_zenith'].dtype, np.float64)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+import unittest
+from core.executor import SimulationExecutor, ExecutorSaturatedError
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+class TestSimulationExecutor(unittest.TestCase):
+
+    def test_runs_off_loop_in_process_pool(self):
+        executor = SimulationExecutor(mode="process", max_workers=1, max_queue=1)
+        try:
+            result = asyncio.run(executor.run(square, 7))
+        finally:
+            executor.shutdown()
+        self.assertEqual(result, 49)
+        self.assertEqual(executor.in_flight, 0)
+
+    def test_rejects_when_saturated(self):
+        executor = SimulationExecutor(mode="thread", max_workers=1, max_queue=0, retry_after=3)
+        release = threading.Event()
+
+        async def scenario():
+            blocked = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            with self.assertRaises(ExecutorSaturatedError) as ctx:
+                await executor.run(square, 2)
+            self.assertEqual(ctx.exception.retry_after, 3)
+
+            # Follow-up stages of an admitted request are not rejected
+            follow_up = asyncio.ensure_future(executor.run(square, 3, admitted=True))
+            await asyncio.sleep(0.05)
+            release.set()
+            await blocked
+            return await follow_up
+
+        try:
+            self.assertEqual(asyncio.run(scenario()), 9)
+        finally:
+            executor.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
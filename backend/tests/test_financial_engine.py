@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+from core.financial_engine import FinancialEngine
+
+
+class TestFinancialEngine(unittest.TestCase):
+
+    def test_cash_flow_projection(self):
+        flows = FinancialEngine.project_cash_flows(45e6, 4600, 1444.7)
+        years = FinancialEngine.PROJECT_YEARS + 1
+        self.assertEqual(flows['net_cash_flow'].shape, (1, years))
+        self.assertAlmostEqual(flows['production_kwh'][0, 0], 0.0)
+        self.assertAlmostEqual(flows['production_kwh'][0, 1], 4600.0)
+        self.assertAlmostEqual(
+            flows['production_kwh'][0, 2], 4600.0 * (1 - FinancialEngine.DEGRADATION_RATE)
+        )
+        replacement = FinancialEngine.INVERTER_REPLACEMENT_YEAR
+        self.assertAlmostEqual(flows['inverter_cost'][0, replacement], 45e6 * FinancialEngine.INVERTER_COST_FRACTION)
+        self.assertAlmostEqual(flows['cumulative_cash_flow'][0, -1], flows['net_cash_flow'][0].sum())
+
+    def test_metrics_are_consistent(self):
+        result = FinancialEngine.evaluate([45e6, 45e6], [4600, 500], 1444.7)
+        irr = result['irr'][0]
+        self.assertAlmostEqual(FinancialEngine.npv(result['net_cash_flow'][:1], irr)[0], 0.0, delta=1.0)
+        self.assertGreater(result['npv'][0], 0)
+        self.assertLess(result['payback_years'][0], result['discounted_payback_years'][0])
+
+        # A tiny system never pays back
+        self.assertTrue(np.isnan(result['payback_years'][1]))
+        self.assertLess(result['npv'][1], 0)
+
+    def test_irr_matches_textbook_case(self):
+        # -100 now, +110 in a year: 10%
+        self.assertAlmostEqual(FinancialEngine.irr(np.array([[-100.0, 110.0]]))[0], 0.10, places=9)
+        self.assertTrue(np.isnan(FinancialEngine.irr(np.array([[100.0, 10.0]]))[0]))
+
+    def test_payback_interpolates_within_year(self):
+        # Cumulative: -100, -60, -20, +20 -> 2.5 years
+        self.assertAlmostEqual(FinancialEngine.payback(np.array([[-100.0, 40.0, 40.0, 40.0]]))[0], 2.5)
+
+    def test_batch_is_vectorized(self):
+        sites = 5000
+        result = FinancialEngine.evaluate(np.full(sites, 45e6), np.linspace(2000, 8000, sites), 1444.7)
+        self.assertEqual(result['npv'].shape, (sites,))
+        self.assertTrue(np.all(np.diff(result['npv']) > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
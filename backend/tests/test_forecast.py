@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, patch
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from api.v1.endpoints import simulation
+from core.solar_engine import SolarEngine
+from core.weather_service import WeatherService
+from main import app
+from tests.test_simulation_api import roof
+
+
+class StubOWM(BaseHTTPRequestHandler):
+    """Local stand-in for api.openweathermap.org/data/2.5 (forecast only)."""
+
+    requests = []
+    clouds = 20.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        StubOWM.requests.append((url.path, parse_qs(url.query)))
+        if url.path != "/forecast":
+            self.send_response(404)
+            self.end_headers()
+            return
+        start = int(time.time() // 10800 * 10800)
+        body = json.dumps({"cnt": 40, "list": [
+            {"dt": start + i * 10800, "main": {"temp": 26.0 + i % 4}, "clouds": {"all": StubOWM.clouds}}
+            for i in range(40)
+        ]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestForecast(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubOWM)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubOWM.requests = []
+        env = patch.dict("os.environ", {"OWM_BASE_URL": self.base_url, "OPENWEATHER_API_KEY": "test-key"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.service = WeatherService()
+        self.service.store.enabled = False
+        redis = patch.object(self.service, '_get_redis', new=AsyncMock(return_value=None))
+        redis.start()
+        self.addCleanup(redis.stop)
+
+    def test_forecast_is_fetched_once_per_grid_cell(self):
+        async def scenario():
+            try:
+                first = await asyncio.gather(*(
+                    self.service.get_forecast(-6.2088 + i * 0.0001, 106.8456) for i in range(5)
+                ))
+                again = await self.service.get_forecast(-6.2089, 106.8457)
+                return first, again
+            finally:
+                await self.service.close()
+
+        first, again = asyncio.run(scenario())
+        self.assertEqual(len(StubOWM.requests), 1)
+        path, query = StubOWM.requests[0]
+        self.assertEqual(query["appid"], ["test-key"])
+        self.assertEqual(first[0]["source"], "openweathermap")
+        self.assertEqual(len(first[0]["steps"]), 40)
+        self.assertEqual(again["source"], "cache")
+        self.assertEqual(again["steps"], first[0]["steps"])
+
+    def test_endpoint_returns_hourly_production(self):
+        with patch.object(simulation, "get_weather_service", new=AsyncMock(return_value=self.service)):
+            response = TestClient(app).post(
+                "/api/v1/simulation/forecast", json={**roof(-6.2088, 106.8456), "days": 2}
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["timezone"], "Asia/Jakarta")
+        self.assertEqual(data["meta"]["weather_source"], "openweathermap")
+        self.assertLessEqual(len(data["hourly"]), 48)
+        self.assertTrue(data["hourly"][0]["time"].endswith("+07:00"))
+        self.assertAlmostEqual(
+            sum(hour["energy_kwh"] for hour in data["hourly"]), data["total_energy_kwh"], delta=0.1
+        )
+        self.assertGreater(data["total_energy_kwh"], 0)
+
+
+class TestForecastSimulation(unittest.TestCase):
+
+    def simulate(self, clouds: float, lat: float = -2.5337, lon: float = 140.7181) -> dict:
+        start = pd.Timestamp(2026, 3, 1, tz='UTC')
+        forecast_times = pd.date_range(start, periods=40, freq='3h')
+        return SolarEngine.calculate_forecast_simulation(
+            lat, lon, 100.0, 10.0, 0.0, forecast_times,
+            cloud_cover=np.full(40, clouds), temp_air=np.full(40, 28.0), start=start
+        )
+
+    def test_clouds_reduce_production(self):
+        clear, overcast = self.simulate(0.0), self.simulate(100.0)
+        self.assertEqual(len(clear["hourly"]), 117)
+        ratio = overcast["total_energy_kwh"] / clear["total_energy_kwh"]
+        self.assertGreater(ratio, 0.2)
+        self.assertLess(ratio, 0.35)
+
+    def test_hours_are_local(self):
+        result = self.simulate(0.0)
+        self.assertEqual(result["timezone"], "Asia/Jayapura")
+        peak = max(result["hourly"], key=lambda hour: hour["energy_kwh"])
+        self.assertIn(peak["time"].hour, (11, 12))
+        self.assertEqual(len(result["daily"]), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+import pyproj
+from core.geometry import (
+    calculate_geodesic_area, polygon_centroid, project_polygons, MAX_VERTICES
+)
+
+
+def geod_area(coordinates) -> float:
+    lats, lons = zip(*coordinates)
+    area, _ = pyproj.Geod(ellps='WGS84').polygon_area_perimeter(lons, lats)
+    return abs(area)
+
+
+class TestGeometry(unittest.TestCase):
+
+    def test_area_matches_ellipsoidal_area(self):
+        roof = [[-6.9175, 107.6191], [-6.9175, 107.6195], [-6.9179, 107.6195], [-6.9179, 107.6191]]
+        self.assertAlmostEqual(calculate_geodesic_area(roof), geod_area(roof), delta=geod_area(roof) * 0.002)
+
+    def test_centroid_is_area_weighted(self):
+        # L-shaped roof: a dense run of vertices along one edge pulls the vertex mean away
+        roof = [[0.0, 0.0], [0.0, 0.0001], [0.0, 0.0002], [0.0, 0.0003], [0.0, 0.0004],
+                [0.0004, 0.0004], [0.0004, 0.0]]
+        lat, lon = polygon_centroid(roof)
+        self.assertAlmostEqual(lat, 0.0002, places=9)
+        self.assertAlmostEqual(lon, 0.0002, places=9)
+
+    def test_vectorized_matches_single(self):
+        roofs = [
+            [[-6.2, 106.8], [-6.2, 106.8003], [-6.2002, 106.8003]],
+            [[3.59, 98.67], [3.59, 98.6705], [3.5904, 98.6705], [3.5904, 98.67]],  # northern hemisphere
+            [[-8.65, 115.21], [-8.65, 115.2102], [-8.6502, 115.2102], [-8.6502, 115.21]],
+        ]
+        result = project_polygons(roofs)
+        for roof, area in zip(roofs, result['area_sqm']):
+            self.assertAlmostEqual(area, calculate_geodesic_area(roof), places=6)
+        self.assertEqual(len(set(result['epsg'])), 3)
+
+    def test_dense_polygons_are_simplified(self):
+        theta = np.linspace(0, 2 * np.pi, MAX_VERTICES * 2, endpoint=False)
+        roof = np.column_stack([-6.9 + 0.0003 * np.sin(theta), 107.6 + 0.0003 * np.cos(theta)])
+        projected = project_polygons([roof])['projected'][0]
+        self.assertLess(len(projected.exterior.coords), MAX_VERTICES)
+        self.assertAlmostEqual(projected.area, geod_area(roof.tolist()), delta=geod_area(roof.tolist()) * 0.005)
+
+if __name__ == '__main__':
+    unittest.main()
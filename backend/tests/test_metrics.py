@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from core import metrics
+from core.metrics import StageTimer, route_template, server_timing_header
+from core.weather_service import WeatherService
+from main import app
+from tests.test_simulation_api import roof
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_cache_hit_ratio_is_derived_from_lookups(self):
+        for hit in (True, True, True, False):
+            metrics.record_cache_lookup("demo", "l1", hit)
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            "solarroute_cache_lookups_total", {"cache": "demo", "tier": "l1", "result": "hit"}
+        ), 3)
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            "solarroute_cache_hit_ratio", {"cache": "demo", "tier": "l1"}
+        ), 0.75)
+
+    def test_server_timing_merges_repeated_stages(self):
+        header = server_timing_header(
+            [("weather", 0.0021, "cache"), ("layout", 0.001, None), ("layout", 0.002, None)], total=0.01
+        )
+        self.assertEqual(header, 'weather;dur=2.1;desc="cache", layout;dur=3.0, total;dur=10.0')
+
+    def test_stage_timer_accumulates(self):
+        timer = StageTimer()
+        for _ in range(2):
+            with timer.stage("layout"):
+                pass
+        self.assertEqual(list(timer.durations), ["layout"])
+
+    def test_route_template_restores_router_prefix(self):
+        class Route:
+            path = "/calculate"
+        scope = {"path": "/api/v1/simulation/calculate", "route": Route()}
+        self.assertEqual(route_template(scope), "/api/v1/simulation/calculate")
+        Route.path = "/api/v1/simulation/calculate"
+        self.assertEqual(route_template(scope), "/api/v1/simulation/calculate")
+        self.assertEqual(route_template({"path": "/nope"}), "unmatched")
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(WeatherService, '_get_redis', new=AsyncMock(return_value=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    def test_calculate_reports_stages(self):
+        response = self.client.post("/api/v1/simulation/calculate", json=roof(-3.3194, 114.5908))
+        self.assertEqual(response.status_code, 200)
+        stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+        for name in ("weather", "geometry", "daily_sim", "monthly_sim", "layout", "losses", "total"):
+            self.assertIn(name, stages)
+
+        text = self.client.get("/metrics").text
+        self.assertIn(
+            'solarroute_stage_duration_seconds_count{route="/api/v1/simulation/calculate",stage="layout"}', text
+        )
+        self.assertIn('solarroute_cache_lookups_total{cache="weather",result="miss",tier="l1"}', text)
+        self.assertIn('solarroute_weather_responses_total{source="mock"}', text)
+        self.assertIn("solarroute_executor_jobs_in_flight 0.0", text)
+        self.assertIn("# TYPE solarroute_stage_duration_seconds histogram", text)
+        self.assertNotIn("_created", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import shapely
+from shapely import affinity
+from shapely.geometry import Polygon, box
+from core.panel_packing import pack_panels, candidate_angles
+from core.solar_engine import SolarEngine
+
+PANEL = dict(panel_width_m=1.134, panel_height_m=2.279, setback_m=0.5, row_spacing_m=0.3)
+
+
+class TestPanelPacking(unittest.TestCase):
+
+    def assert_valid_layout(self, roof, layout):
+        panels = shapely.polygons(layout['corners'])
+        usable = roof.buffer(-PANEL['setback_m'], join_style='mitre').buffer(1e-6)
+        self.assertTrue(shapely.contains(usable, panels).all())
+        overlaps = shapely.area(shapely.intersection(panels[:, None], panels[None, :]))
+        self.assertAlmostEqual(float(overlaps.sum() - shapely.area(panels).sum()), 0.0, places=6)
+
+    def test_l_shaped_roof_beats_square_approximation(self):
+        roof = Polygon([(0, 0), (30, 0), (30, 10), (20, 10), (20, 20), (0, 20)])
+        layout = pack_panels(roof, **PANEL)
+        self.assert_valid_layout(roof, layout)
+
+        square = SolarEngine.calculate_panel_layout(roof.area, **PANEL)
+        self.assertLess(layout['total_panels'], square['total_panels'])
+        self.assertGreater(layout['total_panels'], 0.5 * square['total_panels'])
+
+    def test_rotated_roof_uses_edge_aligned_grid(self):
+        upright = box(0, 0, 12.0, 8.0)
+        rotated = affinity.rotate(upright, 33, origin=(0, 0))
+        self.assertIn(33.0, [round(a) for a in candidate_angles(rotated)])
+
+        expected = pack_panels(upright, **PANEL)['total_panels']
+        layout = pack_panels(rotated, **PANEL)
+        self.assertEqual(layout['total_panels'], expected)
+        self.assert_valid_layout(rotated, layout)
+
+    def test_roof_smaller_than_a_panel(self):
+        layout = pack_panels(box(0, 0, 2.0, 2.0), **PANEL)
+        self.assertEqual(layout['total_panels'], 0)
+        self.assertEqual(layout['corners'].shape, (0, 4, 2))
+
+    def test_dense_roof_packs_like_its_simple_outline(self):
+        # Timing of this case: benchmarks/suite.py (panel_packing.pack_panels[dense_l_shape])
+        outline = Polygon([(0, 0), (30, 0), (30, 10), (20, 10), (20, 20), (0, 20)])
+        roof = affinity.rotate(shapely.segmentize(outline, 0.2), 27, origin=(0, 0))
+        self.assertGreaterEqual(len(roof.exterior.coords), 500)
+        layout = pack_panels(roof, **PANEL)
+        self.assert_valid_layout(roof, layout)
+        expected = pack_panels(affinity.rotate(outline, 27, origin=(0, 0)), **PANEL)['total_panels']
+        self.assertEqual(layout['total_panels'], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from core.persistence import SimulationWriter, polygon_to_wkt
+from models.schemas import SimulationRequest
+
+REQUEST = SimulationRequest(polygon=[[-6.9, 107.6], [-6.9, 107.61], [-6.91, 107.61]], bill_idr=1_000_000)
+
+
+class RecordingWriter(SimulationWriter):
+    """Captures batches instead of writing to PostgreSQL."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.enabled = True
+        self.batches = []
+
+    async def _write_batch(self, batch):
+        await asyncio.sleep(0.01)
+        self.batches.append(len(batch))
+
+
+class TestSimulationWriter(unittest.TestCase):
+
+    def test_polygon_to_wkt_closes_ring_in_lon_lat_order(self):
+        self.assertEqual(
+            polygon_to_wkt(REQUEST.polygon),
+            "POLYGON((107.6 -6.9, 107.61 -6.9, 107.61 -6.91, 107.6 -6.9))"
+        )
+
+    def test_batches_and_flushes_on_shutdown(self):
+        writer = RecordingWriter(queue_size=100, batch_size=10, flush_seconds=0.05)
+
+        async def scenario():
+            await writer.start()
+            for _ in range(25):
+                writer.enqueue(REQUEST, {})
+            await asyncio.sleep(0.2)
+            for _ in range(3):
+                writer.enqueue(REQUEST, {})
+            await writer.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(sum(writer.batches), 28)
+        self.assertLessEqual(max(writer.batches), 10)
+        self.assertEqual(writer.stats["written"], 28)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        for policy in ("newest", "oldest"):
+            writer = RecordingWriter(queue_size=5, batch_size=5, flush_seconds=10, drop_policy=policy)
+
+            async def scenario():
+                writer._queue = asyncio.Queue(maxsize=writer.queue_size)  # not started: nothing consumes
+                accepted = [writer.enqueue(REQUEST, {"n": i}) for i in range(8)]
+                kept = [writer._queue.get_nowait()[1]["n"] for _ in range(writer._queue.qsize())]
+                return accepted, kept
+
+            accepted, kept = asyncio.run(scenario())
+            self.assertEqual(writer.stats["dropped"], 3)
+            if policy == "newest":
+                self.assertEqual(accepted.count(False), 3)
+                self.assertEqual(kept, [0, 1, 2, 3, 4])
+            else:
+                self.assertTrue(all(accepted))
+                self.assertEqual(kept, [3, 4, 5, 6, 7])
+
+if __name__ == '__main__':
+    unittest.main()
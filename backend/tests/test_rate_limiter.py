@@ -0,0 +1,150 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+import httpx
+from fastapi.testclient import TestClient
+from core import weather_service as weather_module
+from core.rate_limiter import RateLimiter, RateLimitExceededError
+from core.weather_service import WeatherService
+from main import app
+from tests.test_simulation_api import roof
+
+WEATHER_BODY = {"main": {"temp": 27.0}, "clouds": {"all": 20}, "name": "Stub"}
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_burst_then_queued_at_the_sustained_rate(self):
+        # 10 calls/s, 2 in the bucket
+        limiter = RateLimiter(calls_per_minute=600, burst=2)
+
+        async def scenario():
+            started = time.monotonic()
+            waits = [await limiter.acquire() for _ in range(4)]
+            return waits, time.monotonic() - started
+
+        waits, elapsed = asyncio.run(scenario())
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1, delta=0.02)
+        self.assertGreaterEqual(elapsed, 0.18)
+        self.assertEqual(limiter.stats()["acquired"], 4)
+
+    def test_rejects_without_consuming_when_wait_exceeds_max(self):
+        limiter = RateLimiter(calls_per_minute=600, burst=1)
+
+        async def scenario():
+            await limiter.acquire(max_wait=0)
+            with self.assertRaises(RateLimitExceededError) as raised:
+                await limiter.acquire(max_wait=0.01)
+            self.assertEqual(raised.exception.retry_after, 1)
+            # The rejected call took no token: the next one is still ~0.1 s away
+            return await limiter.acquire(max_wait=0.5)
+
+        self.assertLess(asyncio.run(scenario()), 0.11)
+        self.assertEqual(limiter.stats()["rejected"], 1)
+
+    def test_backoff_holds_back_calls(self):
+        limiter = RateLimiter(calls_per_minute=600, burst=5)
+        limiter.backoff(0.1)
+        self.assertGreaterEqual(asyncio.run(limiter.acquire()), 0.09)
+        with self.assertRaises(RateLimitExceededError):
+            limiter.backoff(5)
+            asyncio.run(limiter.acquire(max_wait=1))
+
+
+class TestRateLimitedWeatherService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = WeatherService()
+        self.service.api_key = "test-key"
+        self.service.store.enabled = False
+        self.service.rate_limiter = RateLimiter(calls_per_minute=6000, burst=100)
+        redis = patch.object(self.service, '_get_redis', new=AsyncMock(return_value=None))
+        redis.start()
+        self.addCleanup(redis.stop)
+        self.requests = []
+
+    def use_transport(self, handler):
+        self.service._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def test_429_is_queued_and_retried_not_mocked(self):
+        def handler(request):
+            self.requests.append(request)
+            if len(self.requests) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0.05"})
+            return httpx.Response(200, json=WEATHER_BODY)
+
+        async def scenario():
+            self.use_transport(handler)
+            try:
+                return await self.service.get_weather_data(-6.2, 106.8)
+            finally:
+                await self.service.close()
+
+        weather = asyncio.run(scenario())
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(weather["source"], "openweathermap")
+        self.assertEqual(weather["temp_avg"], 27.0)
+
+    def test_exhausted_quota_is_an_error_not_mock_data(self):
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(429, headers={"Retry-After": "0.01"})
+
+        async def scenario():
+            self.use_transport(handler)
+            try:
+                await self.service.get_weather_data(-6.2, 106.8)
+            finally:
+                await self.service.close()
+
+        with self.assertRaises(RateLimitExceededError):
+            asyncio.run(scenario())
+        self.assertEqual(len(self.requests), WeatherService.OWM_MAX_ATTEMPTS)
+
+    def test_endpoint_answers_503_with_retry_after(self):
+        self.service.rate_limiter = RateLimiter(calls_per_minute=1, burst=1)
+        self.service.rate_limiter.backoff(60)
+        with patch.object(weather_module, "_weather_service", self.service):
+            response = TestClient(app).post("/api/v1/simulation/calculate", json=roof(-6.2, 106.8))
+        self.assertEqual(response.status_code, 503)
+        self.assertGreaterEqual(int(response.headers["Retry-After"]), 50)
+
+    def test_bulk_fetch_bounds_concurrency_and_waits_for_quota(self):
+        # 20 calls/s with a burst of 2; interactive callers would give up at once
+        self.service.rate_limiter = RateLimiter(calls_per_minute=1200, burst=2)
+        self.service.rate_limit_max_wait = 0
+        state = {"in_flight": 0, "peak": 0}
+
+        async def handler(request):
+            self.requests.append(request)
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.02)
+            state["in_flight"] -= 1
+            return httpx.Response(200, json=WEATHER_BODY)
+
+        coordinates = [(-6.2 - i * 0.01, 106.8) for i in range(8)]
+
+        async def scenario():
+            self.use_transport(handler)
+            try:
+                started = time.monotonic()
+                # Two sites share a grid cell: fetched once
+                weather = await self.service.get_weather_many(coordinates + [(-6.2001, 106.8001)], concurrency=3)
+                return weather, time.monotonic() - started
+            finally:
+                await self.service.close()
+
+        weather, elapsed = asyncio.run(scenario())
+        self.assertEqual(len(weather), 8)
+        self.assertEqual(len(self.requests), 8)
+        self.assertLessEqual(state["peak"], 3)
+        self.assertTrue(all(entry["source"] == "openweathermap" for entry in weather.values()))
+        # Six of the eight calls had to wait for a token (1/20 s apart)
+        self.assertGreaterEqual(elapsed, 0.28)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from core.result_cache import canonicalize_polygon, result_cache_key
+from models.schemas import SimulationRequest
+
+ROOF = [[-6.9175, 107.6191], [-6.9175, 107.6195], [-6.9179, 107.6195], [-6.9179, 107.6191]]
+
+
+def request(polygon=ROOF, **overrides) -> SimulationRequest:
+    return SimulationRequest(polygon=polygon, bill_idr=overrides.pop("bill_idr", 1_500_000), **overrides)
+
+
+class TestResultCacheKey(unittest.TestCase):
+
+    def test_polygon_canonicalization(self):
+        expected = canonicalize_polygon(ROOF)
+        rotated = ROOF[2:] + ROOF[:2]
+        reversed_ring = ROOF[::-1]
+        closed = ROOF + [ROOF[0]]
+        noisy = [[lat + 1e-9, lon - 1e-9] for lat, lon in ROOF]
+        for variant in (rotated, reversed_ring, closed, noisy):
+            self.assertEqual(canonicalize_polygon(variant), expected)
+
+    def test_key_covers_result_inputs_only(self):
+        base = result_cache_key(request(), "2026-01-01T00:00:00")
+        self.assertEqual(base, result_cache_key(request(bill_idr=999_000), "2026-01-01T00:00:00"))
+        self.assertEqual(base, result_cache_key(request(polygon=ROOF[::-1]), "2026-01-01T00:00:00"))
+
+        self.assertNotEqual(base, result_cache_key(request(tilt=25.0), "2026-01-01T00:00:00"))
+        self.assertNotEqual(base, result_cache_key(request(electricity_tariff=1699.53), "2026-01-01T00:00:00"))
+        self.assertNotEqual(base, result_cache_key(request(), "2026-01-01T06:00:00"))
+
+if __name__ == '__main__':
+    unittest.main()
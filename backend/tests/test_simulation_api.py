@@ -0,0 +1,193 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from api.v1.endpoints import simulation
+from core import executor as executor_module
+from core.executor import SimulationExecutor
+from core.weather_service import WeatherService
+from models.schemas import SimulationRequest
+from main import app
+
+
+def roof(lat: float, lon: float, size: float = 0.0002, **overrides) -> dict:
+    """Square roof polygon in [lat, lng] order with default request fields."""
+    request = {
+        "polygon": [[lat, lon], [lat, lon + size], [lat - size, lon + size], [lat - size, lon]],
+        "bill_idr": 1_500_000,
+        "tilt": 20.0,
+        "azimuth": 0.0,
+    }
+    request.update(overrides)
+    return request
+
+
+class TestSimulationAPI(unittest.TestCase):
+
+    def setUp(self):
+        # No Redis, no OWM key: weather comes from the deterministic mock
+        patcher = patch.object(WeatherService, '_get_redis', new=AsyncMock(return_value=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    def test_calculate(self):
+        response = self.client.post("/api/v1/simulation/calculate", json=roof(-6.9175, 107.6191))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertGreater(data['site_details']['roof_area_sqm'], 400)
+        self.assertEqual(len(data['energy_output']['monthly_breakdown']['monthly_breakdown']), 12)
+
+        financials = data['financials']
+        self.assertEqual(len(financials['cash_flows']), 26)
+        self.assertLess(financials['cash_flows'][0]['net_cash_flow_idr'], 0)
+        self.assertGreater(financials['lcoe_idr_per_kwh'], 0)
+
+        layout = data['site_details']['panel_layout']
+        self.assertGreater(layout['total_panels'], 0)
+        self.assertEqual(len(layout['panels']), layout['total_panels'])
+        lat, lon = layout['panels'][0][0]
+        self.assertAlmostEqual(lat, -6.918, places=2)
+        self.assertAlmostEqual(lon, 107.619, places=2)
+
+    def test_batch_matches_single_and_reports_errors(self):
+        items = [
+            roof(-6.9175, 107.6191),
+            roof(-6.9176, 107.6192, tilt=10.0),  # same weather cell, other orientation
+            roof(-7.2575, 112.7521),             # Surabaya, separate cell
+            {"polygon": [[0.0, 0.0], [0.0, 1.0]], "bill_idr": 1_000_000},
+        ]
+        response = self.client.post("/api/v1/simulation/batch", json={"items": items})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(data['succeeded'], 3)
+        self.assertEqual(data['weather_cells'], 2)
+        self.assertEqual(data['results'][3]['error']['status_code'], 400)
+
+        single = self.client.post("/api/v1/simulation/calculate", json=items[0]).json()
+        batched = data['results'][0]['result']
+        self.assertEqual(batched['site_details']['roof_area_sqm'], single['site_details']['roof_area_sqm'])
+        self.assertAlmostEqual(
+            batched['energy_output']['annual_production_kwh'],
+            single['energy_output']['annual_production_kwh'],
+            delta=single['energy_output']['annual_production_kwh'] * 0.01
+        )
+
+    def test_batch_stream_ndjson(self):
+        items = [roof(-6.9175, 107.6191), roof(-7.2575, 112.7521), {"polygon": [[0.0, 0.0]], "bill_idr": 1}]
+        with self.client.stream("POST", "/api/v1/simulation/batch/stream", json={"items": items}) as response:
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+            events = [json.loads(line) for line in response.iter_lines() if line]
+
+        self.assertEqual(events[0], {"event": "start", "total": 3, "weather_cells": 2})
+        self.assertEqual(events[-1]["event"], "done")
+        self.assertEqual((events[-1]["succeeded"], events[-1]["failed"]), (2, 1))
+
+        results = {e["index"]: e["result"] for e in events if e["event"] == "result"}
+        self.assertEqual(sorted(results), [0, 1])
+        self.assertGreater(results[1]["energy_output"]["annual_production_kwh"], 0)
+        errors = [e for e in events if e["event"] == "error"]
+        self.assertEqual(errors[0]["index"], 2)
+        self.assertEqual(errors[0]["error"]["status_code"], 400)
+
+        progress = [e for e in events if e["event"] == "progress"]
+        self.assertEqual(len(progress), 2)
+        self.assertEqual(progress[-1]["completed"], 3)
+
+    def test_batch_stream_holds_back_jobs_for_a_slow_consumer(self):
+        runs = []
+
+        async def fake_run_timed(fn, misses, weather, admitted=False):
+            runs.append(len(misses))
+            return [{"index": index, "result": {"index": index}} for index, _ in misses]
+
+        # 30 one-roof jobs in one weather cell
+        members = [
+            (i, SimulationRequest(**roof(-6.9175 - i * 0.00001, 107.6191, tilt=float(i % 40))))
+            for i in range(30)
+        ]
+
+        async def scenario():
+            batches = simulation._run_batch_cells({"cell": members}, chunk_size=1)
+            await batches.__anext__()
+            # The consumer stops reading; the producers must stall
+            await asyncio.sleep(0.3)
+            started = len(runs)
+            await batches.aclose()
+            return started
+
+        with patch.object(executor_module, '_executor', SimulationExecutor(mode="inline", max_workers=2)), \
+                patch.object(simulation, '_run_timed', new=fake_run_timed):
+            started = asyncio.run(scenario())
+        # One job consumed, two queued, two waiting to enqueue
+        self.assertLessEqual(started, 2 * 2 + 1)
+
+    def test_batch_stream_sse(self):
+        response = self.client.post(
+            "/api/v1/simulation/batch/stream", json={"items": [roof(-6.9175, 107.6191)]},
+            headers={"Accept": "text/event-stream"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        frames = [frame for frame in response.text.split("\n\n") if frame]
+        self.assertEqual([frame.split("\n")[0] for frame in frames],
+                         ["event: start", "event: result", "event: progress", "event: done"])
+        result = json.loads(frames[1].split("\n", 1)[1][len("data: "):])
+        self.assertEqual(result["index"], 0)
+
+    def test_repeat_request_served_from_result_cache(self):
+        first = self.client.post("/api/v1/simulation/calculate", json=roof(-8.6705, 115.2126)).json()
+        # Same roof drawn from another corner, different bill: identical result
+        repeat = roof(-8.6705, 115.2126, bill_idr=2_000_000)
+        repeat["polygon"] = repeat["polygon"][2:] + repeat["polygon"][:2]
+        second = self.client.post("/api/v1/simulation/calculate", json=repeat).json()
+        self.assertFalse(first["meta"]["cached"])
+        self.assertTrue(second["meta"]["cached"])
+        self.assertEqual(first["energy_output"], second["energy_output"])
+        # Timestamped when served, not when first computed
+        self.assertGreater(second["meta"]["calculation_timestamp"], first["meta"]["calculation_timestamp"])
+
+        changed = self.client.post("/api/v1/simulation/calculate", json=roof(-8.6705, 115.2126, tilt=5.0)).json()
+        self.assertFalse(changed["meta"]["cached"])
+
+    def test_calculate_with_uncertainty(self):
+        response = self.client.post(
+            "/api/v1/simulation/calculate", json=roof(-6.9175, 107.6191, uncertainty_samples=5000)
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        production = data["uncertainty"]["annual_production_kwh"]
+        self.assertLess(production["p90"], production["p50"])
+        self.assertAlmostEqual(production["p50"], data["energy_output"]["annual_production_kwh"],
+                               delta=0.05 * production["p50"])
+
+    def test_optimize_orientation(self):
+        request = {"polygon": roof(-6.9175, 107.6191)["polygon"], "tilt_step": 5.0, "azimuth_step": 30.0}
+        response = self.client.post("/api/v1/simulation/optimize", json=request)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data["yield_kwh_per_kwp"]), len(data["tilts"]))
+        self.assertEqual(len(data["azimuths"]), 12)
+        self.assertEqual(len(data["yield_kwh_per_kwp"][0]), 12)
+
+        # Southern hemisphere: best is a low, north-facing tilt
+        optimum = data["optimum"]
+        self.assertEqual(optimum["azimuth"], 0.0)
+        self.assertLessEqual(optimum["tilt"], 15.0)
+        self.assertIn([optimum["tilt"], optimum["azimuth"]], data["near_optimal"]["orientations"])
+
+        # The simulated optimum agrees with /calculate at the same orientation
+        simulated = self.client.post("/api/v1/simulation/calculate", json=roof(
+            -6.9175, 107.6191, tilt=optimum["tilt"], azimuth=optimum["azimuth"]
+        )).json()
+        self.assertAlmostEqual(
+            simulated["energy_output"]["annual_production_kwh"], optimum["annual_production_kwh"], delta=2
+        )
+        self.assertAlmostEqual(simulated["site_details"]["detailed_losses"]["orientation_loss_percent"], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
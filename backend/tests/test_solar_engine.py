@@ -1,4 +1,7 @@
 import unittest
+from unittest.mock import patch
+from core import solar_engine
+from core.optimum_cache import OptimumCache
 from core.solar_engine import SolarEngine
 
 class TestSolarEngine(unittest.TestCase):
@@ -69,5 +72,64 @@ class TestSolarEngine(unittest.TestCase):
         
         print(f"Simulation Result: {result}")
 
+    def test_annual_simulation_daily_scalars(self):
+        """
+        The 8760-hour engine should agree with the 12-representative-day model
+        to within a few percent and keep the same output structure.
+        """
+        site = dict(latitude=-6.9175, longitude=107.6191, area_sqm=50.0, tilt=20.0, azimuth=0.0)
+        annual = SolarEngine.calculate_annual_simulation(
+            **site, base_ghi_daily_kwh=5.0, base_temp_c=30.0
+        )
+        monthly = SolarEngine.calculate_monthly_simulation(
+            **site, base_ghi_daily_kwh=5.0, base_temp_c=30.0
+        )
+
+        self.assertEqual(len(annual['monthly_breakdown']), 12)
+        self.assertEqual(sum(m['days'] for m in annual['monthly_breakdown']), 365)
+        self.assertAlmostEqual(
+            annual['annual_total_kwh'], monthly['annual_total_kwh'],
+            delta=monthly['annual_total_kwh'] * 0.05
+        )
+        # Monthly insolation is preserved by the clear-sky scaling
+        self.assertAlmostEqual(annual['monthly_breakdown'][6]['ghi_daily_kwh'], 5.0 * 1.12, places=2)
+
+    def test_annual_simulation_hourly_arrays(self):
+        import numpy as np
+        hours = SolarEngine.HOURS_PER_YEAR
+        result = SolarEngine.calculate_annual_simulation(
+            latitude=-6.2, longitude=106.8, area_sqm=30.0, tilt=10.0, azimuth=0.0,
+            hourly_ghi=np.zeros(hours), hourly_temp=np.full(hours, 28.0)
+        )
+        self.assertEqual(result['annual_total_kwh'], 0)
+
+        with self.assertRaises(ValueError):
+            SolarEngine.calculate_annual_simulation(
+                latitude=-6.2, longitude=106.8, area_sqm=30.0, tilt=10.0, azimuth=0.0,
+                hourly_ghi=np.zeros(24), base_temp_c=28.0
+            )
+
+class TestOrientationOptimum(unittest.TestCase):
+
+    def test_cached_optimum_gives_the_same_loss_and_sweeps_once_per_weather(self):
+        geometry = SolarEngine.prepare_annual_geometry(-6.92, 107.62)
+        ghi, temp_air = SolarEngine.build_hourly_weather(geometry, 4.8, 27.0)
+        full = SolarEngine.calculate_orientation_loss(geometry, ghi, temp_air, 30.0, 90.0)
+
+        with patch.object(solar_engine, 'get_optimum_cache', return_value=OptimumCache()), \
+                patch.object(SolarEngine, 'calculate_optimal_yield', wraps=SolarEngine.calculate_optimal_yield) as sweep:
+            optimum = SolarEngine.get_optimal_yield(-6.92, 107.62, 4.8, 27.0)
+            # Other roofs of the cell under the same weather reuse it
+            for _ in range(3):
+                self.assertEqual(SolarEngine.get_optimal_yield(-6.92, 107.62, 4.8, 27.0), optimum)
+            self.assertEqual(sweep.call_count, 1)
+            # A new weather entry for the cell needs a new reference
+            SolarEngine.get_optimal_yield(-6.92, 107.62, 5.1, 27.0)
+            self.assertEqual(sweep.call_count, 2)
+
+        cached = SolarEngine.calculate_orientation_loss(geometry, ghi, temp_air, 30.0, 90.0, optimal_yield=optimum)
+        self.assertAlmostEqual(cached, full, places=9)
+        self.assertGreater(cached, 0.0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pandas as pd
+from core.geometry import local_timezone
+from core import solar_engine
+from core.solar_engine import SolarEngine
+from core.transposition_table import TranspositionTable, TABLE_VERSION, REFERENCE_YEAR, REPRESENTATIVE_DAY
+
+class TestTranspositionTable(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Small grid around Bandung, 4 pvlib passes
+        cls.table = TranspositionTable.build(
+            lat_axis=np.array([-7.0, -6.0]),
+            lon_axis=np.array([107.0, 108.0]),
+            tilt_axis=np.array([0.0, 10.0, 20.0, 30.0]),
+            azimuth_axis=np.arange(0.0, 361.0, 90.0)
+        )
+
+    def test_grid_node_matches_live_pvlib(self):
+        """
+        At a grid node the table must reproduce the live clear-sky computation.
+        """
+        times = pd.date_range(
+            start=pd.Timestamp(REFERENCE_YEAR, 3, REPRESENTATIVE_DAY),
+            periods=24, freq='h', tz=local_timezone(-7.0, 107.0)
+        )
+        live = SolarEngine.calculate_clearsky_transposition(-7.0, 107.0, 20.0, 180.0, times)
+        cached = self.table.lookup(-7.0, 107.0, 20.0, 180.0, month=3)
+        self.assertAlmostEqual(cached, live, places=4)
+
+    def test_interpolation_between_nodes(self):
+        low = self.table.lookup(-6.5, 107.5, 10.0, 0.0, month=6)
+        high = self.table.lookup(-6.5, 107.5, 20.0, 0.0, month=6)
+        mid = self.table.lookup(-6.5, 107.5, 15.0, 0.0, month=6)
+        self.assertAlmostEqual(mid, (low + high) / 2, places=5)
+
+    def test_azimuth_wraps(self):
+        self.assertAlmostEqual(
+            self.table.lookup(-6.5, 107.5, 20.0, -90.0, month=1),
+            self.table.lookup(-6.5, 107.5, 20.0, 270.0, month=1),
+            places=6
+        )
+
+    def test_outside_domain_returns_none(self):
+        self.assertIsNone(self.table.lookup(-8.0, 107.5, 20.0, 0.0, month=1))
+        self.assertIsNone(self.table.lookup(-6.5, 107.5, 45.0, 0.0, month=1))
+
+    def test_save_load_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'k_trans.npz')
+            self.table.save(path)
+            loaded = TranspositionTable.load(path)
+        self.assertEqual(loaded.version, TABLE_VERSION)
+        np.testing.assert_array_equal(loaded.k_trans, self.table.k_trans)
+
+    def test_daily_factor_uses_the_site_local_date(self):
+        # 20:00 UTC on 31 January is already 1 February in Jakarta (WIB, UTC+7)
+        now = lambda tz=None: pd.Timestamp("2026-01-31 20:00", tz="UTC").tz_convert(tz)
+        table = MagicMock()
+        table.lookup.return_value = 1.05
+        cache = MagicMock(wraps=solar_engine.get_ephemeris_cache())
+
+        with patch.object(pd.Timestamp, "now", side_effect=now):
+            with patch.object(solar_engine, "get_transposition_table", return_value=table):
+                SolarEngine.get_daily_transposition_factor(-6.2, 106.8, 15.0, 0.0)
+            with patch.object(solar_engine, "get_transposition_table", return_value=None), \
+                    patch.object(solar_engine, "get_ephemeris_cache", return_value=cache):
+                SolarEngine.get_daily_transposition_factor(-6.2, 106.8, 15.0, 0.0)
+        self.assertEqual(table.lookup.call_args.args[-1], 2)
+        self.assertEqual(list(cache.days.call_args.args[2]), [32])
+
+if __name__ == '__main__':
+    unittest.main()
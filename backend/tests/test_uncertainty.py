@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from core.solar_engine import SolarEngine
+from core.uncertainty import (
+    UncertaintyModel, run_monte_carlo, sample_annual_production, yield_statistics, payback_years
+)
+
+
+class TestMonteCarlo(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        geometry = SolarEngine.prepare_annual_geometry(-6.9, 107.6)
+        ghi, temp_air = SolarEngine.build_hourly_weather(geometry, 4.8, 27.0)
+        cls.hourly_yield = SolarEngine.calculate_hourly_yield(geometry, 15.0, 0.0, ghi, temp_air)
+
+    def test_nominal_sample_matches_engine(self):
+        nominal = {
+            'ghi_scale': np.array([1.0]),
+            'temp_offset': np.array([0.0]),
+            'temp_coeff': np.array([SolarEngine.TEMP_COEFF]),
+            'soiling': np.array([SolarEngine.LOSS_SOILING]),
+            'other_loss': np.array([0.0]),
+        }
+        annual = sample_annual_production(yield_statistics(self.hourly_yield), 50.0, 0.2, nominal)[0]
+        engine = SolarEngine.aggregate_annual_yield(self.hourly_yield, 50.0, 0.2)['annual_total_kwh']
+        self.assertAlmostEqual(annual, engine, delta=1.0)
+
+    def test_percentiles_are_ordered_and_reproducible(self):
+        # Timing of this case: benchmarks/suite.py (uncertainty.run_monte_carlo[10000])
+        result = run_monte_carlo(self.hourly_yield, 50.0, 0.2, system_cost=100e6, tariff=1444.7, samples=10_000)
+        self.assertEqual(result['samples'], 10_000)
+
+        production = result['annual_production_kwh']
+        self.assertGreater(production['p50'], production['p90'])
+        self.assertGreater(production['p90'], production['p99'])
+        payback = result['payback_years']
+        self.assertLess(payback['p50'], payback['p90'])
+
+        again = run_monte_carlo(self.hourly_yield, 50.0, 0.2, system_cost=100e6, tariff=1444.7, samples=10_000)
+        self.assertEqual(result, again)
+
+    def test_payback_with_degradation(self):
+        years = payback_years(np.array([10_000.0, 10_000.0, 1.0]), np.array([0.0, 0.01, 0.005]),
+                              system_cost=10_000 * 1000 * 5, tariff=1000)
+        self.assertAlmostEqual(years[0], 5.0)
+        self.assertGreater(years[1], 5.0)
+        self.assertEqual(years[2], UncertaintyModel.PAYBACK_HORIZON_YEARS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from core import executor as executor_module
+from core import warmup as warmup_module
+from core.executor import SimulationExecutor
+from core.warmup import StartupWarmup
+from core.weather_service import WeatherService
+from main import app
+
+
+class TestStartupWarmup(unittest.TestCase):
+
+    def test_steps_run_in_order_and_failures_are_recorded(self):
+        calls = []
+
+        async def ok():
+            calls.append("ok")
+
+        async def broken():
+            calls.append("broken")
+            raise RuntimeError("no table")
+
+        async def scenario():
+            warmup = StartupWarmup()
+            self.assertFalse(warmup.ready)
+            warmup.start({"ok": ok, "broken": broken})
+            self.assertEqual(warmup.state, "warming")
+            await warmup.wait()
+            return warmup
+
+        warmup = asyncio.run(scenario())
+        self.assertEqual(calls, ["ok", "broken"])
+        self.assertTrue(warmup.ready)
+        status = warmup.status()
+        self.assertEqual(status["status"], "warm")
+        self.assertEqual(set(status["steps"]), {"ok", "broken", "total"})
+        self.assertEqual(status["errors"], {"broken": "no table"})
+
+    def test_disabled_warmup_is_ready_immediately(self):
+        with patch.dict("os.environ", {"STARTUP_WARMUP": "false"}):
+            warmup = StartupWarmup()
+        self.assertTrue(warmup.ready)
+        self.assertEqual(warmup.status()["status"], "disabled")
+
+
+class TestReadiness(unittest.TestCase):
+
+    def test_ready_turns_warm_after_startup_simulation(self):
+        with patch.object(WeatherService, '_get_redis', new=AsyncMock(return_value=None)), \
+                patch.object(executor_module, '_executor', SimulationExecutor(mode="inline")), \
+                patch.object(warmup_module, '_warmup', None), \
+                patch.object(WeatherService, 'close', new=AsyncMock()) as close, \
+                TestClient(app) as client:
+            deadline = time.monotonic() + 60
+            response = client.get("/ready")
+            while response.status_code == 503 and time.monotonic() < deadline:
+                time.sleep(0.05)
+                response = client.get("/ready")
+
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual(body["status"], "warm")
+            self.assertIn("simulation", body["steps"])
+            self.assertEqual(body["errors"], {})
+        close.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from core.weather_service import WeatherService
+
+
+class TestWeatherService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = WeatherService()
+        self.service.store.enabled = False
+        patcher = patch.object(self.service, '_get_redis', new=AsyncMock(return_value=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        calls = []
+
+        async def slow_fetch(lat, lon):
+            calls.append((lat, lon))
+            await asyncio.sleep(0.05)
+            return {"ghi_daily_kwh": 5.0, "temp_avg": 28.0, "source": "openweathermap"}
+
+        async def scenario():
+            with patch.object(self.service, '_fetch_from_owm', new=slow_fetch):
+                # Same 0.01-degree grid cell, slightly different coordinates
+                return await asyncio.gather(*(
+                    self.service.get_weather_data(-6.9175 + i * 0.0001, 107.6191) for i in range(10)
+                ))
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r["ghi_daily_kwh"] == 5.0 for r in results))
+        self.assertEqual(self.service._inflight, {})
+
+    def test_distinct_cells_fetch_independently(self):
+        fetch = AsyncMock(return_value={"ghi_daily_kwh": 5.0, "temp_avg": 28.0, "source": "mock"})
+
+        async def scenario():
+            with patch.object(self.service, '_fetch_from_owm', new=fetch):
+                await asyncio.gather(
+                    self.service.get_weather_data(-6.91, 107.61),
+                    self.service.get_weather_data(-7.25, 112.75),
+                )
+
+        asyncio.run(scenario())
+        self.assertEqual(fetch.await_count, 2)
+
+    def test_l1_serves_repeat_requests_without_redis(self):
+        fetch = AsyncMock(return_value={"ghi_daily_kwh": 5.2, "temp_avg": 27.0, "source": "openweathermap"})
+
+        async def scenario():
+            with patch.object(self.service, '_fetch_from_owm', new=fetch):
+                first = await self.service.get_weather_data(-6.2, 106.8)
+                second = await self.service.get_weather_data(-6.2001, 106.8001)
+                return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(fetch.await_count, 1)
+        self.assertEqual(first["source"], "openweathermap")
+        self.assertEqual(second["source"], "cache")
+        self.assertEqual(second["ghi_daily_kwh"], 5.2)
+        self.assertEqual(self.service._l1_cache.hits, 1)
+
+
+class TestWeatherServiceRedisDown(unittest.TestCase):
+
+    def test_unreachable_redis_falls_back_to_l1(self):
+        service = WeatherService()
+        service.redis_url = "redis://127.0.0.1:1/0"  # nothing listens here
+        fetch = AsyncMock(return_value={"ghi_daily_kwh": 4.8, "temp_avg": 29.0, "source": "openweathermap"})
+
+        async def scenario():
+            with patch.object(service, '_fetch_from_owm', new=fetch):
+                await service.get_weather_data(-7.25, 112.75)
+                # Redis is now marked down: no client is handed out
+                self.assertIsNone(await service._get_redis())
+                return await service.get_weather_data(-7.25, 112.75)
+
+        cached = asyncio.run(scenario())
+        self.assertEqual(cached["source"], "cache")
+        self.assertEqual(fetch.await_count, 1)
+        self.assertFalse(service.cache_stats()["redis_available"])
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestWeatherServicePostGISTier(unittest.TestCase):
+
+    def setUp(self):
+        self.service = WeatherService()
+        patcher = patch.object(self.service, '_get_redis', new=AsyncMock(return_value=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_nearest_row_served_and_promoted_to_l1(self):
+        cached_at = datetime.utcnow() - timedelta(hours=1)
+        nearest = AsyncMock(return_value={
+            "ghi_daily_kwh": 4.9, "temp_avg": 27.5, "cached_at": cached_at,
+            "expires_at": cached_at + timedelta(hours=24), "distance_m": 850.0
+        })
+        fetch = AsyncMock()
+
+        async def scenario():
+            with patch.object(self.service.store, 'get_nearest', new=nearest), \
+                 patch.object(self.service, '_fetch_from_owm', new=fetch):
+                first = await self.service.get_weather_data(-6.2, 106.8)
+                second = await self.service.get_weather_data(-6.2, 106.8)
+                return first, second
+
+        first, second = asyncio.run(scenario())
+        fetch.assert_not_awaited()
+        self.assertEqual(nearest.await_count, 1)
+        self.assertEqual(first["ghi_daily_kwh"], 4.9)
+        self.assertEqual(second["cached_at"], cached_at)
+
+    def test_fresh_fetch_is_written_through(self):
+        upsert = AsyncMock()
+        fetch = AsyncMock(return_value={"ghi_daily_kwh": 5.1, "temp_avg": 28.0, "source": "openweathermap"})
+
+        async def scenario():
+            with patch.object(self.service.store, 'get_nearest', new=AsyncMock(return_value=None)), \
+                 patch.object(self.service.store, 'upsert', new=upsert), \
+                 patch.object(self.service, '_fetch_from_owm', new=fetch):
+                await self.service.get_weather_data(-6.2, 106.8)
+                await self.service.store.close()
+
+        asyncio.run(scenario())
+        upsert.assert_awaited_once()
+        grid_key, lat, lon = upsert.await_args.args[:3]
+        self.assertEqual(grid_key, self.service._get_grid_key(-6.2, 106.8))
+        self.assertEqual((lat, lon), (-6.2, 106.8))
@@ -21,11 +21,50 @@ export interface CalculationRequest {
   electricity_tariff?: number
 }
 
+export type BatchStreamEvent =
+  | { event: 'start'; total: number; weather_cells: number }
+  | { event: 'result'; index: number; result: SimulationResults }
+  | { event: 'error'; index?: number; error: { status_code: number; detail: string } }
+  | { event: 'progress'; completed: number; succeeded: number; failed: number; total: number }
+  | { event: 'done'; total: number; succeeded: number; failed: number; weather_cells: number }
+
 export const simulationApi = {
   calculate: async (data: CalculationRequest): Promise<SimulationResults> => {
     const response = await api.post<SimulationResults>('/simulation/calculate', data)
     return response.data
   },
+
+  // NDJSON stream: onEvent fires for every roof as soon as the backend finishes it
+  streamBatch: async (
+    items: CalculationRequest[],
+    onEvent: (event: BatchStreamEvent) => void,
+    signal?: AbortSignal
+  ): Promise<void> => {
+    const response = await fetch(`${API_BASE_URL}/api/v1/simulation/batch/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+      body: JSON.stringify({ items }),
+      signal,
+    })
+    if (!response.ok || !response.body) {
+      throw new Error(`Batch stream failed: ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    for (;;) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop() ?? ''
+      for (const line of lines) {
+        if (line.trim()) onEvent(JSON.parse(line) as BatchStreamEvent)
+      }
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer) as BatchStreamEvent)
+  },
 }
 
 export default api
@@ -136,6 +136,9 @@ export interface SimulationResults {
       coverage_percentage: number
       layout_width_m: number
       layout_height_m: number
+      orientation_deg?: number
+      panel_orientation?: 'portrait' | 'landscape'
+      panels?: number[][][] // Panel rectangles as [[lat, lng], ...]
     }
     detailed_losses?: {
       temperature_loss_percent: number
@@ -168,6 +171,7 @@ export interface SimulationResults {
   meta: {
     weather_source: string
     calculation_timestamp: string
+    cached?: boolean
   }
 }
 